@@ -410,6 +410,12 @@ const ChatContainer = () => {
                             if (!isMedia) {
                                 setMessages(prev => prev.map(msg => msg.id === tempMessageId ? { ...msg, content: fullResponse, isLoading: true, isTemporary: true } : msg));
                             }
+                        } else if (data.type === "replace") {
+                            // A revised answer supersedes the streamed draft
+                            fullResponse = data.content;
+                            if (!isMedia) {
+                                setMessages(prev => prev.map(msg => msg.id === tempMessageId ? { ...msg, content: fullResponse, isLoading: true, isTemporary: true } : msg));
+                            }
                         } else if (data.type === "done" || data.type === "result") {
                             receivedFinal = true;
                             finalThreadId = data.thread_id || finalThreadId;
@@ -0,0 +1,123 @@
+"""Wall-clock comparison of serial and concurrent I/O within one graph turn.
+
+Providers are replaced by stand-ins that sleep for typical latencies, so the
+numbers show the structural gain of overlapping independent calls, not the
+speed of any real provider.
+
+Scenarios:
+  rag_first_turn   index the upload, embed the query, vector search
+  indexed_turn     LLM routing, then document retrieval (prefetched)
+  research_branch  Exa search and document retrieval for one sub-question
+
+Usage:
+    python benchmarks/bench_concurrent_retrieval.py [--repeat N] [--scale F]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agt.concurrency import Prefetcher, gather  # noqa: E402
+
+# Typical latencies in seconds
+LATENCIES = {
+    "index_document": 1.2,
+    "embed_query": 0.15,
+    "vector_search": 0.08,
+    "route_llm": 0.45,
+    "web_search": 0.9,
+}
+
+
+def provider(name, scale):
+    """Returns a stand-in for a provider call of the given kind."""
+
+    def call():
+        time.sleep(LATENCIES[name] * scale)
+        return name
+
+    return call
+
+
+def rag_first_turn(scale, concurrent):
+    index = provider("index_document", scale)
+    embed = provider("embed_query", scale)
+    search = provider("vector_search", scale)
+    if concurrent:
+        gather({"index": index, "embedding": embed})
+    else:
+        index()
+        embed()
+    search()
+
+
+def indexed_turn(scale, concurrent):
+    route = provider("route_llm", scale)
+    embed = provider("embed_query", scale)
+    search = provider("vector_search", scale)
+
+    def retrieve():
+        embed()
+        return search()
+
+    if concurrent:
+        prefetcher = Prefetcher("bench")
+        prefetcher.start("turn", retrieve)
+        route()
+        prefetcher.take("turn")
+    else:
+        route()
+        retrieve()
+
+
+def research_branch(scale, concurrent):
+    web = provider("web_search", scale)
+    embed = provider("embed_query", scale)
+    search = provider("vector_search", scale)
+
+    def documents():
+        embed()
+        return search()
+
+    if concurrent:
+        gather({"web": web, "documents": documents})
+    else:
+        web()
+        documents()
+
+
+SCENARIOS = [rag_first_turn, indexed_turn, research_branch]
+
+
+def measure(scenario, scale, concurrent, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        scenario(scale, concurrent)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale",
+                        type=float,
+                        default=1.0,
+                        help="multiplier applied to every stand-in latency")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<18}{'serial ms':>12}{'concurrent ms':>16}{'saved':>9}")
+    for scenario in SCENARIOS:
+        serial = measure(scenario, args.scale, False, args.repeat)
+        concurrent = measure(scenario, args.scale, True, args.repeat)
+        print(f"{scenario.__name__:<18}{serial * 1000:>12.0f}"
+              f"{concurrent * 1000:>16.0f}{1 - concurrent / serial:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
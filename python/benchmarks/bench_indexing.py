@@ -0,0 +1,108 @@
+"""Indexing throughput: one-shot add_documents vs the batched pipeline.
+
+Runs against an in-memory Qdrant and a fake embedder that sleeps like a
+remote embedding API (fixed latency per request plus a cost per text), so
+no network or API key is needed. Requires qdrant-client and langchain-core.
+
+Usage:
+    python benchmarks/bench_indexing.py [--chunks N] [--dim D]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http import models as qdrant_models  # noqa: E402
+
+from agt.indexing import IndexingPipeline  # noqa: E402
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic vectors with API-like latency."""
+
+    def __init__(self, dim, request_latency=0.15, per_text_latency=0.002):
+        self.dim = dim
+        self.request_latency = request_latency
+        self.per_text_latency = per_text_latency
+
+    def _vector(self, text):
+        rng = random.Random(hashlib.md5(text.encode()).digest())
+        return [rng.uniform(-1, 1) for _ in range(self.dim)]
+
+    def embed_documents(self, texts):
+        time.sleep(self.request_latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_chunks(count):
+    words = ("vaani agent document chunk retrieval vector index page "
+             "search qdrant embedding").split()
+    rng = random.Random(7)
+    return [
+        Document(page_content=" ".join(rng.choices(words, k=150)) + f" #{i}",
+                 metadata={"page": i // 4}) for i in range(count)
+    ]
+
+
+def one_shot(client, name, embeddings, chunks):
+    """What add_documents did: embed everything, then upsert everything."""
+    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+    client.create_collection(name,
+                             vectors_config=qdrant_models.VectorParams(
+                                 size=len(vectors[0]),
+                                 distance=qdrant_models.Distance.COSINE))
+    client.upsert(name,
+                  points=[
+                      qdrant_models.PointStruct(id=i,
+                                                vector=vector,
+                                                payload={
+                                                    "page_content":
+                                                    chunk.page_content,
+                                                    "metadata": chunk.metadata
+                                                })
+                      for i, (chunk, vector) in enumerate(zip(chunks, vectors))
+                  ],
+                  wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    embeddings = FakeEmbeddings(args.dim)
+    client = QdrantClient(":memory:")
+
+    started = time.perf_counter()
+    one_shot(client, "one_shot", embeddings, chunks)
+    elapsed = time.perf_counter() - started
+    print(f"{'one-shot':<24}{elapsed:>8.2f}s{args.chunks / elapsed:>10.0f} chunks/s")
+
+    for batch_size, concurrency in [(64, 1), (64, 4), (128, 4), (64, 8)]:
+        name = f"pipeline_{batch_size}_{concurrency}"
+        result = IndexingPipeline(client,
+                                  name,
+                                  embeddings,
+                                  batch_size=batch_size,
+                                  concurrency=concurrency).index(chunks)
+        assert client.count(name).count == args.chunks
+        label = f"batch={batch_size} conc={concurrency}"
+        print(f"{label:<24}{result.elapsed:>8.2f}s"
+              f"{result.chunks_per_second:>10.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
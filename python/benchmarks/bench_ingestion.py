@@ -0,0 +1,98 @@
+"""Peak memory and time to first searchable chunk: eager vs streaming ingestion.
+
+A stand-in loader produces synthetic pages lazily (like PyPDFLoader's
+lazy_load), the embedder returns vectors instantly and the Qdrant client
+discards points, so only the ingestion pipeline's own buffering is measured.
+Eager ingestion loads and splits the whole document before indexing, as the
+agent did with load() + split_documents(); streaming passes a generator.
+Requires langchain, langchain-core and qdrant-client.
+
+Usage:
+    python benchmarks/bench_ingestion.py [--pages N ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from agt.indexing import IndexingPipeline  # noqa: E402
+
+PAGE_TEXT = ("Vaani indexes uploaded documents page by page so that the first "
+             "chunks are searchable early. ") * 40
+
+
+class InstantEmbeddings(Embeddings):
+
+    def embed_documents(self, texts):
+        return [[0.1] * 64 for _ in texts]
+
+    def embed_query(self, text):
+        return [0.1] * 64
+
+
+class DiscardingClient:
+    """Stand-in Qdrant client that records when the first upsert arrived."""
+
+    def __init__(self):
+        self.first_upsert_at = None
+
+    def collection_exists(self, name):
+        return True
+
+    def upsert(self, collection_name, points, wait):
+        if self.first_upsert_at is None:
+            self.first_upsert_at = time.perf_counter()
+
+
+def lazy_pages(count):
+    for number in range(count):
+        yield Document(page_content=f"Page {number}. " + PAGE_TEXT,
+                       metadata={"page": number})
+
+
+def streaming_chunks(pages, splitter):
+    for page in lazy_pages(pages):
+        yield from splitter.split_documents([page])
+
+
+def run(pages, eager):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000,
+                                              chunk_overlap=100)
+    client = DiscardingClient()
+    tracemalloc.start()
+    started = time.perf_counter()
+    if eager:
+        chunks = splitter.split_documents(list(lazy_pages(pages)))
+    else:
+        chunks = streaming_chunks(pages, splitter)
+    IndexingPipeline(client, "bench", InstantEmbeddings()).index(chunks)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, client.first_upsert_at - started, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'mode':<10}{'peak MiB':>10}{'first upsert ms':>17}"
+          f"{'total s':>9}")
+    for pages in args.pages:
+        for mode, eager in (("eager", True), ("streaming", False)):
+            peak, first, total = run(pages, eager)
+            print(f"{pages:>6} {mode:<10}{peak / 2**20:>10.1f}"
+                  f"{first * 1000:>17.0f}{total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
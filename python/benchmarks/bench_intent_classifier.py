@@ -0,0 +1,77 @@
+"""LLM-avoidance rate, accuracy and latency of the local intent classifier.
+
+Runs k-fold cross-validation over labelled routing decisions. By default it
+uses data/routing_labelled.jsonl; pass --log to evaluate on a real routing log
+written by the orchestrator (records with source "keyword" or "llm").
+
+Usage:
+    python benchmarks/bench_intent_classifier.py [--log FILE] [--threshold 0.8]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agt.intent_classifier import (  # noqa: E402
+    IntentClassifier, extract_features, load_examples, read_log)
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data",
+                         "routing_labelled.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", help="routing decision log (JSONL)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.log:
+        examples = load_examples(read_log(args.log))
+    else:
+        with open(DATA_PATH, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        examples = [(extract_features(row["query"],
+                                      has_document=row["agent"] == "rag_agent"),
+                     row["agent"]) for row in rows]
+    random.Random(0).shuffle(examples)
+
+    accepted = correct_accepted = correct_total = 0
+    predict_seconds = 0.0
+    train_seconds = 0.0
+    for fold in range(args.folds):
+        test = examples[fold::args.folds]
+        train = [example for index, example in enumerate(examples)
+                 if index % args.folds != fold]
+        start = time.perf_counter()
+        model = IntentClassifier.train(train)
+        train_seconds += time.perf_counter() - start
+        vectorize, probabilities = model._vectorize, model._probabilities
+        for features, label in test:
+            start = time.perf_counter()
+            scores = probabilities(vectorize(features))
+            predict_seconds += time.perf_counter() - start
+            predicted = max(scores, key=scores.get)
+            correct_total += predicted == label
+            if scores[predicted] >= args.threshold:
+                accepted += 1
+                correct_accepted += predicted == label
+
+    total = len(examples)
+    print(f"examples                {total}")
+    print(f"top-1 accuracy          {correct_total / total:.1%}")
+    print(f"LLM avoidance rate      {accepted / total:.1%} "
+          f"(confidence >= {args.threshold})")
+    print(f"accuracy when avoided   "
+          f"{correct_accepted / accepted if accepted else 0:.1%}")
+    print(f"added latency           {predict_seconds / total * 1e6:.1f} us/query")
+    print(f"training time           {train_seconds / args.folds * 1e3:.1f} ms/fold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Local in-process index vs Qdrant: search latency and recall@k.
+
+Random clustered vectors stand in for chunk embeddings (no API needed).
+Recall is measured against a float64 brute-force search. The local index
+is timed as float32 and int8; Qdrant is timed with the same vectors either
+in-memory or against a server given with --url, which adds the network
+round trip that the local backend avoids. Requires numpy; the Qdrant rows
+also need qdrant-client and are skipped without it.
+
+Usage:
+    python benchmarks/bench_local_index.py [--chunks 50 200 1000] \
+        [--dim 1536] [--queries 200] [--k 3] [--url http://localhost:6333]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agt.local_index import LocalVectorIndex  # noqa: E402
+
+try:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qdrant_models
+except ImportError:
+    QdrantClient = None
+
+
+def make_data(chunks, dim, queries, rng):
+    """Chunks around a few topics, and queries near random chunks."""
+    centers = rng.normal(size=(max(1, chunks // 10), dim))
+    vectors = centers[rng.integers(len(centers), size=chunks)]
+    vectors = vectors + 0.6 * rng.normal(size=(chunks, dim))
+    targets = rng.integers(chunks, size=queries)
+    query_vectors = vectors[targets] + 0.8 * rng.normal(size=(queries, dim))
+    return vectors, query_vectors
+
+
+def exact_top_k(vectors, queries, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def measure(search, queries, truth, k):
+    """Median latency in ms and mean recall@k of a search function."""
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(found) & expected) / k)
+    return statistics.median(latencies), statistics.mean(recalls)
+
+
+def qdrant_search(client, vectors, k):
+    name = "bench_local_vs_qdrant"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(name,
+                             vectors_config=qdrant_models.VectorParams(
+                                 size=vectors.shape[1],
+                                 distance=qdrant_models.Distance.COSINE))
+    client.upsert(name,
+                  points=[
+                      qdrant_models.PointStruct(id=i, vector=vector.tolist())
+                      for i, vector in enumerate(vectors)
+                  ],
+                  wait=True)
+
+    def search(query):
+        return [
+            point.id for point in client.query_points(
+                name, query=query.tolist(), limit=k).points
+        ]
+
+    return search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--url", help="Qdrant server (default: in-memory)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    client = None
+    if QdrantClient is not None:
+        client = QdrantClient(url=args.url) if args.url else QdrantClient(
+            ":memory:")
+
+    print(f"{'chunks':>7} {'backend':<16}{'p50 ms':>9}{'recall':>8}"
+          f"{'bytes':>11}")
+    for chunks in args.chunks:
+        vectors, queries = make_data(chunks, args.dim, args.queries, rng)
+        truth = exact_top_k(vectors, queries, args.k)
+        texts = [str(i) for i in range(chunks)]
+        for label, quantize in (("local float32", False), ("local int8", True)):
+            index = LocalVectorIndex.build(texts, vectors, quantize=quantize)
+            latency, recall = measure(
+                lambda q: [i for i, _ in index.search(q, args.k)], queries,
+                truth, args.k)
+            print(f"{chunks:>7} {label:<16}{latency:>9.3f}{recall:>8.3f}"
+                  f"{index.nbytes:>11}")
+        if client is not None:
+            latency, recall = measure(qdrant_search(client, vectors, args.k),
+                                      queries, truth, args.k)
+            print(f"{chunks:>7} {'qdrant':<16}{latency:>9.3f}{recall:>8.3f}"
+                  f"{'-':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""PDF parsing throughput (pages/second) for different worker counts.
+
+Parses each sample PDF with the parallel parser at every requested worker
+count; one worker is the in-process baseline. Requires pypdf.
+
+Usage:
+    python benchmarks/bench_parsing.py sample.pdf [more.pdf ...] \
+        [--workers 1 2 4] [--pages-per-shard 16]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agt import parsing  # noqa: E402
+
+
+def measure(path, workers, pages_per_shard):
+    started = time.perf_counter()
+    pages = sum(1 for _ in parsing.iter_pdf_pages(path, workers,
+                                                  pages_per_shard))
+    return pages, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="+", help="sample PDF files")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages-per-shard", type=int, default=16)
+    args = parser.parse_args()
+
+    # Parse every size of document in parallel, not only long ones
+    parsing.PARSE_PARALLEL_MIN_PAGES = 0
+    for workers in args.workers:
+        if workers > 1:
+            # Start the pool outside the timed region
+            parsing.get_parse_pool(workers).submit(int).result()
+
+    print(f"{'document':<32}{'pages':>7}{'workers':>9}{'seconds':>9}"
+          f"{'pages/s':>9}")
+    for path in args.pdfs:
+        for workers in args.workers:
+            pages, elapsed = measure(path, workers, args.pages_per_shard)
+            print(f"{os.path.basename(path)[:31]:<32}{pages:>7}{workers:>9}"
+                  f"{elapsed:>9.2f}{pages / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Microbenchmark and routing-accuracy report for the keyword router.
+
+Compares the compiled KeywordRouter against the substring checks it replaced,
+using the labelled queries in data/routing_labelled.jsonl.
+
+Usage:
+    python benchmarks/bench_router.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from agt.routing import DEFAULT_RULES_PATH, KeywordRouter  # noqa: E402
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data",
+                         "routing_labelled.jsonl")
+
+LEGACY_RULES = [
+    ("image_generator", [
+        "create an image", "generate an image", "make an image", "draw",
+        "picture of", "image of"
+    ]),
+    ("music_generator", [
+        "create music", "generate music", "make music", "compose music",
+        "create a song", "generate a song", "make a song", "compose a song",
+        "create a melody", "generate a melody", "create a tune",
+        "create a beat", "make a soundtrack", "generate a soundtrack",
+        "create some music", "generate audio", "generate some music",
+        "create audio"
+    ]),
+    ("web_search_agent", [
+        "latest", "recent", "news", "current", "today", "ceo of", "who is",
+        "what is", "when did", "where is", "how to", "update on",
+        "where can i find", "website", "stock price", "price of",
+        "weather in", "events in"
+    ]),
+]
+
+
+def legacy_route(query):
+    """Reproduces the substring checks previously inlined in orchestrator_node."""
+    for agent, keywords in LEGACY_RULES:
+        if any(keyword in query.lower() for keyword in keywords):
+            return agent
+    return None
+
+
+def load_labelled(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def accuracy_report(name, route, rows):
+    fired = correct = 0
+    false_fires = []
+    for row in rows:
+        agent = route(row["query"])
+        if agent is None:
+            continue
+        fired += 1
+        if agent == row["agent"]:
+            correct += 1
+        else:
+            false_fires.append((row["query"], agent, row["agent"]))
+    keyword_labels = sum(1 for row in rows
+                         if row["agent"] in dict(LEGACY_RULES))
+    print(f"\n{name}")
+    print(f"  fired on        {fired}/{len(rows)} queries")
+    print(f"  precision       {correct / fired if fired else 0:.1%}")
+    print(f"  recall          {correct / keyword_labels if keyword_labels else 0:.1%}"
+          " of image/music/web queries")
+    for query, got, expected in false_fires:
+        print(f"  misroute: {query!r} -> {got} (expected {expected})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = load_labelled(DATA_PATH)
+    router = KeywordRouter.from_file(DEFAULT_RULES_PATH)
+
+    def compiled_route(query):
+        match = router.route(query)
+        return match.agent if match else None
+
+    accuracy_report("legacy substring router", legacy_route, rows)
+    accuracy_report("compiled keyword router", compiled_route, rows)
+
+    queries = [row["query"] for row in rows]
+    for name, route in (("legacy", legacy_route),
+                        ("compiled", compiled_route)):
+        elapsed = timeit.timeit(lambda: [route(q) for q in queries],
+                                number=args.repeat)
+        per_query = elapsed / (args.repeat * len(queries)) * 1e6
+        print(f"\n{name:<9} {per_query:.2f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Per-thread collections vs one shared collection with payload filters.
+
+Builds both layouts for N threads with a few chunks each, then measures:
+the pre-index lookup (listing every collection, as the agent used to do,
+against collection_exists), search latency for a sample of threads
+(collection search against a thread_id-filtered search on the shared
+collection) and the cost of replacing a thread's document (dropping the
+collection against a filtered delete). Vectors are random; no embedding
+API is needed. Requires qdrant-client.
+
+In-memory mode has no HNSW and little per-collection overhead, so pass
+--url to measure a real Qdrant server, where per-collection memory and
+segment overhead is what the shared layout avoids.
+
+Usage:
+    python benchmarks/bench_tenancy.py [--threads 10000] [--chunks 8] \
+        [--dim 64] [--url http://localhost:6333]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http import models as qdrant_models  # noqa: E402
+
+from agt.tenancy import (SCOPE_PAYLOAD_KEYS, delete_scope,  # noqa: E402
+                         scope_filter, thread_collection_name)
+
+SHARED = "bench_vaani_shared"
+
+
+def random_vector(rng, dim):
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+def points_for(thread, chunks, dim, rng, first_id):
+    return [
+        qdrant_models.PointStruct(
+            id=first_id + i,
+            vector=random_vector(rng, dim),
+            payload={
+                "page_content": f"thread {thread} chunk {i}",
+                "metadata": {
+                    "thread_id": f"t{thread}",
+                    "doc_id": f"d{thread}"
+                }
+            }) for i in range(chunks)
+    ]
+
+
+def build_per_thread(client, threads, chunks, dim):
+    rng = random.Random(1)
+    vectors = qdrant_models.VectorParams(size=dim,
+                                         distance=qdrant_models.Distance.COSINE)
+    started = time.perf_counter()
+    for thread in range(threads):
+        name = thread_collection_name(f"t{thread}")
+        client.create_collection(name, vectors_config=vectors)
+        client.upsert(name, points_for(thread, chunks, dim, rng, 0))
+    return time.perf_counter() - started
+
+
+def build_shared(client, threads, chunks, dim):
+    rng = random.Random(1)
+    started = time.perf_counter()
+    client.create_collection(SHARED,
+                             vectors_config=qdrant_models.VectorParams(
+                                 size=dim,
+                                 distance=qdrant_models.Distance.COSINE))
+    for key in SCOPE_PAYLOAD_KEYS:
+        client.create_payload_index(
+            SHARED,
+            field_name=key,
+            field_schema=qdrant_models.PayloadSchemaType.KEYWORD)
+    batch = []
+    for thread in range(threads):
+        batch.extend(points_for(thread, chunks, dim, rng, thread * chunks))
+        if len(batch) >= 1024:
+            client.upsert(SHARED, batch)
+            batch = []
+    if batch:
+        client.upsert(SHARED, batch)
+    return time.perf_counter() - started
+
+
+def timed(calls):
+    """Median and p95 latency in milliseconds."""
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--url", help="Qdrant server (default: in-memory)")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url) if args.url else QdrantClient(":memory:")
+    rng = random.Random(2)
+    sample = rng.sample(range(args.threads), min(args.samples, args.threads))
+    query = random_vector(rng, args.dim)
+
+    per_thread_build = build_per_thread(client, args.threads, args.chunks,
+                                        args.dim)
+    shared_build = build_shared(client, args.threads, args.chunks, args.dim)
+    print(f"build: per-thread {per_thread_build:.1f}s, "
+          f"shared {shared_build:.1f}s")
+
+    def collection_of(thread):
+        return thread_collection_name(f"t{thread}")
+
+    def thread_scope(thread):
+        return {"thread_id": f"t{thread}"}
+
+    rows = [
+        ("lookup: list collections",
+         timed([client.get_collections] * 20)),
+        ("lookup: collection_exists",
+         timed([lambda t=t: client.collection_exists(collection_of(t))
+                for t in sample])),
+        ("search: per-thread collection",
+         timed([lambda t=t: client.query_points(
+             collection_of(t), query=query, limit=3) for t in sample])),
+        ("search: shared + thread filter",
+         timed([lambda t=t: client.query_points(
+             SHARED,
+             query=query,
+             query_filter=scope_filter(thread_scope(t)),
+             limit=3) for t in sample])),
+        ("replace: drop collection",
+         timed([lambda t=t: client.delete_collection(collection_of(t))
+                for t in sample])),
+        ("replace: filtered delete",
+         timed([lambda t=t: delete_scope(client, SHARED, thread_scope(t))
+                for t in sample])),
+    ]
+    print(f"{'operation':<34}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, (p50, p95) in rows:
+        print(f"{label:<34}{p50:>9.2f}{p95:>9.2f}")
+
+    if args.url:
+        for thread in range(args.threads):
+            client.delete_collection(collection_of(thread))
+        client.delete_collection(SHARED)
+
+
+if __name__ == "__main__":
+    main()
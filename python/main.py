@@ -1,3 +1,15 @@
+if __name__ == "__main__":
+    # Hand over to uvicorn's module entry point before the app stack is
+    # imported here, so processes started by multiprocessing (the parsing
+    # pool) do not re-import this script as their main module.
+    import os
+    import runpy
+    import sys
+    sys.argv = ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000",
+                "--app-dir", os.path.dirname(os.path.abspath(__file__))]
+    runpy.run_module("uvicorn", run_name="__main__", alter_sys=True)
+    sys.exit()
+
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
@@ -12,6 +24,7 @@ import logging
 import json
 from pathlib import Path
 import random
+import tempfile
 import boto3
 from botocore.exceptions import NoCredentialsError, ClientError
 import mimetypes # To determine content type
@@ -22,7 +35,12 @@ load_dotenv()
 
 # Add parent directory to path to import agent module
 sys.path.append(str(Path(__file__).parent.parent))
-from src.agt.agent import graph as agt_graph, VaaniState
+from src.agt.agent import graph as agt_graph, VaaniState, index_jobs
+from src.agt.index_jobs import content_hash
+from src.agt.metrics import metrics as agent_metrics
+from src.agt.embedding_cache import get_embedding_cache
+from src.agt.doc_registry import get_document_registry
+from src.agt.streaming import open_stream, close_stream, drain
 from langchain_core.messages import HumanMessage, AIMessage
 
 # Import model clients
@@ -287,8 +305,40 @@ async def upload_file(file: UploadFile = File(...)):
     """Upload a file to R2 and return its URL."""
     if not R2_CONFIGURED:
          raise HTTPException(status_code=501, detail="File upload is disabled (R2 not configured).")
+    content = await file.read()
+    await file.seek(0)
     file_url = await upload_to_r2(file)
-    return {"file_path": file_url} # Ensure frontend expects 'file_path'
+    response = {"file_path": file_url} # Ensure frontend expects 'file_path'
+    # Start indexing documents now so they are ready by the first question
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    if suffix in INDEXABLE_UPLOAD_SUFFIXES:
+        try:
+            job = await asyncio.to_thread(submit_index_job, content, suffix, file_url)
+            response["index_job"] = job.job_id
+        except Exception as e:
+            logger.warning(f"Could not start background indexing: {e}")
+    return response
+
+INDEXABLE_UPLOAD_SUFFIXES = (".pdf", ".docx", ".txt")
+
+def submit_index_job(content: bytes, suffix: str, file_url: str):
+    """Writes an upload to a temporary file and enqueues its indexing job."""
+    document_hash = content_hash(content)
+    existing = index_jobs.get(document_hash)
+    if existing is not None and existing.status != "failed":
+        # Same document uploaded before: only register the new URL
+        return index_jobs.submit(existing.path, document_hash, alias=file_url)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(content)
+    return index_jobs.submit(f.name, document_hash, alias=file_url, cleanup=True)
+
+@app.get("/api/index-status/{job_id}")
+async def index_status(job_id: str):
+    """Report the progress of a background indexing job started by an upload."""
+    job = index_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown indexing job.")
+    return job.to_dict()
 
 @app.post("/api/chat")
 async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
@@ -516,8 +566,11 @@ async def stream_chat_response(messages, model, thread_id, use_agent, deep_resea
                 reflection_data=None
             )
             
-            # Configure agent
-            config = {"configurable": {"thread_id": thread_id}}
+            # Configure agent; nodes push live events through the stream channel
+            stream_id = uuid.uuid4().hex
+            config = {"configurable": {"thread_id": thread_id, "stream_id": stream_id}}
+            events = open_stream(stream_id)
+            streamed_chunks = False
             
             # Process with agent
             try:
@@ -527,12 +580,16 @@ async def stream_chat_response(messages, model, thread_id, use_agent, deep_resea
                 
                 agent_task = asyncio.create_task(run_agent())
                 
-                # Wait for the task without sending status updates
-                while not agent_task.done():
-                    try:
-                        await asyncio.wait_for(asyncio.shield(agent_task), 2.0)
-                    except asyncio.TimeoutError:
-                        pass
+                # Forward node events to the client while the agent runs
+                while True:
+                    finished = agent_task.done()
+                    for event in drain(events):
+                        if event.get("type") in ("chunk", "replace"):
+                            streamed_chunks = True
+                        yield json.dumps({**event, "thread_id": thread_id}) + "\n"
+                    if finished:
+                        break
+                    await asyncio.sleep(0.05)
                 
                 # Get result from completed task
                 result = await agent_task
@@ -550,7 +607,8 @@ async def stream_chat_response(messages, model, thread_id, use_agent, deep_resea
                     response_content = "I couldn't process your request with the AI agent. Please try again."
                 
                 # KEY CHANGE: Stream one token/chunk at a time instead of cumulative content
-                words = response_content.split(' ')
+                # (skipped when the agent already streamed its answer live)
+                words = [] if streamed_chunks else response_content.split(' ')
                 buffer = ""
                 word_count = 0
                 
@@ -583,6 +641,8 @@ async def stream_chat_response(messages, model, thread_id, use_agent, deep_resea
                     "message": {"role": "assistant", "content": f"I encountered an error with the AI agent: {str(invoke_error)}"},
                     "thread_id": thread_id
                 }) + "\n"
+            finally:
+                close_stream(stream_id)
     
     except Exception as e:
         logger.error(f"Error in streaming chat response: {e}", exc_info=True)
@@ -882,6 +942,20 @@ async def health_check():
         "environment": "Vercel" if os.getenv("VERCEL") else "Development"
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Return agent counters, latency timings and derived ratios."""
+    snapshot = agent_metrics.snapshot()
+    try:
+        snapshot["embedding_cache"] = get_embedding_cache().stats()
+    except Exception as e:
+        logger.warning(f"Embedding cache stats unavailable: {e}")
+    try:
+        snapshot["doc_registry"] = get_document_registry().stats()
+    except Exception as e:
+        logger.warning(f"Document registry stats unavailable: {e}")
+    return snapshot
+
 # Add this helper function to format source URLs with titles
 def format_source_urls(sources):
     if not sources:
@@ -911,7 +985,3 @@ def handle_media_generation(prompt, media_type="image"):
     elif media_type == "music":
         # For music generation, instruct the AI about audio URLs
         return f"For music generation of '{prompt}', please include audio URLs directly, preferably as mp3 links."
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -6,7 +6,6 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_anthropic import ChatAnthropic
 from langchain_groq import ChatGroq
-from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 from langgraph.graph import StateGraph, START, END
 # Import SqliteSaver with error handling
@@ -20,15 +19,22 @@ except ImportError:
         "SqliteSaver could not be imported. Will use in-memory checkpointer.")
 from typing import List, Optional, Dict, Any, Callable, TypedDict, Union, cast
 from langgraph.graph import MessagesState
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import functools
 import hashlib
+from itertools import chain, islice
 from exa_py import Exa
 import logging
 from typing import TypeVar, Literal, cast
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field, ValidationError
 from langchain_core.output_parsers.openai_tools import PydanticToolsParser
+from langchain_core.exceptions import OutputParserException
+from langchain_core.utils.json import parse_partial_json
+from langchain_core.runnables import RunnableConfig
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import re
+import time
 import asyncio
 import replicate
 import datetime
@@ -41,6 +47,76 @@ except ImportError:
     tavily_available = False
     logging.warning("TavilySearchResults could not be imported. Web search will use Exa only.")
 
+# Local helper modules are imported relatively when loaded as the `agt`
+# package and as top-level modules when run from this directory (app.py).
+try:
+    from .dedup import dedupe_results
+    from .doc_registry import DOC_REGISTRY_GC_AGE, get_document_registry
+    from .embedding_cache import CachedEmbeddings
+    from .indexing import IndexingPipeline, IndexProgress, iter_document_chunks
+    from .hybrid import (HYBRID_RETRIEVAL, HYBRID_TOP_K, HybridRetriever,
+                         LexicalIndexBuilder, delete_lexical_index,
+                         get_reranker, lexical_index_name,
+                         load_lexical_index)
+    from .local_index import (LOCAL_INDEX_MAX_CHUNKS, LocalVectorIndex,
+                              delete_local_index, is_local_index,
+                              load_local_index, local_index_enabled,
+                              local_index_name, save_local_index)
+    from .index_jobs import (INDEX_JOB_WAIT_TIMEOUT, IndexJobManager,
+                             document_collection_name)
+    from .deep_research import DeepResearchPipeline
+    from .intent_classifier import IntentClassifier, log_routing_decision
+    from .cache import TTLCache, make_cache
+    from .concurrency import Prefetcher, gather
+    from .metrics import metrics
+    from .routing import get_keyword_router
+    from .passages import select_passages
+    from .search import fan_out, prefetch_executor
+    from .qdrant_store import (collection_create_options, get_qdrant_client,
+                               search_payloads_sync)
+    from .reflexion import ReflexionLoop
+    from .retrieval_cache import cached_retrieval, invalidate_collection
+    from .search_cache import get_search_cache, normalize_query
+    from .speculation import SpeculativeStream
+    from .streaming import emit
+    from .structured_output import repair_tool_call
+    from .tenancy import (QDRANT_SHARED_COLLECTION, SCOPE_PAYLOAD_KEYS,
+                          count_points, delete_scope, scope_filter, shared_mode,
+                          thread_collection_name)
+except ImportError:
+    from dedup import dedupe_results
+    from doc_registry import DOC_REGISTRY_GC_AGE, get_document_registry
+    from embedding_cache import CachedEmbeddings
+    from indexing import IndexingPipeline, IndexProgress, iter_document_chunks
+    from hybrid import (HYBRID_RETRIEVAL, HYBRID_TOP_K, HybridRetriever,
+                        LexicalIndexBuilder, delete_lexical_index,
+                        get_reranker, lexical_index_name, load_lexical_index)
+    from local_index import (LOCAL_INDEX_MAX_CHUNKS, LocalVectorIndex,
+                             delete_local_index, is_local_index,
+                             load_local_index, local_index_enabled,
+                             local_index_name, save_local_index)
+    from index_jobs import (INDEX_JOB_WAIT_TIMEOUT, IndexJobManager,
+                            document_collection_name)
+    from deep_research import DeepResearchPipeline
+    from intent_classifier import IntentClassifier, log_routing_decision
+    from cache import TTLCache, make_cache
+    from concurrency import Prefetcher, gather
+    from metrics import metrics
+    from routing import get_keyword_router
+    from passages import select_passages
+    from search import fan_out, prefetch_executor
+    from qdrant_store import (collection_create_options, get_qdrant_client,
+                              search_payloads_sync)
+    from reflexion import ReflexionLoop
+    from retrieval_cache import cached_retrieval, invalidate_collection
+    from search_cache import get_search_cache, normalize_query
+    from speculation import SpeculativeStream
+    from streaming import emit
+    from structured_output import repair_tool_call
+    from tenancy import (QDRANT_SHARED_COLLECTION, SCOPE_PAYLOAD_KEYS,
+                         count_points, delete_scope, scope_filter, shared_mode,
+                         thread_collection_name)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -96,12 +172,15 @@ class VaaniState(MessagesState):
     """State for the Vaani chatbot."""
     messages: List[BaseMessage]
     summary: Optional[str] = None
+    summarized_count: int = 0  # Leading messages already folded into summary
     file_url: Optional[str] = None
     indexed: bool = False
     deep_research_requested: bool = False
     agent_name: Optional[str] = None
     model_name: str = "gpt4o"  # Default model
     collection_name: Optional[str] = None
+    # Payload fields selecting this thread's document in a shared collection
+    document_scope: Optional[Dict[str, str]] = None
     reflect_iterations: int = 0
     reflection_data: Optional[Dict[str, Any]] = None
     max_search_results: int = 5  # Default number of search results for web search
@@ -228,6 +307,58 @@ def is_document_file(file_url: str) -> bool:
     return file_url.lower().endswith(('.pdf', '.docx', '.txt'))
 
 
+# Page text fetched per search result. Only the passages most relevant to the
+# query are kept (see passages.py), so full raw pages are rarely worth it.
+EXA_MAX_CHARACTERS = int(os.getenv("EXA_MAX_CHARACTERS", "4000"))
+TAVILY_INCLUDE_RAW_CONTENT = os.getenv("TAVILY_INCLUDE_RAW_CONTENT",
+                                       "false").lower() == "true"
+
+
+def exa_search(query: str, num_results: int) -> List[Dict[str, Any]]:
+    """Searches Exa through the shared search result cache."""
+    options = {
+        "use_autoprompt": True,
+        "text": {
+            "max_characters": EXA_MAX_CHARACTERS
+        }
+    }
+
+    def fetch():
+        exa_client = Exa(api_key=exa_key)
+        results = exa_client.search_and_contents(query,
+                                                 num_results=num_results,
+                                                 **options)
+        if not results or not results.results:
+            return []
+        return [{
+            "url": r.url,
+            "title": r.title,
+            "text": r.text or ""
+        } for r in results.results]
+
+    return get_search_cache().get_or_fetch("exa", query, num_results, fetch,
+                                           options)
+
+
+def tavily_search(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Searches Tavily through the shared search result cache."""
+    options = {
+        "include_raw_content": TAVILY_INCLUDE_RAW_CONTENT,
+        "include_domains": []
+    }
+
+    def fetch():
+        search_tool = TavilySearchResults(max_results=max_results,
+                                          api_key=tavily_api_key,
+                                          **options)
+        results = search_tool.invoke({"query": query})
+        # The tool reports failures as a string; never cache those
+        return results if isinstance(results, list) else []
+
+    return get_search_cache().get_or_fetch("tavily", query, max_results,
+                                           fetch, options)
+
+
 # Reflection utility class for web search
 class ResponderWithRetries:
     """Handles response generation with validation retries."""
@@ -237,6 +368,52 @@ class ResponderWithRetries:
         self.validator = validator
         self.max_retries = max_retries
 
+    def validated(self, response):
+        """Returns a schema-valid response, repairing it locally if needed.
+
+        Raises the validation error when the output cannot be repaired.
+        """
+        error = None
+        try:
+            self.validator.invoke(response)
+            if getattr(response, "tool_calls", None):
+                return response
+        except (ValidationError, OutputParserException) as e:
+            error = e
+        repaired = repair_tool_call(response, self.validator.tools)
+        if repaired is not None:
+            metrics.incr("structured_output.repaired")
+            return repaired
+        if error is not None:
+            raise error
+        # No tool call and nothing to repair: handled by the caller as before
+        return response
+
+    def respond_streaming(self, state, on_partial_args):
+        """Like respond(), but streams the first attempt.
+
+        on_partial_args receives the partially parsed arguments of the first
+        tool call each time more of it arrives. Retries are not streamed.
+        """
+        try:
+            gathered = None
+            for chunk in self.runnable.stream(
+                    {"messages": state.get("messages", [])}):
+                gathered = chunk if gathered is None else gathered + chunk
+                calls = getattr(gathered, "tool_call_chunks", None)
+                if calls and calls[0].get("args"):
+                    partial_args = parse_partial_json(calls[0]["args"])
+                    if isinstance(partial_args, dict):
+                        on_partial_args(partial_args)
+            if gathered is not None:
+                return self.validated(gathered)
+        except (ValidationError, OutputParserException) as e:
+            logger.warning(f"Validation error on streamed attempt: {str(e)}")
+            metrics.incr("structured_output.retried")
+        except Exception as e:
+            logger.warning(f"Streaming response failed, retrying without: {e}")
+        return self.respond(state)
+
     def respond(self, state):
         original_messages = state.get("messages", [])
         working_messages = original_messages.copy()
@@ -245,13 +422,12 @@ class ResponderWithRetries:
             try:
                 # Try to generate a valid response
                 response = self.runnable.invoke({"messages": working_messages})
-                # Validate it
-                self.validator.invoke(response)
-                # If validation successful, return response
-                return response
-            except ValidationError as e:
+                # Validate it, fixing common formatting mistakes locally
+                return self.validated(response)
+            except (ValidationError, OutputParserException) as e:
                 logger.warning(
                     f"Validation error on attempt {attempt+1}: {str(e)}")
+                metrics.incr("structured_output.retried")
                 
                 # Don't modify the working messages on the last attempt
                 if attempt < self.max_retries - 1:
@@ -287,8 +463,9 @@ class ResponderWithRetries:
             response = self.runnable.invoke({"messages": final_messages})
             # Attempt validation one last time, but return even if invalid
             try:
-                self.validator.invoke(response)
-            except ValidationError as final_val_error:
+                response = self.validated(response)
+            except (ValidationError, OutputParserException) as final_val_error:
+                 metrics.incr("structured_output.unrecoverable")
                  logger.error(f"Final validation attempt failed: {final_val_error}")
             return response # Return the response even if final validation fails
         except Exception as final_error:
@@ -307,31 +484,111 @@ def entry_node(state: VaaniState) -> VaaniState:
     return state
 
 
-def summarizer_node(state: VaaniState) -> VaaniState:
-    """Summarizes the conversation if it exceeds 6 messages."""
+# Rolling summarization settings. Summaries are computed in the background and
+# folded into the state on a later turn, so no turn waits on the summarizer.
+SUMMARY_TRIGGER_MESSAGES = int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "6"))
+SUMMARY_KEEP_RECENT = max(1, int(os.getenv("SUMMARY_KEEP_RECENT", "2")))
+
+summary_executor = ThreadPoolExecutor(max_workers=2,
+                                      thread_name_prefix="vaani-summary")
+# Bounded, so threads that never come back do not keep their entry forever
+_pending_summaries = TTLCache(maxsize=1024, ttl=3600)
+_pending_summaries_lock = threading.Lock()
+
+
+def get_thread_id(config: Optional[RunnableConfig]) -> str:
+    """Returns the thread id from a runnable config."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("thread_id") or "default"
+
+
+def fold_summary(previous_summary: Optional[str],
+                 new_messages: List[BaseMessage]) -> str:
+    """Folds new messages into the previous running summary."""
+    summarizer = ChatGroq(model="llama-3.3-70b-versatile",
+                          api_key=groq_key,
+                          temperature=0.3)
+    conversation = "\n".join(
+        [f"{msg.type}: {msg.content}" for msg in new_messages])
+    prompt = ChatPromptTemplate.from_template("""
+    Update the running summary of a conversation with the new messages below.
+    Keep facts, preferences and open questions that later turns may rely on.
+    Current summary:
+    {summary}
+    New messages:
+    {conversation}
+    Updated summary:
+    """)
+    response = summarizer.invoke(
+        prompt.format(summary=previous_summary or "(empty)",
+                      conversation=conversation))
+    return response.content
+
+
+def _summarize_in_background(previous_summary: Optional[str],
+                             new_messages: List[BaseMessage], base_count: int,
+                             upto: int):
+    """Runs fold_summary and tags the result with the range it covers."""
+    return fold_summary(previous_summary, new_messages), base_count, upto
+
+
+def summarizer_node(state: VaaniState, config: RunnableConfig) -> VaaniState:
+    """Maintains an incremental conversation summary without blocking the turn.
+
+    Messages beyond the first ``summarized_count`` are not yet part of the
+    summary. Once more than SUMMARY_TRIGGER_MESSAGES of them pile up, a
+    background job folds all but the most recent ones into the summary. The
+    result is picked up by the first turn after the job finishes and is
+    persisted with that turn's checkpoint.
+    """
     try:
         messages = state["messages"]
-        if len(messages) <= 6:
-            logger.info("Skipping summarization as message count is <= 6")
-            return state
-        summarizer = ChatGroq(model="llama-3.3-70b-versatile",
-                              api_key=groq_key,
-                              temperature=0.3)
-        conversation = "\n".join(
-            [f"{msg.type}: {msg.content}" for msg in messages])
-        prompt = ChatPromptTemplate.from_template("""
-        Provide a concise summary of the following conversation:
-        {conversation}
-        Summary:
-        """)
-        response = summarizer.invoke(prompt.format(conversation=conversation))
-        state["summary"] = response.content
-        
-        # Keep only the most recent message (the user's latest query)
-        latest_message = messages[-1]
-        state["messages"] = [latest_message]
-        
-        logger.info("Conversation summarized successfully and messages list cleared except for the latest message")
+        thread_id = get_thread_id(config)
+        summary = state.get("summary")
+        summarized = state.get("summarized_count") or 0
+
+        if summarized > len(messages):
+            # The client sent a shorter history than we summarized, so the
+            # thread was reset and the old summary no longer applies.
+            logger.info("Message history shrank, resetting running summary")
+            summary, summarized = None, 0
+            with _pending_summaries_lock:
+                _pending_summaries.delete(thread_id)
+
+        with _pending_summaries_lock:
+            pending = _pending_summaries.get(thread_id)
+            if pending is not None and pending.done():
+                _pending_summaries.delete(thread_id)
+
+        if pending is not None and pending.done():
+            try:
+                new_summary, base_count, upto = pending.result()
+                # Only apply results computed on top of the summary we hold
+                if base_count == summarized and upto <= len(messages):
+                    summary, summarized = new_summary, upto
+                    logger.info(
+                        f"Folded background summary covering {upto} messages")
+            except Exception as summary_error:
+                logger.error(
+                    f"Background summarization failed: {summary_error}")
+            pending = None
+
+        if pending is None and len(
+                messages) - summarized > SUMMARY_TRIGGER_MESSAGES:
+            upto = len(messages) - SUMMARY_KEEP_RECENT
+            future = summary_executor.submit(_summarize_in_background, summary,
+                                             messages[summarized:upto],
+                                             summarized, upto)
+            with _pending_summaries_lock:
+                _pending_summaries.set(thread_id, future)
+            logger.info(
+                f"Scheduled background summarization of messages {summarized}-{upto}"
+            )
+
+        state["summary"] = summary
+        state["summarized_count"] = summarized
+        # Downstream nodes see the summary plus the messages not yet folded in
+        state["messages"] = messages[summarized:]
         return state
     except Exception as e:
         logger.error(f"Error in summarizer_node: {e}")
@@ -357,55 +614,137 @@ No explanation, just the agent name.
 """
 
 
-def orchestrator_node(state: VaaniState) -> VaaniState:
+# Routing labels the orchestrator may emit
+VALID_AGENTS = [
+    "rag_agent", "web_search_agent", "image_generator", "music_generator",
+    "default"
+]
+
+# Local intent classifier settings. Queries the classifier is unsure about
+# still go to the LLM router. Set ROUTING_LOG_PATH to log every decision
+# (including the raw query) for retraining; logging is off by default.
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "intent_model.json")
+INTENT_CONFIDENCE_THRESHOLD = float(
+    os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+ROUTING_LOG_PATH = os.getenv("ROUTING_LOG_PATH", "")
+
+# LLM routing decisions are cached per normalized query and routing state.
+# Set REDIS_URL (or ROUTING_CACHE_REDIS_URL) to share them across workers.
+ROUTING_CACHE_TTL = float(os.getenv("ROUTING_CACHE_TTL", "3600"))
+ROUTING_CACHE_SIZE = int(os.getenv("ROUTING_CACHE_SIZE", "2048"))
+routing_cache = make_cache(
+    "routing", ROUTING_CACHE_SIZE, ROUTING_CACHE_TTL,
+    os.getenv("ROUTING_CACHE_REDIS_URL") or os.getenv("REDIS_URL"))
+
+metrics.register_ratio("routing.llm_avoidance_rate", [
+    "routing.source.keyword", "routing.source.cache",
+    "routing.source.classifier"
+], "routing.decisions")
+metrics.register_ratio("routing.cache.hit_rate", "routing.cache.hit",
+                       ["routing.cache.hit", "routing.cache.miss"])
+
+_intent_classifier: Optional[IntentClassifier] = None
+_intent_classifier_loaded = False
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """Returns the trained intent classifier, or None if no model exists."""
+    global _intent_classifier, _intent_classifier_loaded
+    if not _intent_classifier_loaded:
+        _intent_classifier_loaded = True
+        if INTENT_MODEL_PATH and os.path.exists(INTENT_MODEL_PATH):
+            try:
+                _intent_classifier = IntentClassifier.load(INTENT_MODEL_PATH)
+                logger.info(
+                    f"Loaded intent classifier from {INTENT_MODEL_PATH}")
+            except Exception as e:
+                logger.error(f"Error loading intent classifier: {e}")
+        else:
+            logger.info(
+                "No intent classifier model found, routing falls back to the LLM")
+    return _intent_classifier
+
+
+def routing_cache_key(state: VaaniState, query: str) -> str:
+    """Builds the routing cache key from the query and routing-relevant state."""
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+    file_url = state["file_url"]
+    if is_image_file(file_url):
+        file_type = "image"
+    elif is_document_file(file_url):
+        file_type = os.path.splitext(file_url.lower())[1].lstrip(".")
+    else:
+        file_type = "none"
+    return f"{file_type}|{int(bool(state['indexed']))}|{normalized}"
+
+
+def select_agent(state: VaaniState, query: str, agent_name: str,
+                 source: str) -> VaaniState:
+    """Applies a routing decision to the state and records it."""
+    state["agent_name"] = agent_name
+    # Reset reflection counters when starting a new query
+    state["reflect_iterations"] = 0
+    state["reflection_data"] = None
+    record_routing_decision(state, query, agent_name, source)
+    return state
+
+
+def record_routing_decision(state: VaaniState, query: str, agent_name: str,
+                            source: str) -> None:
+    """Counts a routing decision and appends it to the training log."""
+    metrics.incr("routing.decisions")
+    metrics.incr(f"routing.source.{source}")
+    log_routing_decision(ROUTING_LOG_PATH, query, agent_name, source,
+                         is_document_file(state["file_url"]),
+                         bool(state["indexed"]))
+
+
+def orchestrator_node(state: VaaniState, config: RunnableConfig) -> VaaniState:
     """Routes the query to the appropriate agent based on state and query."""
     try:
-        # First, explicitly check for image generation requests
         current_query = state["messages"][-1].content if state[
             "messages"] else ""
 
-        # Check for explicit image generation terms
-        image_keywords = [
-            "create an image", "generate an image", "make an image", "draw",
-            "picture of", "image of"
-        ]
-        if any(keyword in current_query.lower() for keyword in image_keywords):
-            logger.info(
-                "Image generation keywords detected, routing to image_generator"
-            )
-            state["agent_name"] = "image_generator"
-            return state
-            
-        # Check for music generation requests
-        music_keywords = [
-            "create music", "generate music", "make music", "compose music",
-            "create a song", "generate a song", "make a song", "compose a song",
-            "create a melody", "generate a melody", "create a tune", "create a beat",
-            "make a soundtrack", "generate a soundtrack", "create some music",
-            "generate audio", "generate some music", "create audio"
-        ]
-        if any(keyword in current_query.lower() for keyword in music_keywords):
+        # Cheap keyword routing for explicit image, music and web search asks
+        keyword_match = get_keyword_router().route(current_query)
+        if keyword_match:
+            logger.info(f"Keyword router {keyword_match.explain()}")
+            return select_agent(state, current_query, keyword_match.agent,
+                                "keyword")
+
+        # Fetch document context while the rest of the routing runs
+        prefetch_document_chunks(state, config)
+
+        # Repeated questions reuse the previous model routing decision
+        cache_key = routing_cache_key(state, current_query)
+        cached_agent = routing_cache.get(cache_key)
+        if cached_agent in VALID_AGENTS:
+            metrics.incr("routing.cache.hit")
+            logger.info(f"Routing cache hit: {cached_agent}")
+            return select_agent(state, current_query, cached_agent, "cache")
+        metrics.incr("routing.cache.miss")
+
+        # Then the local classifier; only low-confidence queries reach the LLM
+        classifier = get_intent_classifier()
+        if classifier is not None:
+            with metrics.timer("routing.classifier_latency"):
+                agent_name, confidence = classifier.predict(
+                    current_query, is_document_file(state["file_url"]),
+                    bool(state["indexed"]))
+            if confidence >= INTENT_CONFIDENCE_THRESHOLD and agent_name in VALID_AGENTS:
+                logger.info(
+                    f"Intent classifier selected {agent_name} ({confidence:.2f})"
+                )
+                return select_agent(state, current_query, agent_name,
+                                    "classifier")
             logger.info(
-                "Music generation keywords detected, routing to music_generator"
+                f"Intent classifier unsure ({agent_name}, {confidence:.2f}), asking the LLM"
             )
-            state["agent_name"] = "music_generator"
-            return state
-
-        # Check for queries that likely need web search
-        web_search_indicators = [
-            "latest", "recent", "news", "current", "today", "ceo of", "who is",
-            "what is", "when did", "where is", "how to", "update on",
-            "where can i find", "website", "stock price", "price of",
-            "weather in", "events in"
-        ]
-        if any(indicator in current_query.lower()
-               for indicator in web_search_indicators):
-            logger.info(
-                "Web search indicators detected, routing to web_search_agent")
-            state["agent_name"] = "web_search_agent"
-            return state
 
-        # If no special case, proceed with LLM-based routing
+        # If no special case, proceed with LLM-based routing. Optionally start
+        # the default answer now so it is ready if the router picks default.
+        if SPECULATIVE_DEFAULT_AGENT:
+            start_default_speculation(state, config)
         orchestrator = ChatGroq(model="llama-3.3-70b-versatile",
                                 api_key=groq_key,
                                 temperature=0.2)
@@ -416,76 +755,316 @@ def orchestrator_node(state: VaaniState) -> VaaniState:
             indexed=state["indexed"],
             conversation_context=conversation_context,
             current_query=current_query)
-        response = orchestrator.invoke(prompt)
+        with metrics.timer("routing.llm_latency"):
+            response = orchestrator.invoke(prompt)
         agent_name = response.content.strip().lower()
-        valid_agents = [
-            "rag_agent", "web_search_agent", "image_generator", "music_generator", "default"
-        ]
 
         # Log the raw response for debugging
         logger.info(f"Orchestrator raw response: '{response.content}'")
 
-        if agent_name not in valid_agents:
+        if agent_name not in VALID_AGENTS:
             logger.warning(
                 f"Invalid agent name '{agent_name}', defaulting to 'default'")
             agent_name = "default"
+        else:
+            routing_cache.set(cache_key, agent_name)
 
         logger.info(f"Orchestrator selected agent: {agent_name}")
-        state["agent_name"] = agent_name
-
-        # Reset reflection counters when starting a new query
-        state["reflect_iterations"] = 0
-        state["reflection_data"] = None
-        return state
+        resolve_default_speculation(config, agent_name)
+        return select_agent(state, current_query, agent_name, "llm")
     except Exception as e:
         logger.error(f"Error in orchestrator_node: {e}")
         state["agent_name"] = "default"
+        resolve_default_speculation(config, "default")
         return state
 
 
-def indexor_node(state: VaaniState) -> VaaniState:
+def file_sha256(path: str) -> Optional[str]:
+    """Returns the SHA-256 of a local file, or None for remote files."""
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_document_indexed(client: QdrantClient,
+                        collection_name: str,
+                        document_hash: Optional[str],
+                        scope: Optional[Dict[str, str]] = None) -> bool:
+    """Checks whether the collection (or scope) holds exactly this document."""
+    if not document_hash or not client.collection_exists(collection_name):
+        return False
+    total = count_points(client, collection_name, scope)
+    matching = count_points(client,
+                            collection_name,
+                            scope,
+                            document_hash=document_hash)
+    return total > 0 and matching == total
+
+
+def get_document_embeddings() -> CachedEmbeddings:
+    """Returns the embeddings for documents and queries, backed by caches."""
+    return CachedEmbeddings(OpenAIEmbeddings(api_key=openai_key))
+
+
+def clear_document_index(client: QdrantClient, collection_name: str,
+                         scope: Optional[Dict[str, str]]) -> None:
+    """Removes an indexed document: its local index, its scope in a shared
+    collection, or the whole collection. Its BM25 index goes with it."""
+    delete_lexical_index(lexical_index_name(collection_name, scope))
+    invalidate_collection(collection_name, scope)
+    if is_local_index(collection_name):
+        delete_local_index(collection_name)
+    elif scope:
+        delete_scope(client, collection_name, scope)
+    else:
+        client.delete_collection(collection_name)
+
+
+def build_local_document_index(name: str,
+                               chunks: List[Any],
+                               embeddings: CachedEmbeddings,
+                               document_hash: Optional[str],
+                               progress=None) -> None:
+    """Embeds the chunks of a small document into a local index."""
+    started = time.perf_counter()
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = embeddings.embed_documents(texts) if texts else []
+    save_local_index(name,
+                     LocalVectorIndex.build(texts, vectors, document_hash))
+    result = IndexProgress(len(texts), 1, time.perf_counter() - started)
+    if progress is not None:
+        progress(result)
+    logger.info(f"Indexed {result.chunks} chunks into local index {name}")
+
+
+def index_document(file_url: str,
+                   collection_name: str,
+                   document_hash: Optional[str] = None,
+                   progress=None,
+                   scope: Optional[Dict[str, str]] = None) -> str:
+    """Indexes a document into a collection unless it is already there.
+
+    With a scope the document replaces only the points of that scope, and
+    the scope fields are stored in each chunk's metadata. Documents of at
+    most LOCAL_INDEX_MAX_CHUNKS chunks go to a local in-process index
+    instead. Returns the name of the collection or local index holding the
+    document (scoped by scope only if it is a collection). Raises on
+    failure after removing the partial index.
+    """
+    client = get_qdrant_client()
+    if document_hash is None:
+        document_hash = file_sha256(file_url)
+    local_name = local_index_name(collection_name, scope)
+
+    # An unchanged document is already fully indexed: skip the work
+    try:
+        local = load_local_index(local_name) if document_hash else None
+        if local is not None and local.document_hash == document_hash:
+            logger.info(f"Document unchanged, reusing local index {local_name}")
+            metrics.incr("indexing.unchanged_skipped")
+            return local_name
+        if is_document_indexed(client, collection_name, document_hash, scope):
+            logger.info(
+                f"Document unchanged, reusing collection {collection_name}")
+            metrics.incr("indexing.unchanged_skipped")
+            return collection_name
+    except Exception as check_err:
+        logger.warning(f"Error checking indexed document: {check_err}")
+
+    # Chunks embedded before (e.g. unchanged pages) come from the cache
+    embeddings = get_document_embeddings()
+    try:
+        if client.collection_exists(collection_name):
+            logger.info(f"Removing previous document from {collection_name}")
+            clear_document_index(client, collection_name, scope)
+    except Exception as collection_err:
+        logger.warning(f"Error checking collections: {collection_err}")
+
+    metadata = dict(scope or {})
+    if document_hash:
+        metadata["document_hash"] = document_hash
+    if scope:
+        metadata.setdefault(
+            "doc_id", document_hash
+            or hashlib.sha256(file_url.encode()).hexdigest())
+    # Pages are loaded, split, embedded and upserted as a stream, with
+    # bounded concurrent embedding batches overlapping Qdrant upserts
+    chunks = iter_document_chunks(file_url, metadata or None)
+    # The BM25 index for hybrid retrieval is built from the same stream
+    lexical = LexicalIndexBuilder() if HYBRID_RETRIEVAL else None
+    if lexical is not None:
+        chunks = lexical.observe(chunks)
+
+    # Small documents are searched in-process, without a network round trip
+    if local_index_enabled():
+        head = list(islice(chunks, LOCAL_INDEX_MAX_CHUNKS + 1))
+        if len(head) <= LOCAL_INDEX_MAX_CHUNKS:
+            build_local_document_index(local_name, head, embeddings,
+                                       document_hash, progress)
+            if lexical is not None:
+                lexical.save(lexical_index_name(local_name))
+            invalidate_collection(local_name)
+            return local_name
+        chunks = chain(head, chunks)
+
+    pipeline = IndexingPipeline(
+        client,
+        collection_name,
+        embeddings,
+        progress=progress,
+        payload_indexes=SCOPE_PAYLOAD_KEYS if scope else (),
+        id_namespace=f"{collection_name}/{sorted(scope.items())}"
+        if scope else None,
+        collection_options=collection_create_options())
+    try:
+        result = pipeline.index(chunks)
+    except Exception:
+        # A partial index must not pass for a complete one later
+        try:
+            clear_document_index(client, collection_name, scope)
+        except Exception as cleanup_err:
+            logger.warning(f"Error removing partial index: {cleanup_err}")
+        raise
+    logger.info(f"Indexed {result.chunks} chunks")
+    if lexical is not None:
+        lexical.save(lexical_index_name(collection_name, scope))
+    invalidate_collection(collection_name, scope)
+    # The document outgrew its local index, which stayed readable until now
+    delete_local_index(local_name)
+    delete_lexical_index(lexical_index_name(local_name))
+    return collection_name
+
+
+def document_target(document_hash: str):
+    """Collection and scope an uploaded document is indexed into."""
+    if shared_mode():
+        return QDRANT_SHARED_COLLECTION, {"doc_id": document_hash}
+    return document_collection_name(document_hash), None
+
+
+def index_registered_document(path: str,
+                              collection_name: str,
+                              document_hash: str,
+                              progress=None,
+                              scope: Optional[Dict[str, str]] = None) -> None:
+    """Indexes a document into its content-addressed location, once for all
+    threads, and records it in the document registry."""
+    location = index_document(path, collection_name, document_hash, progress,
+                              scope)
+    registry = get_document_registry()
+    registry.register(document_hash, location,
+                      None if is_local_index(location) else scope)
+    # Uploads nobody ever asked about are collected here too
+    release_documents(registry.unreferenced(DOC_REGISTRY_GC_AGE))
+
+
+# Documents uploaded through the API or the Streamlit app are indexed in the
+# background as soon as they arrive, keyed by their content hash.
+index_jobs = IndexJobManager(index_registered_document, document_target)
+
+
+def release_documents(document_hashes: List[str]) -> None:
+    """Deletes the vectors of documents that no thread references any more."""
+    if not document_hashes:
+        return
+    registry = get_document_registry()
+    client = get_qdrant_client()
+    for document_hash in document_hashes:
+        document = registry.forget(document_hash)
+        if document is None:
+            continue
+        index_jobs.discard(document_hash)
+        try:
+            clear_document_index(client, document.collection_name,
+                                 document.scope)
+            metrics.incr("doc_registry.collected")
+            logger.info(f"Deleted unreferenced document {document_hash[:12]}")
+        except Exception as e:
+            logger.warning(
+                f"Error deleting unreferenced document {document_hash[:12]}: {e}")
+
+
+def attach_document(state: VaaniState, thread_id: str,
+                    document_hash: str) -> bool:
+    """Points the thread at a registered document; O(1), no indexing."""
+    document, orphaned = get_document_registry().attach(
+        thread_id, document_hash)
+    if document is None:
+        return False
+    release_documents(orphaned)
+    state["indexed"] = True
+    state["collection_name"] = document.collection_name
+    state["document_scope"] = document.scope
+    logger.info(f"Thread attached to document {document_hash[:12]} in "
+                f"{document.collection_name}")
+    return True
+
+
+def indexor_node(state: VaaniState,
+                 config: RunnableConfig = None) -> VaaniState:
     """Indexes a document using Qdrant and updates the state."""
     try:
         file_url = state["file_url"]
         if not file_url or not is_document_file(file_url):
             logger.warning(f"Invalid file for indexing: {file_url}")
             return state
+        thread_id = get_thread_id(config)
+
+        # Use the index built in the background at upload time, waiting for
+        # it if it is still running
+        job = index_jobs.find(file_url)
+        if job is not None:
+            logger.info(f"Waiting for indexing job {job.job_id[:12]} "
+                        f"({job.status})")
+            with metrics.timer("index_jobs.wait_latency"):
+                succeeded = job.wait(INDEX_JOB_WAIT_TIMEOUT)
+            if succeeded and attach_document(state, thread_id, job.job_id):
+                metrics.incr("index_jobs.consumed")
+                return state
+            if not job.done.is_set():
+                # Indexing it again here would only compete with the job
+                logger.warning(f"Indexing job {job.job_id[:12]} is still "
+                               f"running after {INDEX_JOB_WAIT_TIMEOUT}s")
+                return state
+            logger.warning(f"Indexing job {job.job_id[:12]} is "
+                           f"{job.status}, indexing again")
+
+        # A local file is indexed once per content: attach to a known copy,
+        # or index it through a job that other threads can share
+        document_hash = file_sha256(file_url)
+        if document_hash:
+            if attach_document(state, thread_id, document_hash):
+                return state
+            job = index_jobs.submit(file_url, document_hash)
+            if job.wait(INDEX_JOB_WAIT_TIMEOUT) and attach_document(
+                    state, thread_id, document_hash):
+                return state
+            if not job.done.is_set():
+                logger.warning(f"Indexing job {job.job_id[:12]} is still "
+                               f"running after {INDEX_JOB_WAIT_TIMEOUT}s")
+                return state
+            logger.warning(f"Indexing job {job.job_id[:12]} is "
+                           f"{job.status}, indexing into the thread")
+
+        # Remote files (and failed jobs) are indexed into the thread itself
         logger.info(f"Indexing document: {file_url}")
-        config = state.get("configurable", {})
-        thread_id = config.get("thread_id", "default")
-        collection_name = f"vaani_{hashlib.md5(thread_id.encode()).hexdigest()[:16]}"
-        if file_url.endswith('.pdf'):
-            loader = PyPDFLoader(file_url)
-        elif file_url.endswith('.txt'):
-            loader = TextLoader(file_url)
-        elif file_url.endswith('.docx'):
-            loader = Docx2txtLoader(file_url)
+        if shared_mode():
+            collection_name = QDRANT_SHARED_COLLECTION
+            scope = {"thread_id": thread_id}
         else:
-            raise ValueError(f"Unsupported file type: {file_url}")
-        documents = loader.load()
-        logger.info(f"Loaded {len(documents)} documents from {file_url}")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000,
-                                                       chunk_overlap=100)
-        splits = text_splitter.split_documents(documents)
-        logger.info(f"Split into {len(splits)} chunks")
-        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-        embeddings = OpenAIEmbeddings(api_key=openai_key)
-        try:
-            collections = client.get_collections().collections
-            collection_names = [collection.name for collection in collections]
-            if collection_name in collection_names:
-                logger.info(
-                    f"Collection {collection_name} already exists, deleting it"
-                )
-                client.delete_collection(collection_name)
-        except Exception as collection_err:
-            logger.warning(f"Error checking collections: {collection_err}")
-        vector_store = QdrantVectorStore(client=client,
-                                         collection_name=collection_name,
-                                         embeddings=embeddings)
-        vector_store.add_documents(splits)
+            collection_name = thread_collection_name(thread_id)
+            scope = None
+        collection_name = index_document(file_url, collection_name, scope=scope)
+        if is_local_index(collection_name):
+            scope = None
+        release_documents(get_document_registry().detach(thread_id))
         state["indexed"] = True
         state["collection_name"] = collection_name
+        state["document_scope"] = scope
         logger.info(
             f"Document indexed successfully into collection {collection_name}")
         return state
@@ -494,14 +1073,130 @@ def indexor_node(state: VaaniState) -> VaaniState:
         return state
 
 
-def rag_agent_node(state: VaaniState) -> Dict[str, List[BaseMessage]]:
+def vector_search_chunks(collection_name: str,
+                         query: str,
+                         k: int = 3,
+                         embedding: Optional[List[float]] = None,
+                         scope: Optional[Dict[str, str]] = None) -> List[str]:
+    """Returns the k chunks whose embeddings are closest to the query."""
+    if embedding is None:
+        # Served from the query embedding cache when asked before
+        embedding = get_document_embeddings().embed_query(query)
+    if is_local_index(collection_name):
+        index = load_local_index(collection_name)
+        if index is None:
+            raise ValueError(f"Local index {collection_name} not found")
+        with metrics.timer("local_index.search_latency"):
+            return index.search_texts(embedding, k)
+    # Searched through the shared async client (gRPC when configured)
+    return search_payloads_sync(collection_name, embedding, k,
+                                scope_filter(scope))
+
+
+def retrieve_document_chunks(collection_name: str,
+                             query: str,
+                             k: int = 3,
+                             embedding: Optional[List[float]] = None,
+                             scope: Optional[Dict[str, str]] = None
+                             ) -> List[str]:
+    """Returns the k document chunks most relevant to the query.
+
+    Vector search is fused with the document's BM25 index when hybrid
+    retrieval is on and the index exists (see hybrid.py). Results are
+    cached until the document is re-indexed.
+    """
+    def retrieve() -> List[str]:
+        if not HYBRID_RETRIEVAL:
+            return vector_search_chunks(collection_name, query, k, embedding,
+                                        scope)
+        lexical = load_lexical_index(lexical_index_name(collection_name,
+                                                        scope))
+        retriever = HybridRetriever(
+            lambda text, count: vector_search_chunks(
+                collection_name, text, count, embedding, scope),
+            lexical,
+            reranker=get_reranker())
+        return retriever.retrieve(query, HYBRID_TOP_K or k)
+
+    return cached_retrieval(collection_name, scope, query, k, retrieve)
+
+
+# Document retrieval started by the orchestrator while it is still routing,
+# picked up by the agent node that answers the turn.
+retrieval_prefetcher = Prefetcher("retrieval")
+
+
+def retrieval_key(config: Optional[RunnableConfig],
+                  collection_name: str,
+                  query: str,
+                  scope: Optional[Dict[str, str]] = None) -> tuple:
+    """Key of a prefetched retrieval for this thread, scope and query."""
+    return (get_thread_id(config), collection_name,
+            tuple(sorted((scope or {}).items())), query)
+
+
+def prefetch_document_chunks(state: VaaniState,
+                             config: Optional[RunnableConfig]) -> None:
+    """Starts retrieving document context for the current query."""
+    if not (state["indexed"] and state["collection_name"]
+            and state["messages"]):
+        return
+    query = state["messages"][-1].content
+    collection_name = state["collection_name"]
+    scope = state.get("document_scope")
+    retrieval_prefetcher.start(
+        retrieval_key(config, collection_name, query, scope),
+        lambda: retrieve_document_chunks(collection_name, query, scope=scope))
+
+
+def get_document_chunks(state: VaaniState,
+                        config: Optional[RunnableConfig] = None,
+                        embedding: Optional[List[float]] = None) -> List[str]:
+    """Returns document context for the current query, prefetched if possible."""
+    query = state["messages"][-1].content
+    collection_name = state["collection_name"]
+    scope = state.get("document_scope")
+    chunks = retrieval_prefetcher.take(
+        retrieval_key(config, collection_name, query, scope)) if config else None
+    if chunks is None:
+        chunks = retrieve_document_chunks(collection_name,
+                                          query,
+                                          embedding=embedding,
+                                          scope=scope)
+    return chunks
+
+
+def rag_agent_node(state: VaaniState,
+                   config: RunnableConfig = None
+                   ) -> Dict[str, List[BaseMessage]]:
     """Handles document-based queries, indexing if necessary, using the selected model."""
     try:
+        query_embedding = None
         if not state["indexed"] and state["file_url"] and is_document_file(
                 state["file_url"]):
             logger.info("Document needs indexing, calling indexor_node")
-            state = indexor_node(state)
+            # Embed the query while the document is being indexed
+            embeddings = get_document_embeddings()
+            query = state["messages"][-1].content
+            results = gather(
+                {
+                    "index": lambda: indexor_node(state, config),
+                    "embedding": lambda: embeddings.embed_query(query)
+                },
+                name="rag_indexing")
+            state = results["index"] or state
+            query_embedding = results["embedding"]
             if not state["indexed"]:
+                job = index_jobs.find(state["file_url"])
+                if job is not None and not job.done.is_set():
+                    return {
+                        "messages": [
+                            AIMessage(
+                                content=
+                                "Your document is still being indexed. Please ask again in a moment."
+                            )
+                        ]
+                    }
                 return {
                     "messages": [
                         AIMessage(
@@ -522,17 +1217,9 @@ def rag_agent_node(state: VaaniState) -> Dict[str, List[BaseMessage]]:
                 logger.info(
                     f"Retrieving context from indexed document in collection {state['collection_name']}"
                 )
-                client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-                embeddings = OpenAIEmbeddings(api_key=openai_key)
-                vector_store = QdrantVectorStore(
-                    client=client,
-                    collection_name=state["collection_name"],
-                    embeddings=embeddings)
-                retrieved_docs = vector_store.similarity_search(current_query,
-                                                                k=3)
-                context = "\n\n".join(
-                    [doc.page_content for doc in retrieved_docs])
-                logger.info(f"Retrieved {len(retrieved_docs)} document chunks")
+                chunks = get_document_chunks(state, config, query_embedding)
+                context = "\n\n".join(chunks)
+                logger.info(f"Retrieved {len(chunks)} document chunks")
             except Exception as retrieval_error:
                 logger.error(
                     f"Error retrieving from vector store: {retrieval_error}")
@@ -566,8 +1253,11 @@ def rag_agent_node(state: VaaniState) -> Dict[str, List[BaseMessage]]:
 
 
 def web_search_agent_node(
-        state: VaaniState) -> Dict[str, Union[List[BaseMessage], VaaniState]]:
+        state: VaaniState,
+        config: RunnableConfig = None
+) -> Dict[str, Union[List[BaseMessage], VaaniState]]:
     """Enhanced web search agent using Reflexion for iterative improvement."""
+    started_at = time.monotonic()
     try:
         file_url = state["file_url"]
         current_query = state["messages"][-1].content
@@ -634,9 +1324,48 @@ Respond using the InitialResearch function, ensuring **ALL fields**, especially
             first_responder = ResponderWithRetries(
                 runnable=initial_answer_chain, validator=validator)
 
+            def fetch_exa_query(query):
+                logger.info(f"Searching for: {query}")
+                results = exa_search(query, num_results=3)
+                if not results:
+                    logger.warning(f"No results found for query: {query}")
+                    return []
+                logger.info(f"Got {len(results)} results for query: {query}")
+                return [{
+                    "query": query,
+                    "url": r["url"],
+                    "title": r["title"],
+                    "content": r["text"]
+                } for r in results]
+
+            # Searches started while the initial answer is still streaming
+            prefetched = {}
+            streamed_answer = []
+
+            def on_partial_args(partial_args):
+                # Stream the draft answer as it is generated
+                answer = partial_args.get("answer")
+                sent = "".join(streamed_answer)
+                if isinstance(answer, str) and answer.startswith(sent) \
+                        and len(answer) > len(sent):
+                    streamed_answer.append(answer[len(sent):])
+                    emit(config, {
+                        "type": "chunk",
+                        "chunk": answer[len(sent):]
+                    })
+                # Every query but the last is complete once it is parsed
+                queries = partial_args.get("search_queries")
+                if isinstance(queries, list):
+                    for query in queries[:-1]:
+                        key = normalize_query(query) if isinstance(
+                            query, str) else ""
+                        if key and key not in prefetched:
+                            prefetched[key] = prefetch_executor.submit(
+                                fetch_exa_query, query)
+
             # Generate initial response
             try:
-                initial_response = first_responder.respond({
+                initial_response = first_responder.respond_streaming({
                     "messages": [
                         SystemMessage(
                             content=
@@ -644,7 +1373,7 @@ Respond using the InitialResearch function, ensuring **ALL fields**, especially
                         ),
                         HumanMessage(content=current_query)
                     ]
-                })
+                }, on_partial_args)
 
                 logger.info("Successfully generated initial response")
 
@@ -684,73 +1413,34 @@ Respond using the InitialResearch function, ensuring **ALL fields**, especially
                         f"Generated {len(search_queries)} search queries: {search_queries}"
                     )
 
-                    # Execute web search
-                    exa_client = Exa(api_key=exa_key)
-                    search_results = []
-
-                    # Add debug logging for search process
-                    logger.info(f"Performing web search with Exa API")
-
-                    for query in search_queries:
-                        try:
-                            logger.info(f"Searching for: {query}")
-                            results = exa_client.search(query,
-                                                        use_autoprompt=True,
-                                                        num_results=3)
-
-                            if not results or not results.results:
-                                logger.warning(
-                                    f"No results found for query: {query}")
-                                continue
-
-                            logger.info(
-                                f"Got {len(results.results)} results for query: {query}"
-                            )
-
-                            for r in results.results:
-                                search_results.append({
-                                    "query": query,
-                                    "url": r.url,
-                                    "title": r.title,
-                                    "content": r.text[:800]
-                                })
-                        except Exception as query_error:
-                            logger.error(
-                                f"Error searching for query '{query}': {query_error}"
-                            )
-                            continue
-
-                    # If we couldn't get any search results after trying all queries
-                    if not search_results:
-                        logger.warning(
-                            "No search results found for any queries")
-                        fallback_answer = tool_args.get(
-                            "answer",
-                            "I don't have enough external information to fully answer your question. Here's what I know based on my training:"
-                        )
-                        return {
-                            "messages": [AIMessage(content=fallback_answer)]
+                    def search_round(queries):
+                        # One concurrent Exa call per query, merged in query
+                        # order to keep prompts stable
+                        logger.info(f"Performing web search with Exa API")
+                        round_results = []
+                        in_flight = {
+                            query: prefetched[normalize_query(query)]
+                            for query in queries
+                            if normalize_query(query) in prefetched
                         }
+                        for query_results in fan_out(queries,
+                                                     fetch_exa_query,
+                                                     in_flight=in_flight):
+                            if query_results:
+                                round_results.extend(query_results)
+                        return round_results
 
                     # Store reflection data in state
                     state["reflection_data"] = {
                         "original_query": current_query,
                         "initial_response":
                         initial_response.tool_calls[0]["args"],
-                        "search_results": search_results,
+                        "search_results": [],
                         "final_answer": None
                     }
 
-                    # Increment reflection counter
-                    state["reflect_iterations"] = 1
-
-                    # Format search results for next step
-                    search_context = "\n\n".join([
-                        f"Source: {r['url']}\nTitle: {r['title']}\nQuery: '{r['query']}'\nContent: {r['content']}"
-                        for r in search_results
-                    ])
-
-                    # Prepare revision prompt
+                    # Prepare revision prompt. The messages placeholder
+                    # carries the responder's correction hints on retries.
                     revision_prompt = ChatPromptTemplate.from_messages([
                         ("system",
                          """You are an expert researcher and web search specialist.
@@ -772,72 +1462,88 @@ Consider the conversation history to provide context-appropriate responses.
                          ), ("assistant", "{initial_response}"),
                         ("user",
                          "Here are search results based on your queries:\n\n{search_results}\n\nPlease revise your answer based on this information using the RevisedResearch function."
-                         )
+                         ),
+                        MessagesPlaceholder(variable_name="messages")
                     ]).partial(
                         time=lambda: datetime.datetime.now().isoformat(),
                         conversation_context=conversation_context,
-                        question=current_query,
-                        initial_response=json.dumps(tool_args),
-                        search_results=search_context)
-
-                    # Set up revision chain
-                    revision_chain = revision_prompt | llm.bind_tools(
-                        tools=[RevisedResearch])
+                        question=current_query)
+                    revision_llm = llm.bind_tools(tools=[RevisedResearch])
                     revision_validator = PydanticToolsParser(
                         tools=[RevisedResearch])
-                    revisor = ResponderWithRetries(
-                        runnable=revision_chain, validator=revision_validator)
-
-                    # Generate revised response
-                    revised_response = revisor.invoke({})
-
-                    # Extract final answer and store
-                    if hasattr(revised_response,
-                               'tool_calls') and revised_response.tool_calls:
-                        tool_args = revised_response.tool_calls[0]["args"]
-                        if isinstance(tool_args, str):
-                            tool_args = json.loads(tool_args)
-                        final_answer = tool_args.get("answer",
-                                                     "") + "\n\nReferences:\n"
-                        for i, ref in enumerate(tool_args.get(
-                                "references", [])):
-                            final_answer += f"[{i+1}] {ref}\n"
-
-                        # Format the final answer for display
-                        state["reflection_data"]["final_answer"] = final_answer
-
-                        # For MAX_ITERATIONS control, we'll keep a counter
-                        MAX_ITERATIONS = 2  # Limit to 2 rounds for performance
-
-                        if state["reflect_iterations"] < MAX_ITERATIONS:
-                            # If more iterations needed, extract new search queries
-                            new_queries = tool_args.get("search_queries", [])
-                            if new_queries:
-                                # Could continue the process, but for simplicity we'll just return the current answer
-                                logger.info(
-                                    f"Completed web search reflection after {state['reflect_iterations']} iterations"
-                                )
-                                return {
-                                    "messages":
-                                    [AIMessage(content=final_answer)]
-                                }
-
-                        # Return final answer
-                        return {"messages": [AIMessage(content=final_answer)]}
-                    else:
-                        # Fallback if structured response fails
+                    unstructured_answers = []
+
+                    def revise(previous_args, results, round_number):
+                        # Drop pages returned by more than one query, then
+                        # keep only the passages most relevant to the question
+                        queries = list(dict.fromkeys(r["query"] for r in results))
+                        selected = select_passages(
+                            dedupe_results(results),
+                            " ".join([current_query] + queries),
+                            text_key="content")
+                        if not selected:
+                            return None
+                        state["reflection_data"]["search_results"] = selected
+                        search_context = "\n\n".join([
+                            f"Source: {r['url']}\nTitle: {r['title']}\nQuery: '{r['query']}'\nContent: {r['content']}"
+                            for r in selected
+                        ])
+                        revisor = ResponderWithRetries(
+                            runnable=revision_prompt.partial(
+                                initial_response=json.dumps(previous_args),
+                                search_results=search_context) | revision_llm,
+                            validator=revision_validator)
+                        revised_response = revisor.respond({"messages": []})
+                        if not getattr(revised_response, "tool_calls", None):
+                            logger.warning(
+                                "Failed to get structured response from revisor")
+                            unstructured_answers.append(
+                                getattr(revised_response, "content", ""))
+                            return None
+                        revised_args = revised_response.tool_calls[0]["args"]
+                        if isinstance(revised_args, str):
+                            revised_args = json.loads(revised_args)
+                        return revised_args
+
+                    def announce_round(round_number):
+                        emit(config, {
+                            "type": "status",
+                            "status": f"Searching the web (round {round_number})..."
+                        })
+
+                    # Search and revise until the answer is good enough or
+                    # the latency budget runs out
+                    reflexion = ReflexionLoop(search_round, revise).run(
+                        tool_args, started_at=started_at, on_round=announce_round)
+                    state["reflect_iterations"] = reflexion.rounds
+
+                    if reflexion.rounds == 0:
+                        if unstructured_answers and unstructured_answers[-1]:
+                            return {
+                                "messages":
+                                [AIMessage(content=unstructured_answers[-1])]
+                            }
                         logger.warning(
-                            "Failed to get structured response from revisor")
+                            "No search results found for any queries")
+                        fallback_answer = tool_args.get(
+                            "answer",
+                            "I don't have enough external information to fully answer your question. Here's what I know based on my training:"
+                        )
                         return {
-                            "messages": [
-                                AIMessage(
-                                    content=revised_response.content if
-                                    hasattr(revised_response, 'content') else
-                                    "I couldn't find a satisfactory answer to your question after searching the web."
-                                )
-                            ]
+                            "messages": [AIMessage(content=fallback_answer)]
                         }
 
+                    final_args = reflexion.args
+                    final_answer = final_args.get("answer",
+                                                  "") + "\n\nReferences:\n"
+                    for i, ref in enumerate(final_args.get("references", [])):
+                        final_answer += f"[{i+1}] {ref}\n"
+
+                    state["reflection_data"]["final_answer"] = final_answer
+                    # The revised answer replaces the streamed draft
+                    emit(config, {"type": "replace", "content": final_answer})
+                    return {"messages": [AIMessage(content=final_answer)]}
+
                 except Exception as search_error:
                     logger.error(
                         f"Error in web search process: {search_error}",
@@ -931,16 +1637,10 @@ def tavily_web_search_agent_node(state: VaaniState) -> Dict[str, List[BaseMessag
         logger.info(f"Performing Tavily search for: {current_query}")
         
         # Initialize search client with increased max_results
-        tavily_search = TavilySearchResults(
-            max_results=8,  # Increased from default
-            api_key=tavily_api_key,
-            include_raw_content=True,
-            include_domains=[]
-        )
-        
-        # Perform direct search
+        # Perform direct search (increased max_results, served from cache
+        # when the same query was searched recently)
         try:
-            search_results = tavily_search.invoke({"query": current_query})
+            search_results = tavily_search(current_query, max_results=8)
             
             if not search_results or len(search_results) == 0:
                 logger.warning("No search results found")
@@ -950,14 +1650,23 @@ def tavily_web_search_agent_node(state: VaaniState) -> Dict[str, List[BaseMessag
                     ]
                 }
                 
-            # Format search context for the LLM with increased excerpt length
+            # Rank passages across all results and keep the best within the
+            # context budget; raw page content is used when it was fetched
+            search_results = select_passages(dedupe_results([{
+                **result, "content":
+                result.get("raw_content") or result.get("content")
+                or result.get("text", "")
+            } for result in search_results if isinstance(result, dict)]),
+                                             current_query,
+                                             text_key="content")
+
+            # Format search context for the LLM
             formatted_results = []
             for i, result in enumerate(search_results):
                 if isinstance(result, dict):
                     url = result.get("url", "")
                     title = result.get("title", f"Result {i+1}")
-                    # Increased content length for better context
-                    content = result.get("content", result.get("text", ""))[:1200]
+                    content = result.get("content", "")
                     
                     if url and content:
                         formatted_results.append(f"[Result {i+1}]\nTitle: {title}\nURL: {url}\nContent: {content}\n")
@@ -1139,77 +1848,167 @@ def image_generator_agent_node(
         return {"messages": [AIMessage(content=response)]}
 
 
-def default_agent_node(state: VaaniState) -> Dict[str, List[BaseMessage]]:
+def message_text(message: Any) -> str:
+    """Returns the text of a message or message chunk."""
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content)
+    return ""
+
+
+def stream_answer(llm, prompt: Any, config: Optional[RunnableConfig]) -> str:
+    """Streams an answer to the client's event channel and returns its text."""
+    parts = []
+    for chunk in llm.stream(prompt):
+        text = message_text(chunk)
+        if text:
+            parts.append(text)
+            emit(config, {"type": "chunk", "chunk": text})
+    return "".join(parts)
+
+
+def build_default_prompt(state: VaaniState,
+                         config: Optional[RunnableConfig] = None) -> str:
+    """Builds the default agent prompt, with document context if indexed."""
+    # Get the current query and build conversation context
+    current_query = state["messages"][-1].content
+    logger.info(f"Processing query: {current_query[:50]}...")
+    conversation_context = build_conversation_context(state)
+    logger.info(f"Built conversation context of length: {len(conversation_context)}")
+
+    # Retrieve context from indexed document if available
+    context = ""
+    if state["indexed"] and state["collection_name"]:
+        try:
+            logger.info("Retrieving context for default agent")
+            chunks = get_document_chunks(state, config)
+            context = "\n\n".join(chunks)
+            logger.info(f"Retrieved {len(chunks)} document chunks")
+        except Exception as context_error:
+            logger.error(f"Error retrieving context: {context_error}",
+                         exc_info=True)
+
+    # Create the prompt template
+    prompt_template = """
+    Conversation history:
+    {conversation_context}
+    
+    {context_section}
+    
+    Question: {question}
+    Answer:
+    """
+
+    # Add context section if available
+    context_section = f"""
+    Based on the conversation history and document context, answer the question.
+    Document context:
+    {context}
+    """ if context else "Based on the conversation history, answer the question."
+
+    prompt = ChatPromptTemplate.from_template(prompt_template)
+    return prompt.format(conversation_context=conversation_context,
+                         context_section=context_section,
+                         question=current_query)
+
+
+# Opt-in speculative execution: start the default agent's answer while the
+# LLM router is still deciding, and keep it only if the router picks default.
+SPECULATIVE_DEFAULT_AGENT = os.getenv("SPECULATIVE_DEFAULT_AGENT",
+                                      "false").lower() in ("1", "true", "yes")
+speculation_executor = ThreadPoolExecutor(max_workers=4,
+                                          thread_name_prefix="vaani-speculative")
+_speculations: Dict[str, SpeculativeStream] = {}
+_speculations_lock = threading.Lock()
+
+
+def start_default_speculation(state: VaaniState,
+                              config: RunnableConfig) -> SpeculativeStream:
+    """Starts generating the default agent's answer in the background."""
+    snapshot = dict(state)
+
+    def produce():
+        llm = get_model(snapshot["model_name"])
+        for chunk in llm.stream(build_default_prompt(snapshot, config)):
+            yield message_text(chunk)
+
+    speculation = SpeculativeStream(
+        speculation_executor,
+        produce,
+        lambda text: emit(config, {"type": "chunk", "chunk": text}),
+        key=state["messages"][-1].content)
+    with _speculations_lock:
+        _speculations[get_thread_id(config)] = speculation
+    return speculation
+
+
+def resolve_default_speculation(config: RunnableConfig,
+                                agent_name: str) -> None:
+    """Commits the pending speculation if routed to default, else cancels it."""
+    with _speculations_lock:
+        speculation = _speculations.get(get_thread_id(config))
+    if speculation is None:
+        return
+    if agent_name == "default":
+        speculation.commit()
+    else:
+        with _speculations_lock:
+            _speculations.pop(get_thread_id(config), None)
+        speculation.cancel()
+        logger.info(f"Cancelled speculative default answer, routed to {agent_name}")
+
+
+def claim_default_speculation(config: RunnableConfig,
+                              query: str) -> Optional[SpeculativeStream]:
+    """Takes the committed speculation for this thread and query, if any."""
+    with _speculations_lock:
+        speculation = _speculations.pop(get_thread_id(config), None)
+    if speculation is not None and speculation.key != query:
+        speculation.cancel()
+        return None
+    return speculation
+
+
+def default_agent_node(state: VaaniState,
+                       config: RunnableConfig) -> Dict[str, List[BaseMessage]]:
     """Handles general queries or RAG-based Q&A when a document is indexed."""
     try:
         logger.info("Starting default_agent_node processing")
-        
+        current_query = state["messages"][-1].content
+
+        # Reuse the answer the orchestrator started speculatively
+        speculation = claim_default_speculation(config, current_query)
+        if speculation is not None:
+            content = speculation.result()
+            if content:
+                logger.info("Using speculative default answer")
+                return {"messages": [AIMessage(content=content)]}
+            if speculation.streamed:
+                # Clear the partial answer before streaming a fresh one
+                emit(config, {"type": "replace", "content": ""})
+
         # Get the appropriate model
         llm = get_model(state["model_name"])
         logger.info(f"Using model: {state['model_name']}")
-        
-        # Get the current query and build conversation context
-        current_query = state["messages"][-1].content
-        logger.info(f"Processing query: {current_query[:50]}...")
-        conversation_context = build_conversation_context(state)
-        logger.info(f"Built conversation context of length: {len(conversation_context)}")
-        
-        # Retrieve context from indexed document if available
-        context = ""
-        if state["indexed"] and state["collection_name"]:
-            try:
-                logger.info("Retrieving context for default agent")
-                client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-                embeddings = OpenAIEmbeddings(api_key=openai_key)
-                vector_store = QdrantVectorStore(
-                    client=client,
-                    collection_name=state["collection_name"],
-                    embeddings=embeddings)
-                retrieved_docs = vector_store.similarity_search(current_query,
-                                                                k=3)
-                context = "\n\n".join(
-                    [doc.page_content for doc in retrieved_docs])
-                logger.info(f"Retrieved {len(retrieved_docs)} document chunks")
-            except Exception as context_error:
-                logger.error(f"Error retrieving context: {context_error}",
-                             exc_info=True)
-        
-        # Create the prompt template
-        prompt_template = """
-        Conversation history:
-        {conversation_context}
-        
-        {context_section}
-        
-        Question: {question}
-        Answer:
-        """
-        
-        # Add context section if available
-        context_section = f"""
-        Based on the conversation history and document context, answer the question.
-        Document context:
-        {context}
-        """ if context else "Based on the conversation history, answer the question."
-        
-        # Create the prompt and generate a response
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        response = llm.invoke(
-            prompt.format(conversation_context=conversation_context,
-                          context_section=context_section,
-                          question=current_query))
-        
-        return {"messages": [AIMessage(content=response.content)]}
+
+        # Create the prompt and stream the response
+        content = stream_answer(llm, build_default_prompt(state, config), config)
+        return {"messages": [AIMessage(content=content)]}
     except Exception as e:
         logger.error(f"Error in default_agent_node: {e}", exc_info=True)
         error_response = "I encountered an error while processing your query. Please try again with a different question."
         return {"messages": [AIMessage(content=error_response)]}
 
 
-def deep_research_agent_node(
-        state: VaaniState) -> Dict[str, List[BaseMessage]]:
+def deep_research_agent_node(state: VaaniState,
+                             config: RunnableConfig = None
+                             ) -> Dict[str, List[BaseMessage]]:
     """Handle deep research on a query."""
-    logger.info("Deep research requested - using placeholder implementation")
+    logger.info("Deep research requested")
     try:
         # Get the current query and build conversation context
         current_query = state["messages"][-1].content
@@ -1217,79 +2016,30 @@ def deep_research_agent_node(
         
         # Get the appropriate model
         llm = get_model(state["model_name"])
-        
-        # Perform web search
-        web_content = ""
-        try:
-            logger.info("Performing deep web search")
-            exa_client = Exa(api_key=exa_key)
-            search_results = exa_client.search(current_query,
-                                               use_autoprompt=True,
-                                               num_results=5)
-            web_content = "\n\n".join([
-                f"Source: {r.url}\nTitle: {r.title}\nExcerpt: {r.text[:800]}..."
-                for r in search_results.results
-            ])
-            logger.info(
-                f"Retrieved {len(search_results.results)} deep search results")
-        except Exception as search_error:
-            logger.error(f"Error in deep web search: {search_error}")
-            web_content = "Web search failed, proceeding with model's knowledge only."
-        
-        # Retrieve RAG context if available
-        rag_context = ""
+
+        # Document retrieval is only available once the upload is indexed
+        retrieve_documents = None
         if state["indexed"] and state["collection_name"]:
-            try:
-                logger.info("Retrieving RAG context for deep research")
-                client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-                embeddings = OpenAIEmbeddings(api_key=openai_key)
-                vector_store = QdrantVectorStore(
-                    client=client,
-                    collection_name=state["collection_name"],
-                    embeddings=embeddings)
-                retrieved_docs = vector_store.similarity_search(current_query,
-                                                                k=5)
-                rag_context = "\n\n".join(
-                    [doc.page_content for doc in retrieved_docs])
-                logger.info(
-                    f"Retrieved {len(retrieved_docs)} document chunks for deep research"
-                )
-            except Exception as rag_error:
-                logger.error(
-                    f"Error retrieving RAG context for deep research: {rag_error}"
-                )
-        
-        # Create the prompt
-        prompt = ChatPromptTemplate.from_template("""
-        You are performing deep research on a topic. Provide a comprehensive, well-structured answer.
-        
-        Conversation history:
-        {conversation_context}
-        
-        Research question: {question}
-        
-        {web_section}
+            retrieve_documents = functools.partial(
+                retrieve_document_chunks,
+                state["collection_name"],
+                scope=state.get("document_scope"))
+
+        pipeline = DeepResearchPipeline(
+            llm,
+            web_search=lambda query: exa_search(query, num_results=5),
+            retrieve_documents=retrieve_documents,
+            progress=lambda status: emit(config, {
+                "type": "status",
+                "status": status
+            }),
+            on_chunk=lambda text: emit(config, {
+                "type": "chunk",
+                "chunk": text
+            }))
+        report = pipeline.run(current_query, conversation_context)
         
-        {rag_section}
-        
-        Provide a detailed, well-structured answer that synthesizes information from all available sources.
-        Include citations or references where appropriate.
-        Organize your response with clear sections and highlight key findings.
-        """)
-        
-        # Add web and RAG sections if available
-        web_section = f"Web search findings:\n{web_content}" if web_content else "No web search results available."
-        rag_section = f"Document context:\n{rag_context}" if rag_context else "No document context available."
-        
-        # Generate response
-        research_llm = get_model(state["model_name"])
-        response = research_llm.invoke(
-            prompt.format(conversation_context=conversation_context,
-                          question=current_query,
-                          web_section=web_section,
-                          rag_section=rag_section))
-        
-        return {"messages": [AIMessage(content=response.content)]}
+        return {"messages": [AIMessage(content=report)]}
     except Exception as e:
         logger.error(f"Error in deep_research_agent_node: {e}", exc_info=True)
         error_response = "I encountered an error while performing deep research. Please try again with a more specific query."
@@ -1462,6 +2212,22 @@ def music_generator_agent_node(state: VaaniState) -> Dict[str, List[BaseMessage]
         }
 
 
+# "tavily" (default) answers from one Tavily search; "reflexion" runs the
+# iterative Exa-based Reflexion agent within REFLEXION_LATENCY_BUDGET.
+WEB_SEARCH_ENGINE = os.getenv("WEB_SEARCH_ENGINE", "tavily").lower()
+
+
+def select_web_search_node():
+    """Returns the node implementation used for web search queries."""
+    if WEB_SEARCH_ENGINE == "reflexion" and exa_key:
+        return web_search_agent_node
+    if tavily_available and tavily_api_key:
+        return tavily_web_search_agent_node
+    if exa_key:
+        return web_search_agent_node
+    return default_agent_node
+
+
 # Create and compile the graph
 def create_graph():
     """Creates and compiles the LangGraph with proper error handling."""
@@ -1471,7 +2237,7 @@ def create_graph():
         graph.add_node("summarizer", summarizer_node)
         graph.add_node("orchestrator", orchestrator_node)
         graph.add_node("rag_agent", rag_agent_node)
-        graph.add_node("web_search_agent", tavily_web_search_agent_node if tavily_available and tavily_api_key else default_agent_node)
+        graph.add_node("web_search_agent", select_web_search_node())
         graph.add_node("image_generator", image_generator_agent_node)
         graph.add_node("default_agent", default_agent_node)
         graph.add_node("deep_research", deep_research_agent_node)
@@ -2,7 +2,7 @@ import streamlit as st
 import os
 import uuid
 import time
-from agent import graph, VaaniState
+from agent import graph, VaaniState, index_jobs, is_document_file
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 import logging
 from typing import List, Dict, Any, Optional
@@ -44,6 +44,14 @@ def handle_file_upload(uploaded_file):
             f.write(uploaded_file.getbuffer())
         abs_path = os.path.abspath(file_path)
         logger.info(f"File uploaded: {uploaded_file.name} -> {abs_path}")
+        # Index documents in the background while the user types a question;
+        # re-uploads of the same content reuse the job
+        if is_document_file(abs_path):
+            try:
+                job = index_jobs.submit(abs_path)
+                logger.info(f"Indexing job {job.job_id[:12]} is {job.status}")
+            except Exception as e:
+                logger.warning(f"Could not start background indexing: {e}")
         return abs_path
     except Exception as e:
         logger.error(f"Error handling file upload: {e}")
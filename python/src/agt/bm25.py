@@ -0,0 +1,124 @@
+"""Okapi BM25 scoring over in-memory corpora.
+
+An inverted index (term -> postings of document index and term frequency)
+is built up front, so a query only touches the documents that contain one
+of its terms.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in
+into is it its me my no not of on or our so than that the their them then
+there these they this to was we were what when where which who why will with
+you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cases text and returns its word tokens minus stopwords."""
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class BM25:
+    """BM25 index over a list of tokenized documents."""
+
+    def __init__(self,
+                 corpus: Sequence[Sequence[str]],
+                 k1: float = 1.5,
+                 b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._index([Counter(tokens) for tokens in corpus])
+
+    @classmethod
+    def from_term_freqs(cls,
+                        term_freqs: Sequence[Mapping[str, int]],
+                        k1: float = 1.5,
+                        b: float = 0.75) -> "BM25":
+        """Builds an index from per-document term counts."""
+        index = cls.__new__(cls)
+        index.k1 = k1
+        index.b = b
+        index._index([Counter(freqs) for freqs in term_freqs])
+        return index
+
+    def _index(self, term_freqs: List[Counter]) -> None:
+        self.term_freqs = term_freqs
+        self.lengths = [sum(freqs.values()) for freqs in term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)
+                           if self.lengths else 0.0)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for index, freqs in enumerate(self.term_freqs):
+            for term, freq in freqs.items():
+                self.postings[term].append((index, freq))
+        total = len(self.term_freqs)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) /
+                           (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.term_freqs)
+
+    def score(self, query: Sequence[str], index: int) -> float:
+        """Returns the BM25 score of one document for the query tokens."""
+        freqs = self.term_freqs[index]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[index] /
+                          (self.avg_length or 1))
+        total = 0.0
+        for term in query:
+            freq = freqs.get(term)
+            if freq:
+                total += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+        return total
+
+    def _matching_scores(self, query: Sequence[str]) -> Dict[int, float]:
+        """Scores of the documents containing at least one query term."""
+        totals: Dict[int, float] = defaultdict(float)
+        for term in query:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] /
+                                  (self.avg_length or 1))
+                totals[index] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return totals
+
+    def scores(self, query: Sequence[str]) -> List[float]:
+        """Returns the score of every document, in corpus order."""
+        scores = [0.0] * len(self)
+        for index, score in self._matching_scores(query).items():
+            scores[index] = score
+        return scores
+
+    def top_k(self, query: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """Returns (index, score) of the k best documents with a positive score."""
+        ranked = sorted(self._matching_scores(query).items(),
+                        key=lambda item: (-item[1], item[0]))
+        return [(index, score) for index, score in ranked[:k] if score > 0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a JSON-serialisable form of the index."""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "term_freqs": [dict(freqs) for freqs in self.term_freqs],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25":
+        """Rebuilds an index written by to_dict()."""
+        return cls.from_term_freqs(data["term_freqs"],
+                                   k1=data["k1"],
+                                   b=data["b"])
@@ -0,0 +1,165 @@
+"""Small key/value caches shared by the agent's hot paths.
+
+``TTLCache`` is an in-process LRU cache whose entries also expire after a
+time-to-live. ``RedisCache`` offers the same interface on top of Redis so
+several API workers can share entries; ``make_cache`` picks Redis when a URL
+is configured and the client library is installed, and the in-process cache
+otherwise.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a value, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def setdefault(self, key: str, value: Any,
+                   ttl: Optional[float] = None) -> Any:
+        """Returns the cached value, storing value first if there is none."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._data.move_to_end(key)
+                return entry[1]
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+    def delete(self, key: str) -> None:
+        """Removes a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RedisCache:
+    """TTL cache stored in Redis under a key namespace.
+
+    Values are stored as JSON. Eviction beyond the TTL follows the server's
+    maxmemory policy (use an LRU policy such as allkeys-lru). Redis errors
+    are logged and treated as cache misses.
+    """
+
+    def __init__(self, client: Any, namespace: str, ttl: float = 300.0):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value, or default if missing or unreachable."""
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return default
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a JSON-serialisable value with an expiry."""
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        try:
+            self.client.set(self._key(key), json.dumps(value), ex=seconds)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
+    def setdefault(self, key: str, value: Any,
+                   ttl: Optional[float] = None) -> Any:
+        """Returns the stored value, storing value first (SET NX) if none.
+
+        When Redis is unreachable value itself is returned.
+        """
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        try:
+            if self.client.set(self._key(key), json.dumps(value), ex=seconds,
+                               nx=True):
+                return value
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+            return value
+        return value if raw is None else json.loads(raw)
+
+    def delete(self, key: str) -> None:
+        """Removes a key if present."""
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+
+
+def make_cache(namespace: str,
+               maxsize: int,
+               ttl: float,
+               redis_url: Optional[str] = None):
+    """Returns a Redis-backed cache if configured, else an in-process one."""
+    if redis_url:
+        if redis is None:
+            logger.warning(
+                f"redis is not installed, {namespace} cache is process-local")
+        else:
+            try:
+                client = redis.Redis.from_url(redis_url,
+                                              socket_timeout=0.5,
+                                              socket_connect_timeout=0.5)
+                client.ping()
+                logger.info(f"Using Redis for the {namespace} cache")
+                return RedisCache(client, f"vaani:{namespace}", ttl)
+            except Exception as e:
+                logger.warning(
+                    f"Could not connect to Redis for {namespace} cache: {e}")
+    return TTLCache(maxsize=maxsize, ttl=ttl)
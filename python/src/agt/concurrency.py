@@ -0,0 +1,106 @@
+"""Run independent I/O of one graph turn concurrently.
+
+Provider calls inside a node (web search, embeddings, vector search,
+indexing) are mostly network waits, so independent ones run on a shared
+thread pool. Results can also be started in one node and picked up by a
+later node of the same turn through ``Prefetcher``.
+"""
+
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    from .cache import TTLCache
+    from .metrics import metrics
+except ImportError:
+    from cache import TTLCache
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+io_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="vaani-io")
+
+metrics.register_ratio("concurrency.prefetch_hit_rate", "concurrency.prefetch.hit",
+                       ["concurrency.prefetch.hit", "concurrency.prefetch.miss"])
+
+
+def gather(tasks: Dict[str, Callable[[], Any]],
+           timeout: Optional[float] = None,
+           name: str = "gather") -> Dict[str, Any]:
+    """Runs the named callables concurrently and returns their results.
+
+    A task that raises or is not done within timeout contributes None, so
+    one failed provider never fails the whole turn. The time saved over
+    running the tasks one after another is recorded under
+    ``concurrency.<name>.saved``.
+    """
+    started = time.perf_counter()
+    durations: Dict[str, float] = {}
+
+    def timed(key: str, task: Callable[[], Any]) -> Any:
+        task_started = time.perf_counter()
+        try:
+            return task()
+        finally:
+            durations[key] = time.perf_counter() - task_started
+
+    futures = {
+        key: io_executor.submit(timed, key, task)
+        for key, task in tasks.items()
+    }
+    deadline = None if timeout is None else started + timeout
+    results: Dict[str, Any] = {}
+    for key, future in futures.items():
+        remaining = None if deadline is None else max(
+            0.0, deadline - time.perf_counter())
+        try:
+            results[key] = future.result(timeout=remaining)
+        except Exception as e:
+            logger.error(f"Concurrent task '{key}' failed: {e!r}")
+            results[key] = None
+    elapsed = time.perf_counter() - started
+    metrics.observe(f"concurrency.{name}.wall", elapsed)
+    metrics.observe(f"concurrency.{name}.saved",
+                    max(0.0, sum(durations.values()) - elapsed))
+    return results
+
+
+class Prefetcher:
+    """Starts work early and hands the result to whoever asks for it later.
+
+    Entries are keyed by the caller (typically thread id plus the inputs)
+    and expire after ttl seconds, so unused prefetches do not pile up.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 120.0):
+        self.name = name
+        self._futures = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def start(self, key: Hashable, task: Callable[[], Any]) -> Future:
+        """Starts task in the background under key, replacing older work."""
+        future = io_executor.submit(task)
+        self._futures.set(key, future)
+        metrics.incr(f"concurrency.{self.name}.started")
+        return future
+
+    def take(self, key: Hashable, timeout: Optional[float] = None) -> Any:
+        """Returns the prefetched result for key, or None if unavailable.
+
+        A result is handed out once; failed prefetches count as misses so
+        the caller simply does the work itself.
+        """
+        future = self._futures.get(key)
+        if future is None:
+            metrics.incr("concurrency.prefetch.miss")
+            return None
+        self._futures.delete(key)
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Prefetched {self.name} unavailable: {e!r}")
+            metrics.incr("concurrency.prefetch.miss")
+            return None
+        metrics.incr("concurrency.prefetch.hit")
+        return result
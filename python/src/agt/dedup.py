@@ -0,0 +1,141 @@
+"""Deduplication of web search results.
+
+Several queries of one search round (and a single provider's result list)
+often return the same page under different URLs, or mirrors of it.
+Results are first matched on a canonical URL and then on content, using
+MinHash signatures of word shingles to find near-duplicate pages.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+# Query parameters that only track the visit and never change the page
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid",
+    "mc_eid", "_ga", "_gl", "ref", "ref_src", "ref_url", "spm", "cmpid",
+    "ocid", "smid"
+})
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [(int.from_bytes(hashlib.blake2b(f"a{i}".encode(),
+                                                 digest_size=8).digest(),
+                                 "big") % _MERSENNE_PRIME | 1,
+                  int.from_bytes(hashlib.blake2b(f"b{i}".encode(),
+                                                 digest_size=8).digest(),
+                                 "big") % _MERSENNE_PRIME)
+                 for i in range(NUM_PERMUTATIONS)]
+_WORD_RE = re.compile(r"\w+")
+
+metrics.register_ratio(
+    "search.dedup.removal_rate",
+    ["search.dedup.url_duplicates", "search.dedup.near_duplicates"],
+    "search.dedup.input")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalises a URL so trivially different links to one page match.
+
+    Lower-cases scheme and host, treats http as https, drops "www.",
+    default ports, fragments, tracking parameters and a trailing slash, and
+    sorts the remaining query parameters.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    default_port = DEFAULT_PORTS.get(scheme)
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != default_port:
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    params = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+        and key.lower() not in TRACKING_PARAMS)
+    return urlunsplit((scheme, host, path, urlencode(params), ""))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Returns the hashed word n-grams of a text."""
+    words = _WORD_RE.findall((text or "").lower())
+    return {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(words[i:i + size]).encode(),
+                            digest_size=8).digest(), "big")
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(shingle_set: Set[int]) -> Optional[Tuple[int, ...]]:
+    """Returns the MinHash signature of a shingle set, None when empty."""
+    if not shingle_set:
+        return None
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in shingle_set)
+        for a, b in _PERMUTATIONS)
+
+
+def estimate_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimates the Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+def dedupe_results(results: List[Dict[str, Any]],
+                   url_key: str = "url",
+                   text_key: str = "content",
+                   threshold: float = NEAR_DUPLICATE_THRESHOLD
+                   ) -> List[Dict[str, Any]]:
+    """Drops results whose URL or content duplicates an earlier result.
+
+    The first occurrence wins, so the providers' ranking is preserved.
+    Texts shorter than one shingle are only matched on their URL.
+    """
+    kept: List[Dict[str, Any]] = []
+    seen_urls: Set[str] = set()
+    signatures: List[Tuple[int, ...]] = []
+    url_duplicates = near_duplicates = 0
+    for result in results:
+        url = result.get(url_key) or ""
+        canonical = canonicalize_url(url) if url else ""
+        if canonical and canonical in seen_urls:
+            url_duplicates += 1
+            continue
+        signature = minhash(shingles(result.get(text_key) or ""))
+        if signature is not None and any(
+                estimate_similarity(signature, other) >= threshold
+                for other in signatures):
+            near_duplicates += 1
+            continue
+        if canonical:
+            seen_urls.add(canonical)
+        if signature is not None:
+            signatures.append(signature)
+        kept.append(result)
+    metrics.incr("search.dedup.input", len(results))
+    metrics.incr("search.dedup.url_duplicates", url_duplicates)
+    metrics.incr("search.dedup.near_duplicates", near_duplicates)
+    return kept
@@ -0,0 +1,395 @@
+"""Multi-source deep research pipeline.
+
+The question is decomposed into sub-questions. Each sub-question is
+researched on its own branch, which retrieves web results and document
+chunks concurrently and summarises them with numbered citations (map).
+The branch summaries are then synthesised into one report (reduce).
+Everything runs inside a wall-clock and an (estimated) token budget: late
+branches are dropped (their work stops at the next check, and a summary
+being generated is abandoned mid-stream), and branches are summarised
+extractively once the token budget is spent.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .dedup import canonicalize_url, dedupe_results
+    from .metrics import metrics
+    from .passages import select_passages
+    from .search import search_executor
+    from .tokens import estimate_tokens
+except ImportError:
+    from dedup import canonicalize_url, dedupe_results
+    from metrics import metrics
+    from passages import select_passages
+    from search import search_executor
+    from tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEEP_RESEARCH_MAX_SUBQUESTIONS = int(
+    os.getenv("DEEP_RESEARCH_MAX_SUBQUESTIONS", "4"))
+DEEP_RESEARCH_MAX_CONCURRENCY = int(
+    os.getenv("DEEP_RESEARCH_MAX_CONCURRENCY", "4"))
+DEEP_RESEARCH_TIME_BUDGET = float(os.getenv("DEEP_RESEARCH_TIME_BUDGET", "90"))
+DEEP_RESEARCH_TOKEN_BUDGET = int(
+    os.getenv("DEEP_RESEARCH_TOKEN_BUDGET", "16000"))
+# Share of both budgets held back for the final synthesis
+DEEP_RESEARCH_REDUCE_RESERVE = float(
+    os.getenv("DEEP_RESEARCH_REDUCE_RESERVE", "0.3"))
+# Context tokens of web passages and document chunks per branch
+DEEP_RESEARCH_BRANCH_CONTEXT = int(
+    os.getenv("DEEP_RESEARCH_BRANCH_CONTEXT", "1200"))
+
+research_executor = ThreadPoolExecutor(max_workers=8,
+                                       thread_name_prefix="vaani-research")
+
+_CITATION_RE = re.compile(r"\[(\d+)\]")
+
+DECOMPOSE_PROMPT = """Break the research question below into at most {count} focused sub-questions that together cover it. Each sub-question must be answerable on its own with a web search.
+
+Conversation history:
+{conversation_context}
+
+Research question: {question}
+
+Respond with a JSON array of strings only."""
+
+MAP_PROMPT = """You are researching one part of a larger question.
+
+Overall question: {question}
+Sub-question: {sub_question}
+
+Sources:
+{sources}
+
+Summarise what the sources say about the sub-question in at most 200 words. Cite web sources with their numbers, e.g. [1] or [2][3], and document excerpts as (document). Say so when the sources do not answer the sub-question."""
+
+REDUCE_PROMPT = """You are performing deep research on a topic. Provide a comprehensive, well-structured answer.
+
+Conversation history:
+{conversation_context}
+
+Research question: {question}
+
+Findings per sub-question:
+{findings}
+
+Synthesise the findings into a detailed, well-structured answer with clear sections and highlighted key findings. Keep the numbered citations, e.g. [1], exactly as given in the findings. Do not add a list of sources; it is appended automatically."""
+
+
+class ResearchBudget:
+    """Tracks elapsed time and estimated tokens against the research budget."""
+
+    def __init__(self, seconds: float, tokens: int):
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + seconds
+        self.tokens = tokens
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def remaining_time(self) -> float:
+        """Seconds left before the deadline."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def remaining_tokens(self) -> int:
+        """Estimated tokens left in the budget."""
+        with self._lock:
+            return max(0, self.tokens - self.used)
+
+    def reserve(self, tokens: int) -> bool:
+        """Books tokens if they still fit the budget."""
+        with self._lock:
+            if self.used + tokens > self.tokens:
+                return False
+            self.used += tokens
+            return True
+
+    def charge(self, tokens: int) -> None:
+        """Books tokens that were spent regardless of the budget."""
+        with self._lock:
+            self.used += tokens
+
+
+@dataclass
+class Branch:
+    """Research results for one sub-question."""
+    question: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    summary: str = ""
+
+
+def parse_subquestions(text: str, limit: int) -> List[str]:
+    """Extracts sub-questions from a model reply, JSON or one per line."""
+    match = re.search(r"\[.*\]", text or "", re.DOTALL)
+    questions: List[Any] = []
+    if match:
+        try:
+            questions = json.loads(match.group(0))
+        except ValueError:
+            questions = []
+    if not questions:
+        questions = [
+            re.sub(r"^\s*(?:[-*]|\d+[.)])\s*", "", line)
+            for line in (text or "").splitlines()
+        ]
+    cleaned = []
+    for question in questions:
+        if isinstance(question, str) and question.strip() \
+                and question.strip() not in cleaned:
+            cleaned.append(question.strip())
+    return cleaned[:limit]
+
+
+class DeepResearchPipeline:
+    """Decompose, retrieve, map and reduce within a time and token budget.
+
+    ``web_search`` maps a query to results with url, title and text;
+    ``retrieve_documents`` (optional) maps a query to document chunks;
+    ``progress`` receives status messages and ``on_chunk`` the streamed
+    text of the final report.
+    """
+
+    def __init__(self,
+                 llm,
+                 web_search: Callable[[str], List[Dict[str, Any]]],
+                 retrieve_documents: Optional[Callable[[str], List[str]]] = None,
+                 progress: Optional[Callable[[str], None]] = None,
+                 on_chunk: Optional[Callable[[str], None]] = None,
+                 time_budget: float = DEEP_RESEARCH_TIME_BUDGET,
+                 token_budget: int = DEEP_RESEARCH_TOKEN_BUDGET,
+                 max_subquestions: int = DEEP_RESEARCH_MAX_SUBQUESTIONS,
+                 max_concurrency: int = DEEP_RESEARCH_MAX_CONCURRENCY):
+        self.llm = llm
+        self.web_search = web_search
+        self.retrieve_documents = retrieve_documents
+        self.progress = progress or (lambda status: None)
+        self.on_chunk = on_chunk
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self.max_subquestions = max_subquestions
+        self.max_concurrency = max_concurrency
+
+    def _invoke(self, budget: ResearchBudget, prompt: str) -> str:
+        response = self.llm.invoke(prompt)
+        text = response.content if isinstance(response.content, str) else ""
+        budget.charge(estimate_tokens(prompt) + estimate_tokens(text))
+        return text
+
+    def decompose(self, budget: ResearchBudget, question: str,
+                  conversation_context: str) -> List[str]:
+        """Splits the question into sub-questions; falls back to the question."""
+        if self.max_subquestions <= 1:
+            return [question]
+        try:
+            reply = self._invoke(
+                budget,
+                DECOMPOSE_PROMPT.format(
+                    count=self.max_subquestions,
+                    conversation_context=conversation_context,
+                    question=question))
+            sub_questions = parse_subquestions(reply, self.max_subquestions)
+        except Exception as e:
+            logger.error(f"Error decomposing research question: {e}")
+            sub_questions = []
+        return sub_questions or [question]
+
+    def research(self,
+                 budget: ResearchBudget,
+                 question: str,
+                 branch: Branch,
+                 token_share: int,
+                 reduce_at: Optional[float] = None,
+                 cancelled: Optional[threading.Event] = None) -> Branch:
+        """Retrieves and summarises the sources of one branch.
+
+        Work stops at reduce_at (a time.monotonic() deadline) or once
+        cancelled is set, so a dropped branch does not keep spending tokens.
+        """
+        deadline = budget.deadline if reduce_at is None else reduce_at
+        cancelled = cancelled or threading.Event()
+
+        def stopped() -> bool:
+            return cancelled.is_set() or time.monotonic() >= deadline
+
+        web_future = search_executor.submit(self.web_search, branch.question)
+        if self.retrieve_documents is not None:
+            try:
+                branch.documents = self.retrieve_documents(branch.question)
+            except Exception as e:
+                logger.error(f"Document retrieval failed for "
+                             f"'{branch.question}': {e}")
+        try:
+            results = web_future.result(
+                timeout=max(0.0, deadline - time.monotonic()))
+            branch.sources = select_passages(
+                dedupe_results(results or [], text_key="text"),
+                branch.question,
+                token_budget=DEEP_RESEARCH_BRANCH_CONTEXT)
+        except Exception as e:
+            logger.error(f"Web search failed for '{branch.question}': {e}")
+
+        sources_text = self.format_sources(branch)
+        prompt = MAP_PROMPT.format(question=question,
+                                   sub_question=branch.question,
+                                   sources=sources_text)
+        # Summarise with the model only while the branch's share of the
+        # token budget allows it, otherwise keep the extracted passages
+        cost = estimate_tokens(prompt) + 300
+        if sources_text and not stopped() and cost <= token_share \
+                and budget.reserve(cost):
+            try:
+                branch.summary = self.summarise(prompt, stopped)
+                if branch.summary:
+                    metrics.incr("deep_research.branches_summarised")
+            except Exception as e:
+                logger.error(f"Error summarising '{branch.question}': {e}")
+        if not branch.summary:
+            branch.summary = sources_text
+            metrics.incr("deep_research.branches_extractive")
+        return branch
+
+    def summarise(self, prompt: str, stopped: Callable[[], bool]) -> str:
+        """Streams a branch summary; abandons it (returning "") once stopped()
+        is true, which closes the request instead of paying for the rest."""
+        parts = []
+        for chunk in self.llm.stream(prompt):
+            if stopped():
+                metrics.incr("deep_research.summaries_abandoned")
+                return ""
+            if isinstance(chunk.content, str):
+                parts.append(chunk.content)
+        return "".join(parts)
+
+    @staticmethod
+    def format_sources(branch: Branch) -> str:
+        """Numbered web passages followed by document excerpts."""
+        lines = [
+            f"[{i}] {source['title']} ({source['url']}): {source['text']}"
+            for i, source in enumerate(branch.sources, 1)
+        ]
+        lines.extend(f"(document) {chunk}" for chunk in branch.documents)
+        return "\n\n".join(lines)
+
+    @staticmethod
+    def renumber(branches: List[Branch]) -> List[Dict[str, str]]:
+        """Gives every distinct source one global number across branches.
+
+        Branch summaries are rewritten in place to use the global numbers.
+        Returns the global source list in citation order.
+        """
+        sources: List[Dict[str, str]] = []
+        numbers: Dict[str, int] = {}
+        for branch in branches:
+            local = {}
+            for i, source in enumerate(branch.sources, 1):
+                key = canonicalize_url(source["url"])
+                if key not in numbers:
+                    sources.append({"url": source["url"],
+                                    "title": source["title"]})
+                    numbers[key] = len(sources)
+                local[i] = numbers[key]
+            branch.summary = _CITATION_RE.sub(
+                lambda m: f"[{local[int(m.group(1))]}]"
+                if int(m.group(1)) in local else m.group(0), branch.summary)
+        return sources
+
+    def run(self, question: str, conversation_context: str = "") -> str:
+        """Researches the question and returns the final report."""
+        budget = ResearchBudget(self.time_budget, self.token_budget)
+        self.progress("Planning research...")
+        sub_questions = self.decompose(budget, question, conversation_context)
+        logger.info(f"Deep research sub-questions: {sub_questions}")
+
+        # Leave time and tokens for the synthesis
+        reduce_at = budget.deadline - self.time_budget * DEEP_RESEARCH_REDUCE_RESERVE
+        token_share = int(budget.remaining_tokens() *
+                          (1 - DEEP_RESEARCH_REDUCE_RESERVE) /
+                          len(sub_questions))
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Set when the reduce deadline drops the branches still running
+        cancelled = threading.Event()
+
+        def run_branch(branch: Branch) -> Branch:
+            with slots:
+                if cancelled.is_set() or time.monotonic() >= reduce_at:
+                    return branch
+                self.progress(f"Researching: {branch.question}")
+                return self.research(budget, question, branch, token_share,
+                                     reduce_at, cancelled)
+
+        branches = [Branch(question=q) for q in sub_questions]
+        futures = {
+            research_executor.submit(run_branch, branch): branch
+            for branch in branches
+        }
+        pending = set(futures)
+        finished = 0
+        while pending:
+            done, pending = wait(pending,
+                                 timeout=max(0.0, reduce_at - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            finished += len(done)
+            self.progress(
+                f"Researched {finished} of {len(branches)} sub-questions")
+        if pending:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+            metrics.incr("deep_research.branches_dropped", len(pending))
+            logger.warning(
+                f"Deep research time budget reached, {len(pending)} branches dropped")
+
+        completed = [
+            branch for future, branch in futures.items()
+            if future.done() and not future.cancelled()
+            and future.exception() is None and branch.summary
+        ]
+        sources = self.renumber(completed)
+
+        self.progress("Writing the final report...")
+        findings = "\n\n".join(f"### {branch.question}\n{branch.summary}"
+                               for branch in completed)
+        prompt = REDUCE_PROMPT.format(
+            conversation_context=conversation_context,
+            question=question,
+            findings=findings or "No findings were retrieved.")
+        report = self.synthesize(prompt)
+        budget.charge(estimate_tokens(prompt) + estimate_tokens(report))
+
+        if sources:
+            reference_list = "\n\n## Sources\n" + "\n".join(
+                f"[{i}] {source['title']} - {source['url']}"
+                for i, source in enumerate(sources, 1))
+            if self.on_chunk is not None:
+                self.on_chunk(reference_list)
+            report += reference_list
+
+        metrics.observe("deep_research.latency",
+                        time.monotonic() - budget.started_at)
+        metrics.incr("deep_research.tokens", budget.used)
+        return report
+
+    def synthesize(self, prompt: str) -> str:
+        """Generates the final report, streaming it when a sink is set."""
+        if self.on_chunk is None:
+            response = self.llm.invoke(prompt)
+            return response.content if isinstance(response.content, str) else ""
+        parts = []
+        for chunk in self.llm.stream(prompt):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text:
+                parts.append(text)
+                self.on_chunk(text)
+        return "".join(parts)
@@ -0,0 +1,189 @@
+"""Registry of indexed documents shared across threads.
+
+Documents are identified by the SHA-256 of their content and indexed once
+into a content-addressed location (a per-document collection, or a doc_id
+scope of the shared collection). Threads attach to a document by reference
+instead of indexing their own copy, so a popular PDF uploaded by many users
+is parsed, embedded and stored once; attaching to a known document is a
+single metadata lookup. Each thread references at most one document, the
+upload it is talking about. When the last reference to a document goes
+away the caller forgets it and deletes its vectors.
+
+The registry is a SQLite file, so it survives restarts together with the
+Qdrant data it describes.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DOC_REGISTRY_PATH = os.getenv("DOC_REGISTRY_PATH", "doc_registry.db")
+# Seconds an indexed document may stay unreferenced before it is collected
+DOC_REGISTRY_GC_AGE = float(os.getenv("DOC_REGISTRY_GC_AGE", "86400"))
+
+metrics.register_ratio("doc_registry.hit_rate", "doc_registry.hit",
+                       ["doc_registry.hit", "doc_registry.miss"])
+
+
+@dataclass
+class RegisteredDocument:
+    """Where a document's vectors live."""
+    document_hash: str
+    collection_name: str
+    scope: Optional[Dict[str, str]]
+    created_at: float
+
+
+class DocumentRegistry:
+    """SQLite store of indexed documents and the threads referencing them."""
+
+    def __init__(self, path: str = DOC_REGISTRY_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "hash TEXT PRIMARY KEY, collection TEXT NOT NULL, scope TEXT, "
+            "created_at REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            "thread_id TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash)")
+        self._db.commit()
+
+    def _lookup(self, document_hash: str) -> Optional[RegisteredDocument]:
+        # Caller holds the lock
+        row = self._db.execute(
+            "SELECT collection, scope, created_at FROM documents "
+            "WHERE hash = ?", (document_hash, )).fetchone()
+        metrics.incr("doc_registry.hit" if row else "doc_registry.miss")
+        if row is None:
+            return None
+        collection_name, scope, created_at = row
+        return RegisteredDocument(document_hash, collection_name,
+                                  json.loads(scope) if scope else None,
+                                  created_at)
+
+    def get(self, document_hash: str) -> Optional[RegisteredDocument]:
+        """Returns where a document is indexed, or None if it is unknown."""
+        with self._lock:
+            return self._lookup(document_hash)
+
+    def register(self, document_hash: str, collection_name: str,
+                 scope: Optional[Dict[str, str]] = None) -> None:
+        """Records that a document is fully indexed at this location."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                (document_hash, collection_name,
+                 json.dumps(scope) if scope else None, time.time()))
+            self._db.commit()
+
+    def attach(self, thread_id: str, document_hash: str
+               ) -> Tuple[Optional[RegisteredDocument], List[str]]:
+        """Points a thread at a registered document.
+
+        The lookup and the reference are one transaction, so a concurrent
+        forget() cannot remove the document in between. Returns the document
+        (None if it is not registered, in which case nothing changes) and
+        the hashes of documents left without any reference; the caller
+        should forget() them and delete their vectors.
+        """
+        with self._lock:
+            document = self._lookup(document_hash)
+            if document is None:
+                return None, []
+            previous = self._db.execute(
+                "SELECT hash FROM refs WHERE thread_id = ?",
+                (thread_id, )).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO refs VALUES (?, ?)",
+                             (thread_id, document_hash))
+            self._db.commit()
+        if previous is None or previous[0] == document_hash:
+            return document, []
+        return document, self._orphaned([previous[0]])
+
+    def detach(self, thread_id: str) -> List[str]:
+        """Drops a thread's reference; returns the documents it orphaned."""
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT hash FROM refs WHERE thread_id = ?",
+                (thread_id, )).fetchone()
+            self._db.execute("DELETE FROM refs WHERE thread_id = ?",
+                             (thread_id, ))
+            self._db.commit()
+        return self._orphaned([previous[0]]) if previous else []
+
+    def refcount(self, document_hash: str) -> int:
+        """Number of threads referencing a document."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM refs WHERE hash = ?",
+                                    (document_hash, )).fetchone()[0]
+
+    def _orphaned(self, hashes: List[str]) -> List[str]:
+        return [key for key in hashes if self.refcount(key) == 0]
+
+    def unreferenced(self, older_than: float = 0) -> List[str]:
+        """Registered documents no thread references, e.g. uploads that were
+        never asked about, registered more than older_than seconds ago."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT hash FROM documents WHERE created_at < ? AND hash "
+                "NOT IN (SELECT hash FROM refs)",
+                (time.time() - older_than, )).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, document_hash: str) -> Optional[RegisteredDocument]:
+        """Removes a document unless a thread attached to it meanwhile.
+
+        Returns the removed entry, whose vectors the caller deletes.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT collection, scope, created_at FROM documents "
+                "WHERE hash = ? AND hash NOT IN (SELECT hash FROM refs)",
+                (document_hash, )).fetchone()
+            if row is None:
+                return None
+            self._db.execute("DELETE FROM documents WHERE hash = ?",
+                             (document_hash, ))
+            self._db.commit()
+        collection_name, scope, created_at = row
+        return RegisteredDocument(document_hash, collection_name,
+                                  json.loads(scope) if scope else None,
+                                  created_at)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of registered documents and thread references."""
+        with self._lock:
+            documents = self._db.execute(
+                "SELECT COUNT(*) FROM documents").fetchone()[0]
+            references = self._db.execute(
+                "SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {"documents": documents, "references": references}
+
+
+_registry: Optional[DocumentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_document_registry() -> DocumentRegistry:
+    """Returns the process-wide document registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DocumentRegistry()
+        return _registry
@@ -0,0 +1,179 @@
+"""Persistent cache of document chunk embeddings.
+
+Vectors are stored in SQLite as float32 blobs keyed by (embedding model,
+SHA-256 of the chunk text), so re-indexing a document only sends chunks
+that were never embedded before to the embedding API. ``CachedEmbeddings``
+wraps any LangChain ``Embeddings`` and can be passed wherever the wrapped
+object was used. Query embeddings are kept in a separate LRU keyed by
+(model, text), in Redis when configured, since the same question is often
+embedded by several nodes of a turn and asked again later.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+try:
+    from .cache import make_cache
+    from .metrics import metrics
+except ImportError:
+    from cache import make_cache
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+QUERY_EMBEDDING_CACHE_SIZE = int(
+    os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL = float(
+    os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400"))
+
+metrics.register_ratio("embedding_cache.hit_rate", "embedding_cache.hit",
+                       ["embedding_cache.hit", "embedding_cache.miss"])
+metrics.register_ratio(
+    "query_embedding_cache.hit_rate", "query_embedding_cache.hit",
+    ["query_embedding_cache.hit", "query_embedding_cache.miss"])
+
+query_embedding_cache = make_cache(
+    "query_embedding", QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL,
+    os.getenv("QUERY_EMBEDDING_CACHE_REDIS_URL") or os.getenv("REDIS_URL"))
+
+
+def text_hash(text: str) -> str:
+    """Returns the cache key component for a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_name(embeddings: Embeddings) -> str:
+    """Identifies the model behind an embeddings object for cache keys."""
+    model = getattr(embeddings, "model", None) or getattr(
+        embeddings, "model_name", None)
+    return f"{type(embeddings).__name__}:{model or 'default'}"
+
+
+class EmbeddingCache:
+    """SQLite store of float32 vectors keyed by (model, text hash)."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))")
+        self._db.commit()
+
+    def get_many(self, model: str,
+                 hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Returns the cached vectors among hashes, keyed by hash."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? "
+                    f"AND hash IN ({placeholders})", [model, *batch]).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Iterable[tuple]) -> int:
+        """Stores (hash, vector) pairs; returns the bytes written."""
+        rows = [(model, key, array("f", vector).tobytes())
+                for key, vector in items]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._db.commit()
+        return sum(len(row[2]) for row in rows)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of cached vectors and their total size."""
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) "
+                "FROM embeddings").fetchone()
+        return {"vectors": count, "bytes": size}
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from the cache."""
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 cache: Optional[EmbeddingCache] = None,
+                 batch_size: Optional[int] = None):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model = model_name(embeddings)
+        # Texts per embedding API request, used to count requests saved
+        self.batch_size = batch_size or getattr(embeddings, "chunk_size",
+                                                None) or 1000
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts, calling the model only for uncached ones."""
+        hashes = [text_hash(text) for text in texts]
+        try:
+            vectors = self.cache.get_many(self.model, hashes)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache unavailable: {e}")
+            return self.embeddings.embed_documents(texts)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        hits = len(texts) - sum(1 for key in hashes if key in missing)
+        metrics.incr("embedding_cache.hit", hits)
+        metrics.incr("embedding_cache.miss", len(texts) - hits)
+        metrics.incr(
+            "embedding_cache.api_calls_saved",
+            math.ceil(len(texts) / self.batch_size) -
+            math.ceil(len(missing) / self.batch_size))
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            vectors.update(fresh)
+            try:
+                metrics.incr("embedding_cache.bytes_stored",
+                             self.cache.put_many(self.model, fresh.items()))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not store embeddings: {e}")
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a query, served from the query embedding cache if seen."""
+        key = f"{self.model}:{text_hash(text)}"
+        vector = query_embedding_cache.get(key)
+        if vector is not None:
+            metrics.incr("query_embedding_cache.hit")
+            return vector
+        metrics.incr("query_embedding_cache.miss")
+        vector = self.embeddings.embed_query(text)
+        query_embedding_cache.set(key, vector)
+        return vector
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
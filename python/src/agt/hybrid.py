@@ -0,0 +1,279 @@
+"""Hybrid document retrieval: BM25 and vector search fused with RRF.
+
+Embeddings are good at paraphrases but often miss exact terms such as IDs,
+names and numbers. A BM25 index over a document's chunks is built while
+the document is indexed and saved next to it. At query time the vector
+search and the BM25 search run concurrently, their rankings are combined
+with reciprocal-rank fusion, and an optional cross-encoder reranks the
+fused candidates on CPU. Each stage's latency is recorded under
+``retrieval.*``.
+
+``HYBRID_TOP_K`` overrides how many chunks are returned, and the cut-offs
+(``HYBRID_MIN_FUSED_RATIO``, ``HYBRID_RERANK_MIN_SCORE``) drop weak
+chunks, so prompts can carry fewer but better chunks.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+try:
+    from .bm25 import BM25, tokenize
+    from .cache import TTLCache
+    from .metrics import metrics
+except ImportError:
+    from bm25 import BM25, tokenize
+    from cache import TTLCache
+    from metrics import metrics
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+logger = logging.getLogger(__name__)
+
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "vaani_lexical_index")
+# Candidates taken from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+# Chunks returned; 0 keeps the caller's k
+HYBRID_TOP_K = int(os.getenv("HYBRID_TOP_K", "0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Drop fused chunks scoring below this fraction of the best one
+HYBRID_MIN_FUSED_RATIO = float(os.getenv("HYBRID_MIN_FUSED_RATIO", "0"))
+# Cross-encoder reranking, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+HYBRID_RERANK_MODEL = os.getenv("HYBRID_RERANK_MODEL", "")
+HYBRID_RERANK_MIN_SCORE = float(
+    os.getenv("HYBRID_RERANK_MIN_SCORE", "-1000000"))
+# Seconds to wait for the vector search leg
+HYBRID_VECTOR_TIMEOUT = float(os.getenv("HYBRID_VECTOR_TIMEOUT", "10"))
+
+# The vector leg runs here rather than on io_executor: retrieval is itself
+# often run on io_executor (prefetch), and waiting there for a task queued
+# on the same pool can exhaust it
+retrieval_executor = ThreadPoolExecutor(max_workers=8,
+                                        thread_name_prefix="vaani-retrieval")
+
+
+def lexical_index_name(collection_name: str,
+                       scope: Optional[Dict[str, str]] = None) -> str:
+    """Name of the BM25 index of a collection (and scope)."""
+    key = collection_name + json.dumps(scope or {}, sort_keys=True)
+    return hashlib.md5(key.encode()).hexdigest()[:16]
+
+
+_loaded = TTLCache(maxsize=64, ttl=3600)
+
+
+def _path(name: str) -> str:
+    return os.path.join(LEXICAL_INDEX_DIR, f"{name}.json")
+
+
+class LexicalIndex:
+    """BM25 index over the chunk texts of one document."""
+
+    def __init__(self, texts: Sequence[str], bm25: Optional[BM25] = None):
+        self.texts = list(texts)
+        self.bm25 = bm25 or BM25([tokenize(text) for text in self.texts])
+
+    def search(self, query: str, k: int) -> List[str]:
+        """Returns the texts of the k best BM25 matches, best first."""
+        return [self.texts[i] for i, _ in self.bm25.top_k(tokenize(query), k)]
+
+    def save(self, name: str) -> None:
+        """Writes the index atomically under LEXICAL_INDEX_DIR."""
+        os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+        staging = _path(name) + ".tmp"
+        with open(staging, "w") as f:
+            json.dump({"texts": self.texts, "bm25": self.bm25.to_dict()}, f)
+        os.replace(staging, _path(name))
+
+    @classmethod
+    def load(cls, name: str) -> Optional["LexicalIndex"]:
+        """Reads a saved index, or returns None if there is none."""
+        try:
+            with open(_path(name)) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(data["texts"], BM25.from_dict(data["bm25"]))
+
+
+def load_lexical_index(name: str) -> Optional[LexicalIndex]:
+    """Returns a saved BM25 index, or None if the document has none."""
+    index = _loaded.get(name)
+    if index is None:
+        index = LexicalIndex.load(name)
+        if index is not None:
+            _loaded.set(name, index)
+    return index
+
+
+def delete_lexical_index(name: str) -> None:
+    """Removes a BM25 index from disk and from the in-process cache."""
+    _loaded.delete(name)
+    try:
+        os.remove(_path(name))
+    except FileNotFoundError:
+        pass
+
+
+class LexicalIndexBuilder:
+    """Builds a BM25 index from chunks as they stream past the pipeline.
+
+    Only each chunk's term counts stay in memory; the texts are spilled to
+    a temporary file and copied into the saved index, so memory does not
+    grow with the document's text.
+    """
+
+    def __init__(self):
+        self.term_freqs: List[Counter] = []
+        self._texts = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def observe(self, chunks: Iterable) -> Iterator:
+        """Passes chunks through, recording their terms and texts."""
+        for chunk in chunks:
+            self.term_freqs.append(Counter(tokenize(chunk.page_content)))
+            self._texts.write(json.dumps(chunk.page_content) + "\n")
+            yield chunk
+
+    def save(self, name: str) -> None:
+        """Writes the index atomically; it is loaded on first search."""
+        with metrics.timer("retrieval.bm25_build_latency"):
+            bm25 = BM25.from_term_freqs(self.term_freqs)
+            os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+            staging = _path(name) + ".tmp"
+            with open(staging, "w", encoding="utf-8") as f:
+                # Same layout as LexicalIndex.save, texts copied line by line
+                f.write('{"bm25": ' + json.dumps(bm25.to_dict()) +
+                        ', "texts": [')
+                self._texts.seek(0)
+                for i, line in enumerate(self._texts):
+                    f.write((", " if i else "") + line.rstrip("\n"))
+                f.write("]}")
+            os.replace(staging, _path(name))
+        self._texts.close()
+        _loaded.delete(name)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]],
+                           k: int = HYBRID_RRF_K) -> List[Tuple[str, float]]:
+    """Fuses ranked lists of chunk texts; returns (text, score), best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, text in enumerate(ranking):
+            scores[text] = scores.get(text, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Returns the configured cross-encoder, or None if reranking is off."""
+    global _reranker
+    if not HYBRID_RERANK_MODEL or CrossEncoder is None:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoder(HYBRID_RERANK_MODEL, device="cpu")
+        return _reranker
+
+
+class HybridRetriever:
+    """Retrieves chunks with vector search, BM25, fusion and reranking."""
+
+    def __init__(self,
+                 vector_search: Callable[[str, int], List[str]],
+                 lexical: Optional[LexicalIndex] = None,
+                 candidates: int = HYBRID_CANDIDATES,
+                 reranker=None,
+                 min_fused_ratio: float = HYBRID_MIN_FUSED_RATIO,
+                 min_rerank_score: float = HYBRID_RERANK_MIN_SCORE):
+        self.vector_search = vector_search
+        self.lexical = lexical
+        self.candidates = candidates
+        self.reranker = reranker
+        self.min_fused_ratio = min_fused_ratio
+        self.min_rerank_score = min_rerank_score
+        # Stage latencies of the last retrieval, in seconds
+        self.timings: Dict[str, float] = {}
+
+    def _timed(self, stage: str, task: Callable[[], List[str]]) -> List[str]:
+        started = time.perf_counter()
+        try:
+            return task()
+        finally:
+            self.timings[stage] = time.perf_counter() - started
+            metrics.observe(f"retrieval.{stage}_latency", self.timings[stage])
+
+    def retrieve(self, query: str, k: int) -> List[str]:
+        """Returns up to k chunks for the query, best first."""
+        self.timings = {}
+        started = time.perf_counter()
+        pool = max(k, self.candidates)
+
+        def vector():
+            return self._timed("vector",
+                               lambda: self.vector_search(query, pool))
+
+        def bm25():
+            return self._timed("bm25", lambda: self.lexical.search(query, pool))
+
+        if self.lexical is None:
+            rankings = [vector()]
+        else:
+            # BM25 is in-memory: run it here while the vector search waits
+            vector_future = retrieval_executor.submit(vector)
+            try:
+                lexical_ranking = bm25()
+            except Exception as e:
+                logger.error(f"BM25 retrieval failed: {e!r}")
+                lexical_ranking = None
+            try:
+                vector_ranking = vector_future.result(
+                    timeout=HYBRID_VECTOR_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Vector retrieval failed: {e!r}")
+                vector_ranking = None
+            if vector_ranking is None and lexical_ranking is None:
+                raise RuntimeError("Both vector and BM25 retrieval failed")
+            rankings = [vector_ranking or [], lexical_ranking or []]
+
+        fused = self._timed("fusion",
+                            lambda: reciprocal_rank_fusion(rankings))
+        if fused and self.min_fused_ratio > 0:
+            floor = fused[0][1] * self.min_fused_ratio
+            fused = [(text, score) for text, score in fused if score >= floor]
+        texts = [text for text, _ in fused]
+
+        if self.reranker is not None and len(texts) > 1:
+            def rerank():
+                scores = self.reranker.predict([(query, text) for text in texts])
+                ranked = sorted(zip(texts, scores),
+                                key=lambda item: item[1],
+                                reverse=True)
+                return [text for text, score in ranked
+                        if score >= self.min_rerank_score]
+            texts = self._timed("rerank", rerank)
+
+        chunks = texts[:k]
+        self.timings["total"] = time.perf_counter() - started
+        metrics.observe("retrieval.total_latency", self.timings["total"])
+        metrics.incr("retrieval.requests")
+        metrics.incr("retrieval.chunks_returned", len(chunks))
+        logger.info("Hybrid retrieval: " + ", ".join(
+            f"{stage} {seconds * 1000:.1f}ms"
+            for stage, seconds in self.timings.items()) +
+                    f", {len(chunks)} chunks")
+        return chunks
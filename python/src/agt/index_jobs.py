@@ -0,0 +1,210 @@
+"""Background indexing jobs started at upload time.
+
+An upload enqueues a job keyed by the SHA-256 of the file's content, so
+the same document uploaded twice is indexed once. Jobs run on a small
+thread pool and report their progress; the chat file URL is registered as
+an alias of the job so the graph can find it, wait for it and reuse its
+collection when the first question about the document arrives.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INDEX_JOB_WORKERS = int(os.getenv("INDEX_JOB_WORKERS", "2"))
+# How long a chat turn waits for an upload's job before answering that the
+# document is still being indexed
+INDEX_JOB_WAIT_TIMEOUT = float(os.getenv("INDEX_JOB_WAIT_TIMEOUT", "300"))
+# Finished jobs are forgotten after this many seconds, or oldest first once
+# more than INDEX_JOB_MAX_FINISHED are kept
+INDEX_JOB_TTL = float(os.getenv("INDEX_JOB_TTL", "86400"))
+INDEX_JOB_MAX_FINISHED = int(os.getenv("INDEX_JOB_MAX_FINISHED", "1000"))
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest identifying a document by its content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def document_collection_name(document_hash: str) -> str:
+    """Collection holding one document, shared by every thread using it."""
+    return f"vaani_doc_{document_hash[:16]}"
+
+
+@dataclass
+class IndexJob:
+    """State of one indexing job."""
+    job_id: str
+    path: str
+    collection_name: str
+    # Payload fields selecting the document in a shared collection
+    scope: Optional[Dict[str, str]] = None
+    status: str = "queued"
+    chunks: int = 0
+    chunks_per_second: float = 0.0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the job to finish; returns whether it succeeded."""
+        self.done.wait(timeout)
+        return self.status == "done"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable status, as returned by the API."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "collection_name": self.collection_name,
+            "chunks": self.chunks,
+            "chunks_per_second": round(self.chunks_per_second, 1),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IndexJobManager:
+    """Runs indexing jobs and tracks them by content hash and file URL.
+
+    ``index_fn(path, collection_name, document_hash, progress, scope)`` does
+    the indexing; ``progress`` is called with an object exposing ``chunks``
+    and ``chunks_per_second``. ``target`` maps a content hash to the
+    collection and scope the document is indexed into.
+    """
+
+    def __init__(self,
+                 index_fn: Callable[..., Any],
+                 target: Optional[Callable[[str], Tuple[str, Optional[Dict[
+                     str, str]]]]] = None,
+                 workers: int = INDEX_JOB_WORKERS):
+        self.index_fn = index_fn
+        self.target = target or (
+            lambda document_hash: (document_collection_name(document_hash),
+                                   None))
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="vaani-index")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, IndexJob] = {}
+        self._aliases: Dict[str, str] = {}
+
+    def submit(self,
+               path: str,
+               document_hash: Optional[str] = None,
+               alias: Optional[str] = None,
+               cleanup: bool = False) -> IndexJob:
+        """Enqueues indexing of a local file, reusing an existing job.
+
+        alias is the URL the chat will refer to the file by. With cleanup
+        the local file is removed once the job has finished with it.
+        """
+        if document_hash is None:
+            with open(path, "rb") as f:
+                document_hash = content_hash(f.read())
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(document_hash)
+            reuse = job is not None and job.status != "failed"
+            if not reuse:
+                collection_name, scope = self.target(document_hash)
+                job = IndexJob(job_id=document_hash,
+                               path=path,
+                               collection_name=collection_name,
+                               scope=scope)
+                self._jobs[document_hash] = job
+            if alias:
+                self._aliases[alias] = document_hash
+            self._aliases[path] = document_hash
+        if reuse:
+            metrics.incr("index_jobs.deduplicated")
+            if cleanup and path != job.path:
+                self._remove(path)
+            return job
+        metrics.incr("index_jobs.submitted")
+        self._executor.submit(self._run, job, cleanup)
+        return job
+
+    def _evict(self) -> None:
+        """Drops expired finished jobs and their aliases; lock held."""
+        finished = sorted((job for job in self._jobs.values()
+                           if job.finished_at is not None),
+                          key=lambda job: job.finished_at)
+        expired = time.time() - INDEX_JOB_TTL
+        excess = len(finished) - INDEX_JOB_MAX_FINISHED
+        evicted = {
+            job.job_id
+            for i, job in enumerate(finished)
+            if i < excess or job.finished_at < expired
+        }
+        if not evicted:
+            return
+        for job_id in evicted:
+            del self._jobs[job_id]
+        for alias in [a for a, j in self._aliases.items() if j in evicted]:
+            del self._aliases[alias]
+        metrics.incr("index_jobs.evicted", len(evicted))
+
+    def _run(self, job: IndexJob, cleanup: bool) -> None:
+        job.status = "running"
+
+        def progress(state):
+            job.chunks = state.chunks
+            job.chunks_per_second = state.chunks_per_second
+
+        try:
+            self.index_fn(job.path, job.collection_name, job.job_id, progress,
+                          job.scope)
+            job.status = "done"
+            metrics.incr("index_jobs.completed")
+        except Exception as e:
+            logger.error(f"Indexing job {job.job_id[:12]} failed: {e}",
+                         exc_info=True)
+            job.error = str(e)
+            job.status = "failed"
+            metrics.incr("index_jobs.failed")
+        finally:
+            job.finished_at = time.time()
+            metrics.observe("index_jobs.duration",
+                            job.finished_at - job.created_at)
+            if cleanup:
+                self._remove(job.path)
+            job.done.set()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove indexed upload {path}: {e}")
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        """Returns a job by id (its content hash), if it is still tracked."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str) -> None:
+        """Forgets a job whose index was deleted, with its aliases."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            for alias in [a for a, j in self._aliases.items() if j == job_id]:
+                del self._aliases[alias]
+
+    def find(self, file_url: str) -> Optional[IndexJob]:
+        """Returns the job for a file URL or path, if one was submitted."""
+        with self._lock:
+            job_id = self._aliases.get(file_url)
+            return self._jobs.get(job_id) if job_id else None
@@ -0,0 +1,252 @@
+"""Batched, concurrent document indexing into Qdrant.
+
+Chunks are embedded in batches of ``INDEX_EMBED_BATCH_SIZE`` with at most
+``INDEX_EMBED_CONCURRENCY`` embedding requests in flight. Each embedded
+batch is upserted without waiting for Qdrant to apply it, so writes overlap
+with the embedding of the following batches; the last upsert waits, which
+acts as a barrier because Qdrant applies updates to a collection in order.
+Only the batches in flight are held in memory, and the input may be any
+iterable. ``iter_document_chunks`` is such a generator: it loads a file page
+by page and splits each page as it arrives, so peak memory does not grow
+with the document and the first chunks are searchable while later pages are
+still being parsed.
+
+Points use the payload layout of ``langchain_qdrant.QdrantVectorStore``
+("page_content" and "metadata"), so collections built here can be searched
+with that vector store as well as with qdrant_store.search_payloads().
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import (Any, Callable, Deque, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Tuple)
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import (Docx2txtLoader, PyPDFLoader,
+                                                  TextLoader)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+try:
+    from .metrics import metrics
+    from .parsing import iter_pages
+except ImportError:
+    from metrics import metrics
+    from parsing import iter_pages
+
+logger = logging.getLogger(__name__)
+
+INDEX_EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "64"))
+INDEX_EMBED_CONCURRENCY = int(os.getenv("INDEX_EMBED_CONCURRENCY", "4"))
+INDEX_CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "1000"))
+INDEX_CHUNK_OVERLAP = int(os.getenv("INDEX_CHUNK_OVERLAP", "100"))
+
+CONTENT_PAYLOAD_KEY = "page_content"
+METADATA_PAYLOAD_KEY = "metadata"
+
+embed_executor = ThreadPoolExecutor(max_workers=16,
+                                    thread_name_prefix="vaani-embed")
+
+
+@dataclass
+class IndexProgress:
+    """Progress of one indexing run, passed to progress callbacks."""
+    chunks: int
+    batches: int
+    elapsed: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Indexing throughput so far."""
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def make_loader(file_url: str):
+    """Returns the LangChain loader for a supported document type."""
+    if file_url.endswith('.pdf'):
+        return PyPDFLoader(file_url)
+    if file_url.endswith('.txt'):
+        return TextLoader(file_url)
+    if file_url.endswith('.docx'):
+        return Docx2txtLoader(file_url)
+    raise ValueError(f"Unsupported file type: {file_url}")
+
+
+def iter_document_chunks(file_url: str,
+                         metadata: Optional[dict] = None,
+                         chunk_size: int = INDEX_CHUNK_SIZE,
+                         chunk_overlap: int = INDEX_CHUNK_OVERLAP
+                         ) -> Iterator[Document]:
+    """Yields the chunks of a document, loading and splitting page by page.
+
+    Pages are split independently, exactly as split_documents() splits the
+    per-page documents of a fully loaded file. Local PDF and DOCX files are
+    parsed on the process pool (see parsing.py).
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size,
+                                              chunk_overlap=chunk_overlap)
+    if os.path.isfile(file_url) and file_url.endswith((".pdf", ".docx")):
+        page_iter = iter_pages(file_url)
+    else:
+        page_iter = make_loader(file_url).lazy_load()
+    pages = 0
+    for page in page_iter:
+        pages += 1
+        for chunk in splitter.split_documents([page]):
+            if metadata:
+                chunk.metadata.update(metadata)
+            yield chunk
+    logger.info(f"Loaded {pages} pages from {file_url}")
+
+
+def batched(items: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    """Yields lists of up to size items without materialising the input."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IndexingPipeline:
+    """Embeds and upserts document chunks into one Qdrant collection."""
+
+    def __init__(self,
+                 client: QdrantClient,
+                 collection_name: str,
+                 embeddings: Embeddings,
+                 batch_size: int = INDEX_EMBED_BATCH_SIZE,
+                 concurrency: int = INDEX_EMBED_CONCURRENCY,
+                 progress: Optional[Callable[[IndexProgress], None]] = None,
+                 distance: qdrant_models.Distance = qdrant_models.Distance.COSINE,
+                 payload_indexes: Sequence[str] = (),
+                 id_namespace: Optional[str] = None,
+                 collection_options: Optional[Dict[str, Any]] = None):
+        """payload_indexes are keyword-indexed when the collection is
+        created. id_namespace keeps point ids of different tenants apart in
+        a shared collection; it defaults to the collection name.
+        collection_options are extra create_collection arguments (HNSW,
+        quantization, on-disk payload)."""
+        self.client = client
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.progress = progress
+        self.distance = distance
+        self.payload_indexes = tuple(payload_indexes)
+        self.id_namespace = id_namespace or collection_name
+        self.collection_options = collection_options or {}
+        self._collection_ready = False
+        self._lock = threading.Lock()
+
+    def ensure_collection(self, vector_size: int) -> None:
+        """Creates the collection on first use if it does not exist."""
+        with self._lock:
+            if self._collection_ready:
+                return
+            if not self.client.collection_exists(self.collection_name):
+                try:
+                    self.client.create_collection(
+                        self.collection_name,
+                        vectors_config=qdrant_models.VectorParams(
+                            size=vector_size, distance=self.distance),
+                        **self.collection_options)
+                except Exception:
+                    # Another indexer may have created a shared collection
+                    if not self.client.collection_exists(self.collection_name):
+                        raise
+                for key in self.payload_indexes:
+                    self.client.create_payload_index(
+                        self.collection_name,
+                        field_name=key,
+                        field_schema=qdrant_models.PayloadSchemaType.KEYWORD)
+            self._collection_ready = True
+
+    def point_id(self, index: int, document: Document) -> str:
+        """Deterministic point id, so a retried batch overwrites itself."""
+        return str(
+            uuid.uuid5(uuid.NAMESPACE_URL,
+                       f"{self.id_namespace}/{index}/{document.page_content}"))
+
+    def _embed(self, batch: List[Document]) -> List[List[float]]:
+        with metrics.timer("indexing.embed_batch_latency"):
+            return self.embeddings.embed_documents(
+                [document.page_content for document in batch])
+
+    def _upsert(self, first_index: int, batch: List[Document],
+                vectors: List[List[float]], wait: bool) -> None:
+        self.ensure_collection(len(vectors[0]))
+        points = [
+            qdrant_models.PointStruct(
+                id=self.point_id(first_index + offset, document),
+                vector=vector,
+                payload={
+                    CONTENT_PAYLOAD_KEY: document.page_content,
+                    METADATA_PAYLOAD_KEY: document.metadata,
+                }) for offset, (document, vector) in enumerate(
+                    zip(batch, vectors))
+        ]
+        with metrics.timer("indexing.upsert_latency"):
+            self.client.upsert(self.collection_name, points=points, wait=wait)
+
+    def index(self, documents: Iterable[Document]) -> IndexProgress:
+        """Indexes the documents and returns the final progress."""
+        started = time.perf_counter()
+        in_flight: Deque[Tuple[int, List[Document], Future]] = deque()
+        chunks = batches = 0
+        next_index = 0
+        # The last completed batch is held back so its upsert can wait
+        pending: Optional[Tuple[int, List[Document], List[List[float]]]] = None
+
+        def complete_oldest():
+            nonlocal chunks, batches, pending
+            first_index, batch, future = in_flight.popleft()
+            vectors = future.result()
+            if pending is not None:
+                self._upsert(*pending, wait=False)
+            pending = (first_index, batch, vectors)
+            chunks += len(batch)
+            batches += 1
+            state = IndexProgress(chunks, batches,
+                                  time.perf_counter() - started)
+            logger.info(f"Indexed {state.chunks} chunks into "
+                        f"{self.collection_name} "
+                        f"({state.chunks_per_second:.1f} chunks/s)")
+            if self.progress is not None:
+                self.progress(state)
+
+        try:
+            for batch in batched(documents, self.batch_size):
+                if len(in_flight) >= self.concurrency:
+                    complete_oldest()
+                in_flight.append((next_index, batch,
+                                  embed_executor.submit(self._embed, batch)))
+                next_index += len(batch)
+            while in_flight:
+                complete_oldest()
+            if pending is not None:
+                # Barrier: returns once every earlier upsert is applied too
+                self._upsert(*pending, wait=True)
+        finally:
+            for _, _, future in in_flight:
+                future.cancel()
+
+        result = IndexProgress(chunks, batches, time.perf_counter() - started)
+        metrics.incr("indexing.chunks", chunks)
+        metrics.incr("indexing.batches", batches)
+        metrics.observe("indexing.duration", result.elapsed)
+        logger.info(
+            f"Indexing finished: {chunks} chunks in {result.elapsed:.2f}s "
+            f"({result.chunks_per_second:.1f} chunks/s)")
+        return result
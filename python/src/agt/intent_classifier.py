@@ -0,0 +1,253 @@
+"""In-process intent classifier that stands in for the LLM routing call.
+
+The model is a TF-IDF weighted bag of word unigrams and bigrams feeding a
+multinomial logistic regression, implemented in pure Python so it adds no
+dependencies and predicts in well under a millisecond. It is trained from the
+routing decisions the orchestrator logs when ``ROUTING_LOG_PATH`` is set
+(see ``log_routing_decision``). The log holds raw user queries, so it is
+off by default and rotated at ``ROUTING_LOG_MAX_BYTES``:
+
+    python -m agt.intent_classifier --log routing_decisions.jsonl \\
+        --out intent_model.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Routing decisions made by these sources are used as training labels.
+# Classifier decisions are excluded so the model does not learn from itself.
+TRAINING_SOURCES = ("keyword", "llm")
+
+# The routing log is rotated to <path>.1 once it grows past this size
+ROUTING_LOG_MAX_BYTES = int(os.getenv("ROUTING_LOG_MAX_BYTES",
+                                      str(10 * 1024 * 1024)))
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_log_lock = threading.Lock()
+
+
+def extract_features(query: str,
+                     has_document: bool = False,
+                     indexed: bool = False) -> Dict[str, float]:
+    """Returns term counts for unigrams, bigrams and routing state flags."""
+    tokens = _TOKEN_RE.findall(query.lower())
+    features: Dict[str, float] = {}
+    for token in tokens:
+        features[token] = features.get(token, 0) + 1
+    for first, second in zip(tokens, tokens[1:]):
+        bigram = f"{first} {second}"
+        features[bigram] = features.get(bigram, 0) + 1
+    # State flags let the model separate document questions from chit-chat
+    if has_document:
+        features["__document__"] = 1
+    if indexed:
+        features["__indexed__"] = 1
+    return features
+
+
+class IntentClassifier:
+    """TF-IDF + softmax regression over routing labels."""
+
+    def __init__(self, labels: List[str], idf: Dict[str, float],
+                 weights: Dict[str, Dict[str, float]], bias: Dict[str, float]):
+        self.labels = labels
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    def _vectorize(self, features: Dict[str, float]) -> Dict[str, float]:
+        vector = {
+            name: (1 + math.log(count)) * self.idf[name]
+            for name, count in features.items() if name in self.idf
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm:
+            vector = {name: value / norm for name, value in vector.items()}
+        return vector
+
+    def _probabilities(self, vector: Dict[str, float]) -> Dict[str, float]:
+        scores = {}
+        for label in self.labels:
+            label_weights = self.weights[label]
+            scores[label] = self.bias[label] + sum(
+                label_weights.get(name, 0.0) * value
+                for name, value in vector.items())
+        peak = max(scores.values())
+        exps = {label: math.exp(score - peak) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+    def predict_proba(self,
+                      query: str,
+                      has_document: bool = False,
+                      indexed: bool = False) -> Dict[str, float]:
+        """Returns the probability of each routing label."""
+        vector = self._vectorize(extract_features(query, has_document, indexed))
+        return self._probabilities(vector)
+
+    def predict(self,
+                query: str,
+                has_document: bool = False,
+                indexed: bool = False) -> Tuple[str, float]:
+        """Returns the most likely label and its probability."""
+        probabilities = self.predict_proba(query, has_document, indexed)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    @classmethod
+    def train(cls,
+              examples: List[Tuple[Dict[str, float], str]],
+              epochs: int = 30,
+              learning_rate: float = 0.5,
+              l2: float = 1e-4,
+              seed: int = 0) -> "IntentClassifier":
+        """Fits the model on (features, label) pairs with plain SGD."""
+        if not examples:
+            raise ValueError("Cannot train an intent classifier without examples")
+        labels = sorted({label for _, label in examples})
+        document_frequency: Dict[str, int] = {}
+        for features, _ in examples:
+            for name in features:
+                document_frequency[name] = document_frequency.get(name, 0) + 1
+        total = len(examples)
+        idf = {
+            name: math.log((1 + total) / (1 + count)) + 1
+            for name, count in document_frequency.items()
+        }
+        model = cls(labels, idf, {label: {} for label in labels},
+                    {label: 0.0 for label in labels})
+
+        vectors = [(model._vectorize(features), label)
+                   for features, label in examples]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(vectors)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for vector, target in vectors:
+                probabilities = model._probabilities(vector)
+                for label in labels:
+                    gradient = probabilities[label] - (1.0 if label == target
+                                                       else 0.0)
+                    label_weights = model.weights[label]
+                    for name, value in vector.items():
+                        weight = label_weights.get(name, 0.0)
+                        label_weights[name] = weight - rate * (
+                            gradient * value + l2 * weight)
+                    model.bias[label] -= rate * gradient
+        return model
+
+    def save(self, path: str) -> None:
+        """Writes the model as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "labels": self.labels,
+                    "idf": self.idf,
+                    "weights": self.weights,
+                    "bias": self.bias,
+                }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        """Reads a model written by save()."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["labels"], data["idf"], data["weights"], data["bias"])
+
+
+def log_routing_decision(path: Optional[str], query: str, agent: str,
+                         source: str, has_document: bool,
+                         indexed: bool) -> None:
+    """Appends one routing decision to the JSONL training log.
+
+    Nothing is logged without a path. The log is rotated once it exceeds
+    ROUTING_LOG_MAX_BYTES, keeping a single previous file.
+    """
+    if not path or not query:
+        return
+    record = {
+        "ts": time.time(),
+        "query": query,
+        "agent": agent,
+        "source": source,
+        "has_document": has_document,
+        "indexed": indexed,
+    }
+    try:
+        with _log_lock:
+            if (ROUTING_LOG_MAX_BYTES > 0 and os.path.exists(path)
+                    and os.path.getsize(path) >= ROUTING_LOG_MAX_BYTES):
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not log routing decision: {e}")
+
+
+def load_examples(
+        records: Iterable[Dict],
+        sources: Iterable[str] = TRAINING_SOURCES
+) -> List[Tuple[Dict[str, float], str]]:
+    """Turns logged routing decisions into training examples."""
+    sources = set(sources)
+    examples = []
+    for record in records:
+        if record.get("source") not in sources or not record.get("query"):
+            continue
+        features = extract_features(record["query"],
+                                    record.get("has_document", False),
+                                    record.get("indexed", False))
+        examples.append((features, record["agent"]))
+    return examples
+
+
+def read_log(path: str) -> List[Dict]:
+    """Reads a JSONL routing log and its rotated predecessor, skipping
+    malformed lines."""
+    records = []
+    for name in (path + ".1", path):
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def main():
+    """Trains a classifier from a routing log and saves it."""
+    parser = argparse.ArgumentParser(
+        description="Train the routing intent classifier from logged decisions.")
+    parser.add_argument("--log",
+                        default=os.getenv("ROUTING_LOG_PATH")
+                        or "routing_decisions.jsonl")
+    parser.add_argument("--out",
+                        default=os.getenv("INTENT_MODEL_PATH",
+                                          "intent_model.json"))
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    examples = load_examples(read_log(args.log))
+    model = IntentClassifier.train(examples, epochs=args.epochs)
+    model.save(args.out)
+    logger.info(
+        f"Trained intent classifier on {len(examples)} decisions "
+        f"({', '.join(model.labels)}) -> {args.out}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,202 @@
+"""In-process exact vector index for small documents.
+
+A two-page text file does not need a round trip to a remote Qdrant for
+every retrieval. Documents with at most ``LOCAL_INDEX_MAX_CHUNKS`` chunks
+are kept in a numpy matrix of normalised vectors and searched exactly with
+one matrix-vector product, well under a millisecond at that size. With
+``LOCAL_INDEX_INT8`` vectors are stored as int8 with one scale per vector,
+a quarter of the float32 size, at a small cost in score precision.
+
+Indexes are persisted under ``LOCAL_INDEX_DIR`` (next to the checkpoint
+database by default), memory-mapped on load and kept in a small in-process
+cache. They are named ``local:<key>``; the name takes the place of a Qdrant
+collection name in the graph state and the document registry.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from .cache import TTLCache
+    from .metrics import metrics
+except ImportError:
+    from cache import TTLCache
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Documents with more chunks than this go to Qdrant; 0 disables the backend
+LOCAL_INDEX_MAX_CHUNKS = int(os.getenv("LOCAL_INDEX_MAX_CHUNKS", "200"))
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vaani_local_index")
+LOCAL_INDEX_INT8 = os.getenv("LOCAL_INDEX_INT8", "false").lower() == "true"
+
+LOCAL_PREFIX = "local:"
+
+_loaded = TTLCache(maxsize=64, ttl=3600)
+
+
+def local_index_enabled() -> bool:
+    """Whether small documents may be indexed locally (needs numpy)."""
+    return np is not None and LOCAL_INDEX_MAX_CHUNKS > 0
+
+
+def local_index_name(collection_name: str,
+                     scope: Optional[Dict[str, str]] = None) -> str:
+    """Name of the local index standing in for a collection (and scope)."""
+    key = collection_name + json.dumps(scope or {}, sort_keys=True)
+    return LOCAL_PREFIX + hashlib.md5(key.encode()).hexdigest()[:16]
+
+
+def is_local_index(name: Optional[str]) -> bool:
+    """Whether a collection name refers to a local index."""
+    return bool(name) and name.startswith(LOCAL_PREFIX)
+
+
+def _directory(name: str) -> str:
+    return os.path.join(LOCAL_INDEX_DIR, name[len(LOCAL_PREFIX):])
+
+
+class LocalVectorIndex:
+    """Exact cosine search over an in-memory matrix of chunk vectors."""
+
+    def __init__(self,
+                 texts: Sequence[str],
+                 vectors,
+                 document_hash: Optional[str] = None,
+                 scales=None):
+        """vectors are unit-length float32 rows, or int8 rows with scales."""
+        self.texts = list(texts)
+        self.vectors = vectors
+        self.document_hash = document_hash
+        self.scales = scales
+
+    @classmethod
+    def build(cls,
+              texts: Sequence[str],
+              vectors: Sequence[Sequence[float]],
+              document_hash: Optional[str] = None,
+              quantize: bool = LOCAL_INDEX_INT8) -> "LocalVectorIndex":
+        """Normalises (and optionally quantises) raw embedding vectors."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            matrix = np.zeros((0, 1), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        if not quantize:
+            return cls(texts, matrix, document_hash)
+        # Symmetric per-vector quantisation: v ~= q * scale / 127
+        scales = np.abs(matrix).max(axis=1).astype(np.float32)
+        safe = np.where(scales == 0, 1, scales)[:, None]
+        quantized = np.round(matrix / safe * 127).astype(np.int8)
+        return cls(texts, quantized, document_hash, scales)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the vectors and scales."""
+        extra = self.scales.nbytes if self.scales is not None else 0
+        return self.vectors.nbytes + extra
+
+    def scores(self, query_vector: Sequence[float]):
+        """Cosine similarity of the query to every chunk."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if self.scales is None:
+            return self.vectors @ query
+        return (self.vectors @ query) * (self.scales / 127)
+
+    def search(self, query_vector: Sequence[float],
+               k: int = 3) -> List[Tuple[int, float]]:
+        """Returns (chunk index, cosine similarity) of the k best chunks."""
+        if not self.texts:
+            return []
+        scores = self.scores(query_vector)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def search_texts(self, query_vector: Sequence[float],
+                     k: int = 3) -> List[str]:
+        """Returns the texts of the k best chunks, best first."""
+        return [self.texts[i] for i, _ in self.search(query_vector, k)]
+
+    def save(self, directory: str) -> None:
+        """Writes the index without exposing a partial one.
+
+        The new index is staged next to the old one and swapped in by two
+        renames; load_local_index() falls back to the old copy during the
+        swap, so readers see either the old or the new index.
+        """
+        staging = directory + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "vectors.npy"), self.vectors)
+        if self.scales is not None:
+            np.save(os.path.join(staging, "scales.npy"), self.scales)
+        with open(os.path.join(staging, "chunks.json"), "w") as f:
+            json.dump({"document_hash": self.document_hash,
+                       "texts": self.texts}, f)
+        previous = directory + ".old"
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.isdir(directory):
+            os.replace(directory, previous)
+        os.replace(staging, directory)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str) -> "LocalVectorIndex":
+        """Loads a saved index, memory-mapping the vectors."""
+        with open(os.path.join(directory, "chunks.json")) as f:
+            chunks = json.load(f)
+        vectors = np.load(os.path.join(directory, "vectors.npy"),
+                          mmap_mode="r")
+        scales_path = os.path.join(directory, "scales.npy")
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        return cls(chunks["texts"], vectors, chunks["document_hash"], scales)
+
+
+def save_local_index(name: str, index: LocalVectorIndex) -> None:
+    """Persists an index under its name and caches it in-process."""
+    index.save(_directory(name))
+    _loaded.set(name, index)
+    metrics.incr("local_index.built")
+    logger.info(f"Saved local index {name}: {len(index)} chunks, "
+                f"{index.nbytes} bytes")
+
+
+def load_local_index(name: str) -> Optional[LocalVectorIndex]:
+    """Returns a persisted local index, or None if there is none."""
+    index = _loaded.get(name)
+    if index is not None:
+        return index
+    directory = _directory(name)
+    # The old copy is only present while save() swaps a new one in
+    for candidate in (directory, directory + ".old", directory):
+        try:
+            index = LocalVectorIndex.load(candidate)
+        except FileNotFoundError:
+            continue
+        _loaded.set(name, index)
+        return index
+    return None
+
+
+def delete_local_index(name: str) -> None:
+    """Removes a local index from disk and from the in-process cache."""
+    _loaded.delete(name)
+    shutil.rmtree(_directory(name), ignore_errors=True)
+    shutil.rmtree(_directory(name) + ".old", ignore_errors=True)
@@ -0,0 +1,87 @@
+"""Process-wide counters and latency timings for the Vaani agent.
+
+Nodes record what they did (cache hits, avoided model calls, wasted tokens)
+through the shared ``metrics`` registry, and the API exposes a snapshot of it.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+
+class Metrics:
+    """Thread-safe registry of counters, timings and derived ratios."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        # name -> [count, total seconds, max seconds]
+        self._timings: Dict[str, List[float]] = {}
+        self._ratios: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Adds value to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Records one duration sample."""
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Times the enclosed block and records it under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def register_ratio(self, name: str, numerator: Union[str, List[str]],
+                       denominator: Union[str, List[str]]) -> None:
+        """Reports sum(numerator) / sum(denominator) counters in snapshots."""
+        if isinstance(numerator, str):
+            numerator = [numerator]
+        if isinstance(denominator, str):
+            denominator = [denominator]
+        with self._lock:
+            self._ratios[name] = (list(numerator), list(denominator))
+
+    def get(self, name: str) -> float:
+        """Returns the current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns a JSON-serialisable copy of all metrics."""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {
+                    "count": int(count),
+                    "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                    "max_ms": round(peak * 1000, 3),
+                    "total_ms": round(total * 1000, 3),
+                }
+                for name, (count, total, peak) in self._timings.items()
+            }
+            ratios = {}
+            for name, (numerator, denominator) in self._ratios.items():
+                den = sum(counters.get(counter, 0) for counter in denominator)
+                num = sum(counters.get(counter, 0) for counter in numerator)
+                ratios[name] = round(num / den, 4) if den else None
+        return {"counters": counters, "timings": timings, "ratios": ratios}
+
+    def reset(self) -> None:
+        """Clears counters and timings, keeping registered ratios."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,161 @@
+"""Parallel text extraction for uploaded PDF and DOCX files.
+
+PDF text extraction is CPU-bound, so large PDFs are split into page-range
+shards that are parsed on a process pool and yielded back in page order.
+Only a window of shards is submitted ahead of the consumer, which keeps
+memory bounded when the pages feed the streaming indexing pipeline. DOCX
+parsing runs on the same pool so it does not hold the GIL of the process
+that serves agent turns. Small PDFs are parsed in-process, where the pool's
+start-up and pickling overhead would outweigh the gain.
+
+Pages are returned as LangChain documents with the same "source" and
+"page" metadata as PyPDFLoader and Docx2txtLoader.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(
+    os.getenv("PARSE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PARSE_PAGES_PER_SHARD = int(os.getenv("PARSE_PAGES_PER_SHARD", "16"))
+# PDFs with fewer pages are parsed in-process
+PARSE_PARALLEL_MIN_PAGES = int(os.getenv("PARSE_PARALLEL_MIN_PAGES", "32"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    """Start method of the parsing pool: forkserver where available.
+
+    The fork server is a fresh process with only this module preloaded, so
+    workers forked from it do not copy the parent's threads or its API and
+    agent stack. Spawn is the fallback on platforms without forkserver.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def get_parse_pool(workers: int = PARSE_WORKERS) -> ProcessPoolExecutor:
+    """Returns the shared parsing pool, started on first use.
+
+    Workers are not forked from the parent, which runs many threads
+    (executors, the event loop) that fork would not copy. They also skip
+    importing the parent's main script as long as the server is launched
+    through a module entry point (``uvicorn main:app``, or ``python main.py``
+    which hands over to uvicorn's), so each worker holds only this module.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_mp_context())
+            _pool_workers = workers
+        return _pool
+
+
+def count_pdf_pages(path: str) -> int:
+    """Number of pages of a PDF file."""
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int,
+                      stop: int) -> List[Tuple[int, str]]:
+    """Extracts the text of pages [start, stop); runs in a worker process."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "")
+            for number in range(start, stop)]
+
+
+def extract_docx_text(path: str) -> str:
+    """Extracts the text of a DOCX file; runs in a worker process."""
+    import docx2txt
+
+    return docx2txt.process(path)
+
+
+def iter_pdf_pages(path: str,
+                   workers: int = PARSE_WORKERS,
+                   pages_per_shard: int = PARSE_PAGES_PER_SHARD
+                   ) -> Iterator[Document]:
+    """Yields the pages of a PDF in order, parsing shards in parallel."""
+    started = time.perf_counter()
+    total = count_pdf_pages(path)
+
+    if workers <= 1 or total < PARSE_PARALLEL_MIN_PAGES:
+        shards = ((start, min(start + pages_per_shard, total))
+                  for start in range(0, total, pages_per_shard))
+        for start, stop in shards:
+            for number, text in extract_pdf_pages(path, start, stop):
+                yield Document(page_content=text,
+                               metadata={"source": path, "page": number})
+    else:
+        pool = get_parse_pool(workers)
+        # Keep every worker busy with one shard queued behind it
+        window = workers * 2
+        in_flight: Deque[Future] = deque()
+        next_start = 0
+        try:
+            while next_start < total or in_flight:
+                while next_start < total and len(in_flight) < window:
+                    stop = min(next_start + pages_per_shard, total)
+                    in_flight.append(
+                        pool.submit(extract_pdf_pages, path, next_start, stop))
+                    next_start = stop
+                for number, text in in_flight.popleft().result():
+                    yield Document(page_content=text,
+                                   metadata={"source": path, "page": number})
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    elapsed = time.perf_counter() - started
+    metrics.incr("parsing.pages", total)
+    metrics.observe("parsing.pdf_duration", elapsed)
+    logger.info(f"Parsed {total} PDF pages in {elapsed:.2f}s "
+                f"({total / elapsed if elapsed else 0:.1f} pages/s)")
+
+
+def iter_docx_pages(path: str,
+                    workers: int = PARSE_WORKERS) -> Iterator[Document]:
+    """Yields a DOCX file as one document, parsed off the serving process."""
+    if workers <= 1:
+        text = extract_docx_text(path)
+    else:
+        text = get_parse_pool(workers).submit(extract_docx_text, path).result()
+    yield Document(page_content=text, metadata={"source": path})
+
+
+def iter_pages(path: str, workers: int = PARSE_WORKERS) -> Iterator[Document]:
+    """Yields the pages of a local PDF or DOCX file."""
+    if path.endswith(".pdf"):
+        return iter_pdf_pages(path, workers)
+    if path.endswith(".docx"):
+        return iter_docx_pages(path, workers)
+    raise ValueError(f"Unsupported file type for parallel parsing: {path}")
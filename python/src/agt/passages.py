@@ -0,0 +1,114 @@
+"""Relevance-ranked passage extraction for search result context.
+
+Instead of truncating every fetched page to a fixed prefix, pages are split
+into passages, the passages are ranked against the query with BM25, and the
+best ones are packed into a shared token budget across all results.
+"""
+
+import os
+import re
+from typing import Any, Dict, List
+
+try:
+    from .bm25 import BM25, tokenize
+    from .metrics import metrics
+    from .tokens import estimate_tokens
+except ImportError:
+    from bm25 import BM25, tokenize
+    from metrics import metrics
+    from tokens import estimate_tokens
+
+SEARCH_CONTEXT_TOKEN_BUDGET = int(
+    os.getenv("SEARCH_CONTEXT_TOKEN_BUDGET", "1500"))
+PASSAGE_WORDS = int(os.getenv("SEARCH_PASSAGE_WORDS", "80"))
+
+metrics.register_ratio("search.context_compression",
+                       "search.context_tokens_selected",
+                       "search.context_tokens_fetched")
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\r\n\s*\r\n")
+
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> List[str]:
+    """Splits text into passages of at most max_words words.
+
+    Short paragraphs are merged and long ones are cut into overlapping
+    windows so no passage loses the context at its edges entirely.
+    """
+    passages: List[str] = []
+    current: List[str] = []
+    overlap = max_words // 4
+    for paragraph in _PARAGRAPH_RE.split(text or ""):
+        words = paragraph.split()
+        if not words:
+            continue
+        if len(current) + len(words) <= max_words:
+            current.extend(words)
+            continue
+        if current:
+            passages.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words - overlap:]
+        current = list(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def select_passages(results: List[Dict[str, Any]],
+                    query: str,
+                    text_key: str = "text",
+                    token_budget: int = SEARCH_CONTEXT_TOKEN_BUDGET
+                    ) -> List[Dict[str, Any]]:
+    """Replaces each result's text with its most relevant passages.
+
+    Every result first gets its best passage (in ranking order) while the
+    budget allows, then the remaining budget goes to the best passages
+    overall that share at least one term with the query. Results left
+    without any passage are dropped; passages and results keep their order.
+    """
+    candidates = []
+    fetched_tokens = 0
+    for result_index, result in enumerate(results):
+        text = result.get(text_key) or ""
+        fetched_tokens += estimate_tokens(text)
+        for passage_index, passage in enumerate(split_passages(text)):
+            candidates.append((result_index, passage_index, passage))
+    if not candidates:
+        return []
+
+    index = BM25([tokenize(passage) for _, _, passage in candidates])
+    scores = index.scores(tokenize(query))
+    ranked = sorted(range(len(candidates)),
+                    key=lambda i: scores[i],
+                    reverse=True)
+
+    chosen = set()
+    used = 0
+    covered = set()
+    for pass_number in (0, 1):
+        for i in ranked:
+            result_index = candidates[i][0]
+            if i in chosen or (pass_number == 0 and result_index in covered):
+                continue
+            if pass_number == 1 and scores[i] <= 0:
+                break
+            tokens = estimate_tokens(candidates[i][2])
+            if used + tokens > token_budget:
+                continue
+            chosen.add(i)
+            covered.add(result_index)
+            used += tokens
+
+    selected: Dict[int, List[str]] = {}
+    for i in sorted(chosen, key=lambda i: candidates[i][:2]):
+        selected.setdefault(candidates[i][0], []).append(candidates[i][2])
+
+    metrics.incr("search.context_tokens_fetched", fetched_tokens)
+    metrics.incr("search.context_tokens_selected", used)
+    return [{
+        **result, text_key: " ... ".join(selected[result_index])
+    } for result_index, result in enumerate(results)
+            if result_index in selected]
@@ -0,0 +1,150 @@
+"""Shared Qdrant clients, collection options and search parameters.
+
+A client is created once per process instead of once per call, so its
+connection pool (or gRPC channel, with ``QDRANT_PREFER_GRPC``) is reused.
+Retrieval goes through an ``AsyncQdrantClient`` that lives on a dedicated
+event-loop thread: searches issued from graph nodes, executor threads and
+the API's event loop are all multiplexed over that one client without
+blocking each other. Indexing and administration keep using the shared
+synchronous client.
+
+Collection creation options (HNSW ``m``/``ef_construct``, int8 scalar
+quantization, on-disk payloads) and the per-query ``hnsw_ef`` come from
+environment variables, to trade recall for latency and memory.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Dict, List, Optional
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+logger = logging.getLogger(__name__)
+
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+
+# Collection creation; 0 or empty keeps Qdrant's defaults
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "0"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "0"))
+QDRANT_SCALAR_QUANTIZATION = os.getenv("QDRANT_SCALAR_QUANTIZATION",
+                                       "false").lower() == "true"
+QDRANT_ON_DISK_PAYLOAD = os.getenv("QDRANT_ON_DISK_PAYLOAD", "")
+
+# Search; 0 keeps the collection's default ef
+QDRANT_SEARCH_HNSW_EF = int(os.getenv("QDRANT_SEARCH_HNSW_EF", "0"))
+# Re-score quantized candidates with the original vectors
+QDRANT_QUANTIZATION_RESCORE = os.getenv("QDRANT_QUANTIZATION_RESCORE",
+                                        "true").lower() == "true"
+
+_lock = threading.Lock()
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _client_options() -> Dict[str, Any]:
+    # Read at connection time: the agent loads .env after importing helpers
+    return {
+        "url": os.getenv("QDRANT_URL"),
+        "api_key": os.getenv("QDRANT_API_KEY"),
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "timeout": QDRANT_TIMEOUT,
+    }
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Returns the process-wide synchronous client."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = QdrantClient(**_client_options())
+            logger.info(f"Qdrant client created (grpc={QDRANT_PREFER_GRPC})")
+        return _client
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Starts the event-loop thread that owns the async client."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever,
+                             name="vaani-qdrant-loop",
+                             daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_async(coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Runs a coroutine on the Qdrant loop and waits for its result."""
+    future = asyncio.run_coroutine_threadsafe(coroutine, _get_loop())
+    return future.result(timeout)
+
+
+async def _get_async_client() -> AsyncQdrantClient:
+    # Created on the loop thread, which its connections are bound to
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(**_client_options())
+    return _async_client
+
+
+def collection_create_options() -> Dict[str, Any]:
+    """Keyword arguments for create_collection from the configuration."""
+    options: Dict[str, Any] = {}
+    if QDRANT_HNSW_M or QDRANT_HNSW_EF_CONSTRUCT:
+        options["hnsw_config"] = qdrant_models.HnswConfigDiff(
+            m=QDRANT_HNSW_M or None,
+            ef_construct=QDRANT_HNSW_EF_CONSTRUCT or None)
+    if QDRANT_SCALAR_QUANTIZATION:
+        options["quantization_config"] = qdrant_models.ScalarQuantization(
+            scalar=qdrant_models.ScalarQuantizationConfig(
+                type=qdrant_models.ScalarType.INT8, always_ram=True))
+    if QDRANT_ON_DISK_PAYLOAD:
+        options["on_disk_payload"] = QDRANT_ON_DISK_PAYLOAD.lower() == "true"
+    return options
+
+
+def search_params() -> Optional[qdrant_models.SearchParams]:
+    """Per-query search parameters from the configuration."""
+    if not (QDRANT_SEARCH_HNSW_EF or QDRANT_SCALAR_QUANTIZATION):
+        return None
+    quantization = None
+    if QDRANT_SCALAR_QUANTIZATION:
+        quantization = qdrant_models.QuantizationSearchParams(
+            rescore=QDRANT_QUANTIZATION_RESCORE)
+    return qdrant_models.SearchParams(hnsw_ef=QDRANT_SEARCH_HNSW_EF or None,
+                                      quantization=quantization)
+
+
+async def search_payloads(collection_name: str,
+                          vector: List[float],
+                          k: int,
+                          query_filter: Optional[qdrant_models.Filter] = None,
+                          payload_key: str = "page_content") -> List[Any]:
+    """Returns one payload field of the k nearest points."""
+    client = await _get_async_client()
+    response = await client.query_points(collection_name,
+                                         query=vector,
+                                         limit=k,
+                                         query_filter=query_filter,
+                                         search_params=search_params(),
+                                         with_payload=[payload_key])
+    return [(point.payload or {}).get(payload_key) for point in response.points]
+
+
+def search_payloads_sync(collection_name: str,
+                         vector: List[float],
+                         k: int,
+                         query_filter: Optional[qdrant_models.Filter] = None,
+                         payload_key: str = "page_content") -> List[Any]:
+    """search_payloads() for callers outside the Qdrant event loop."""
+    return run_async(
+        search_payloads(collection_name, vector, k, query_filter, payload_key),
+        timeout=QDRANT_TIMEOUT * 2)
@@ -0,0 +1,159 @@
+"""Deadline-aware Reflexion loop for the web search agent.
+
+Each round searches the queries suggested by the latest reflection and asks
+the model to revise its answer with everything found so far. Another round
+only starts while the reflection still reports gaps, there are queries that
+have not been searched yet, the answer is still changing, and the time left
+in the latency budget covers a round as slow as the slowest one so far.
+"""
+
+import difflib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from .metrics import metrics
+    from .search_cache import normalize_query
+except ImportError:
+    from metrics import metrics
+    from search_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+REFLEXION_LATENCY_BUDGET = float(os.getenv("REFLEXION_LATENCY_BUDGET", "30"))
+REFLEXION_MAX_ROUNDS = int(os.getenv("REFLEXION_MAX_ROUNDS", "3"))
+# Answers at least this similar between rounds are considered stable
+REFLEXION_STABILITY_THRESHOLD = float(
+    os.getenv("REFLEXION_STABILITY_THRESHOLD", "0.9"))
+
+# Reflections that say nothing is missing
+_NO_GAP_PHRASES = ("none", "nothing", "n/a", "no gaps", "not applicable",
+                   "nothing significant", "nothing is missing")
+
+
+def answer_similarity(previous: str, current: str) -> float:
+    """Returns the word-level similarity of two answers, between 0 and 1."""
+    return difflib.SequenceMatcher(None, (previous or "").split(),
+                                   (current or "").split()).ratio()
+
+
+def reports_gaps(args: Dict[str, Any]) -> bool:
+    """Returns whether a reflection still names something missing."""
+    reflection = args.get("reflection") or {}
+    if isinstance(reflection, str):
+        missing = reflection
+    else:
+        missing = reflection.get("missing", "")
+    missing = (missing or "").strip().lower().rstrip(".")
+    return bool(missing) and missing not in _NO_GAP_PHRASES
+
+
+@dataclass
+class ReflexionResult:
+    """Outcome of a Reflexion run."""
+    args: Dict[str, Any]
+    rounds: int
+    stop_reason: str
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class ReflexionLoop:
+    """Runs search and revise rounds within a latency budget.
+
+    ``search`` takes a list of queries and returns search results;
+    ``revise`` takes the latest tool arguments, all results gathered so far
+    and the round number, and returns revised tool arguments or None.
+    """
+
+    def __init__(self,
+                 search: Callable[[List[str]], List[Dict[str, Any]]],
+                 revise: Callable[[Dict[str, Any], List[Dict[str, Any]], int],
+                                  Optional[Dict[str, Any]]],
+                 budget: float = REFLEXION_LATENCY_BUDGET,
+                 max_rounds: int = REFLEXION_MAX_ROUNDS,
+                 stability_threshold: float = REFLEXION_STABILITY_THRESHOLD):
+        self.search = search
+        self.revise = revise
+        self.budget = budget
+        self.max_rounds = max_rounds
+        self.stability_threshold = stability_threshold
+
+    def run(self,
+            initial_args: Dict[str, Any],
+            started_at: Optional[float] = None,
+            on_round: Optional[Callable[[int], None]] = None
+            ) -> ReflexionResult:
+        """Improves initial_args until a stop condition is met.
+
+        started_at is the time.monotonic() at which the request started, so
+        work done before the loop counts against the budget.
+        """
+        started_at = time.monotonic() if started_at is None else started_at
+        deadline = started_at + self.budget
+        args = initial_args
+        searched = set()
+        results: List[Dict[str, Any]] = []
+        slowest_round = 0.0
+        rounds = 0
+        stop_reason = "max_rounds"
+
+        while rounds < self.max_rounds:
+            queries = self._new_queries(args.get("search_queries") or [],
+                                        searched)
+            if rounds > 0 and not reports_gaps(args):
+                stop_reason = "no_gaps"
+                break
+            if not queries:
+                stop_reason = "no_new_queries"
+                break
+            if rounds > 0 and time.monotonic() + slowest_round > deadline:
+                stop_reason = "deadline"
+                break
+
+            if on_round is not None:
+                on_round(rounds + 1)
+            round_started = time.monotonic()
+            searched.update(normalize_query(query) for query in queries)
+            results.extend(self.search(queries))
+            if not results:
+                stop_reason = "no_results"
+                break
+            revised = self.revise(args, results, rounds)
+            if revised is None:
+                stop_reason = "revise_failed"
+                break
+            rounds += 1
+            slowest_round = max(slowest_round, time.monotonic() - round_started)
+
+            similarity = answer_similarity(args.get("answer", ""),
+                                           revised.get("answer", ""))
+            args = revised
+            if rounds > 1 and similarity >= self.stability_threshold:
+                stop_reason = "stable"
+                break
+
+        metrics.incr("reflexion.runs")
+        metrics.incr("reflexion.rounds", rounds)
+        metrics.incr(f"reflexion.stop.{stop_reason}")
+        metrics.observe("reflexion.latency", time.monotonic() - started_at)
+        logger.info(
+            f"Reflexion finished after {rounds} rounds ({stop_reason})")
+        return ReflexionResult(args=args,
+                               rounds=rounds,
+                               stop_reason=stop_reason,
+                               results=results)
+
+    @staticmethod
+    def _new_queries(queries: Sequence[str], searched: set) -> List[str]:
+        """Returns the queries not searched in an earlier round, deduplicated."""
+        new_queries = []
+        seen = set(searched)
+        for query in queries:
+            key = normalize_query(query)
+            if key and key not in seen:
+                seen.add(key)
+                new_queries.append(query)
+        return new_queries
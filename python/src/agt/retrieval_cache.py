@@ -0,0 +1,84 @@
+"""Cache of document retrieval results, invalidated by re-indexing.
+
+Results are keyed on (collection version, query, k). Each collection (or
+scope of the shared collection, or local index) has a version token that
+is replaced whenever its content is re-indexed or deleted, so results of
+the previous content become unreachable and expire on their own; no scan
+over cached entries is needed. Both tiers use Redis when configured, so
+workers share results and invalidations.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .cache import make_cache
+    from .metrics import metrics
+except ImportError:
+    from cache import make_cache
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "900"))
+_redis_url = os.getenv("RETRIEVAL_CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+
+metrics.register_ratio("retrieval_cache.hit_rate", "retrieval_cache.hit",
+                       ["retrieval_cache.hit", "retrieval_cache.miss"])
+
+retrieval_cache = make_cache("retrieval", RETRIEVAL_CACHE_SIZE,
+                             RETRIEVAL_CACHE_TTL, _redis_url)
+# Versions must outlive the results they guard
+collection_versions = make_cache("collection_version", 65536,
+                                 30 * 86400, _redis_url)
+
+
+def collection_key(collection_name: str,
+                   scope: Optional[Dict[str, str]] = None) -> str:
+    """Cache key of a collection (and scope)."""
+    return collection_name + json.dumps(scope or {}, sort_keys=True)
+
+
+def collection_version(collection_name: str,
+                       scope: Optional[Dict[str, str]] = None) -> str:
+    """Current version token of a collection (and scope).
+
+    A collection without a stored version (never seen, or its version was
+    evicted or expired) gets a fresh random one, so results cached under an
+    older version can never be served again.
+    """
+    return collection_versions.setdefault(
+        collection_key(collection_name, scope), uuid.uuid4().hex[:12])
+
+
+def invalidate_collection(collection_name: str,
+                          scope: Optional[Dict[str, str]] = None) -> None:
+    """Makes every cached result for the collection (and scope) stale."""
+    collection_versions.set(collection_key(collection_name, scope),
+                            uuid.uuid4().hex[:12])
+    metrics.incr("retrieval_cache.invalidations")
+
+
+def cached_retrieval(collection_name: str,
+                     scope: Optional[Dict[str, str]],
+                     query: str,
+                     k: int,
+                     retrieve: Callable[[], List[str]]) -> List[str]:
+    """Returns cached chunks for the query, or retrieves and caches them."""
+    version = collection_version(collection_name, scope)
+    raw = "\x00".join((collection_key(collection_name, scope), version,
+                       str(k), " ".join(query.split())))
+    key = hashlib.sha256(raw.encode()).hexdigest()
+    chunks = retrieval_cache.get(key)
+    if chunks is not None:
+        metrics.incr("retrieval_cache.hit")
+        return chunks
+    metrics.incr("retrieval_cache.miss")
+    chunks = retrieve()
+    retrieval_cache.set(key, chunks)
+    return chunks
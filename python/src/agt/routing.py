@@ -0,0 +1,123 @@
+"""Compiled keyword router used by the orchestrator before any model call.
+
+Routing rules live in ``routing_rules.json`` (or the file named by the
+``ROUTING_RULES_PATH`` environment variable). Every keyword of every rule is
+compiled into a single case-insensitive regular expression with word
+boundaries. The expression is built from a character trie of the keywords,
+so shared prefixes are matched once and a query is scanned in a single pass
+regardless of how many rules exist.
+"""
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "routing_rules.json")
+
+
+@dataclass(frozen=True)
+class RouteMatch:
+    """A keyword routing decision and the rule that produced it."""
+
+    agent: str
+    keyword: str
+    priority: int
+    span: Tuple[int, int]
+
+    def explain(self) -> str:
+        """Returns a human readable explanation of the match."""
+        return (f"matched '{self.keyword}' at {self.span[0]}-{self.span[1]} "
+                f"(priority {self.priority}) -> {self.agent}")
+
+
+def _normalize_keyword(text: str) -> str:
+    """Lower-cases text and collapses runs of whitespace."""
+    return " ".join(text.lower().split())
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """Builds a regex alternation of the keywords factored by common prefix."""
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            # Greedy optional group: prefer the longest keyword at a position
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class KeywordRouter:
+    """Routes queries to agents using prioritised keyword rules."""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self._keywords: Dict[str, Tuple[str, int]] = {}
+        for rule in rules:
+            priority = int(rule.get("priority", 0))
+            for keyword in rule["keywords"]:
+                keyword = _normalize_keyword(keyword)
+                existing = self._keywords.get(keyword)
+                if existing is None or priority > existing[1]:
+                    self._keywords[keyword] = (rule["agent"], priority)
+        self._pattern = re.compile(
+            r"\b" + _trie_pattern(list(self._keywords)) + r"\b",
+            re.IGNORECASE) if self._keywords else None
+
+    def route(self, query: str) -> Optional[RouteMatch]:
+        """Returns the highest priority match in the query, if any.
+
+        At a given position the longest keyword wins; ties on priority go
+        to the match that appears first in the query.
+        """
+        if not query or self._pattern is None:
+            return None
+        best: Optional[RouteMatch] = None
+        for match in self._pattern.finditer(query):
+            keyword = _normalize_keyword(match.group())
+            if keyword not in self._keywords:
+                continue
+            agent, priority = self._keywords[keyword]
+            if best is None or priority > best.priority:
+                best = RouteMatch(agent=agent,
+                                  keyword=keyword,
+                                  priority=priority,
+                                  span=match.span())
+        return best
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordRouter":
+        """Loads routing rules from a JSON file."""
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["rules"])
+
+
+_router: Optional[KeywordRouter] = None
+
+
+def get_keyword_router() -> KeywordRouter:
+    """Returns the process-wide keyword router, loading it on first use."""
+    global _router
+    if _router is None:
+        path = os.getenv("ROUTING_RULES_PATH") or DEFAULT_RULES_PATH
+        _router = KeywordRouter.from_file(path)
+        logger.info(f"Loaded keyword routing rules from {path}")
+    return _router
@@ -0,0 +1,132 @@
+"""Web search helpers shared by the search-consuming agent nodes."""
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fan-out settings: at most SEARCH_MAX_CONCURRENCY queries of one fan-out run
+# at a time, each query gets SEARCH_QUERY_TIMEOUT seconds once started, and
+# the whole fan-out stops at SEARCH_DEADLINE. Once SEARCH_QUORUM of the
+# queries have succeeded, stragglers get SEARCH_QUORUM_GRACE more seconds.
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+SEARCH_QUERY_TIMEOUT = float(os.getenv("SEARCH_QUERY_TIMEOUT", "8"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "12"))
+SEARCH_QUORUM = float(os.getenv("SEARCH_QUORUM", "0.6"))
+SEARCH_QUORUM_GRACE = float(os.getenv("SEARCH_QUORUM_GRACE", "1.0"))
+
+search_executor = ThreadPoolExecutor(max_workers=16,
+                                     thread_name_prefix="vaani-search")
+# Searches started ahead of a fan-out (e.g. while a draft is streaming) run
+# on their own pool, so fan-out workers never wait on tasks queued behind
+# them on search_executor
+prefetch_executor = ThreadPoolExecutor(max_workers=8,
+                                       thread_name_prefix="vaani-prefetch")
+
+
+def fan_out(queries: Sequence[str],
+            search_fn: Callable[[str], Any],
+            max_concurrency: Optional[int] = None,
+            per_query_timeout: Optional[float] = None,
+            deadline: Optional[float] = None,
+            quorum: Optional[float] = None,
+            grace: Optional[float] = None,
+            in_flight: Optional[Mapping[str, Future]] = None
+            ) -> List[Optional[Any]]:
+    """Runs search_fn for every query concurrently.
+
+    Results are returned in query order so prompts built from them are
+    deterministic. A query that fails, exceeds its timeout or is still
+    running when the fan-out stops contributes None. in_flight maps queries
+    already being searched (see prefetch_executor) to their futures; those
+    are awaited like the others instead of being searched again.
+    """
+    if not queries:
+        return []
+    max_concurrency = max_concurrency or SEARCH_MAX_CONCURRENCY
+    per_query_timeout = per_query_timeout or SEARCH_QUERY_TIMEOUT
+    deadline = deadline or SEARCH_DEADLINE
+    quorum = SEARCH_QUORUM if quorum is None else quorum
+    grace = SEARCH_QUORUM_GRACE if grace is None else grace
+
+    slots = threading.BoundedSemaphore(max_concurrency)
+    stopped = threading.Event()
+    started: Dict[int, float] = {}
+
+    def run(index: int, query: str) -> Any:
+        with slots:
+            if stopped.is_set():
+                return None
+            started[index] = time.monotonic()
+            return search_fn(query)
+
+    begin = time.monotonic()
+    in_flight = in_flight or {}
+    futures: Dict[Future, int] = {}
+    for index, query in enumerate(queries):
+        future = in_flight.get(query)
+        if future is None:
+            future = search_executor.submit(run, index, query)
+        else:
+            started[index] = begin
+            metrics.incr("search.fanout.prefetched")
+        futures[future] = index
+    results: List[Optional[Any]] = [None] * len(queries)
+    needed = min(len(queries), max(1, math.ceil(len(queries) * quorum)))
+    stop_at = begin + deadline
+    succeeded = 0
+    pending = set(futures)
+
+    while pending:
+        now = time.monotonic()
+        for future in list(pending):
+            index = futures[future]
+            if index in started and now - started[index] > per_query_timeout:
+                pending.discard(future)
+                metrics.incr("search.fanout.timeouts")
+                logger.warning(f"Search query timed out: {queries[index]}")
+        if not pending or now >= stop_at:
+            break
+
+        wake_at = stop_at
+        for future in pending:
+            index = futures[future]
+            if index in started:
+                wake_at = min(wake_at, started[index] + per_query_timeout)
+        done, _ = wait(pending,
+                       timeout=max(0.0, wake_at - now),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            index = futures[future]
+            try:
+                results[index] = future.result()
+                succeeded += 1
+            except Exception as e:
+                metrics.incr("search.fanout.errors")
+                logger.error(f"Error searching for query '{queries[index]}': {e}")
+
+        if succeeded >= needed and pending:
+            # Quorum reached: give the remaining queries a short grace period
+            stop_at = min(stop_at, time.monotonic() + grace)
+
+    if pending:
+        stopped.set()
+        for future in pending:
+            future.cancel()
+        metrics.incr("search.fanout.abandoned", len(pending))
+        logger.info(
+            f"Search fan-out returned partial results, {len(pending)} of {len(queries)} queries abandoned"
+        )
+    metrics.observe("search.fanout_latency", time.monotonic() - begin)
+    return results
@@ -0,0 +1,245 @@
+"""Two-tier TTL cache for paid web search results (Exa, Tavily).
+
+Entries are keyed on (provider, normalized query, result count, options) and
+live in an in-process LRU tier backed by an SQLite file, so they survive
+restarts and are shared by workers on the same host. Each entry is fresh for
+a TTL that depends on the query class: time-sensitive "news" queries expire
+in minutes, evergreen queries in a day. After that an entry is served stale
+for a while longer while a background refresh fetches a new copy.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+try:
+    from .cache import TTLCache
+    from .metrics import metrics
+except ImportError:
+    from cache import TTLCache
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.db")
+SEARCH_CACHE_MEMORY_SIZE = int(os.getenv("SEARCH_CACHE_MEMORY_SIZE", "512"))
+SEARCH_CACHE_NEWS_TTL = float(os.getenv("SEARCH_CACHE_NEWS_TTL", "600"))
+SEARCH_CACHE_EVERGREEN_TTL = float(
+    os.getenv("SEARCH_CACHE_EVERGREEN_TTL", "86400"))
+# Entries may be served stale for this multiple of their fresh TTL
+SEARCH_CACHE_STALE_MULTIPLIER = float(
+    os.getenv("SEARCH_CACHE_STALE_MULTIPLIER", "3"))
+
+_NEWS_PATTERN = re.compile(
+    r"\b(?:latest|recent|today|tonight|yesterday|tomorrow|now|breaking|news|"
+    r"current|currently|this (?:week|month|year)|live|score|scores|price|"
+    r"prices|stock|stocks|weather|forecast|update|updates|election|20\d\d)\b",
+    re.IGNORECASE)
+
+metrics.register_ratio(
+    "search.cache.hit_rate",
+    ["search.cache.memory_hit", "search.cache.disk_hit", "search.cache.stale"],
+    [
+        "search.cache.memory_hit", "search.cache.disk_hit",
+        "search.cache.stale", "search.cache.miss"
+    ])
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases a query and collapses whitespace and edge punctuation."""
+    return " ".join(query.lower().split()).strip(" ?!.,;:")
+
+
+def classify_query(query: str) -> str:
+    """Returns "news" for time-sensitive queries, else "evergreen"."""
+    return "news" if _NEWS_PATTERN.search(query) else "evergreen"
+
+
+def freshness_ttl(query: str) -> float:
+    """Returns how long results for the query stay fresh, in seconds."""
+    if classify_query(query) == "news":
+        return SEARCH_CACHE_NEWS_TTL
+    return SEARCH_CACHE_EVERGREEN_TTL
+
+
+def search_cache_key(provider: str, query: str, num_results: int,
+                     options: Optional[Dict[str, Any]] = None) -> str:
+    """Builds the cache key for one search call."""
+    payload = json.dumps([
+        provider, normalize_query(query), num_results, options or {}
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SearchCache:
+    """Memory + SQLite search cache with stale-while-revalidate."""
+
+    def __init__(self, path: Optional[str] = SEARCH_CACHE_PATH,
+                 memory_size: int = SEARCH_CACHE_MEMORY_SIZE):
+        # Memory entries carry their own freshness; the TTL only bounds them
+        self._memory = TTLCache(maxsize=memory_size,
+                                ttl=SEARCH_CACHE_EVERGREEN_TTL *
+                                SEARCH_CACHE_STALE_MULTIPLIER)
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="vaani-search-refresh")
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache ("
+                    "key TEXT PRIMARY KEY, fresh_until REAL, "
+                    "stale_until REAL, value TEXT)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache disk tier disabled: {e}")
+                self._db = None
+
+    def lookup(self, key: str) -> Tuple[Any, Optional[str]]:
+        """Returns (value, status) with status "fresh", "stale" or None."""
+        now = time.time()
+        entry = self._memory.get(key)
+        tier = "memory"
+        if entry is None and self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT fresh_until, stale_until, value FROM search_cache "
+                    "WHERE key = ?", (key, )).fetchone()
+            if row is not None:
+                entry = (row[0], row[1], json.loads(row[2]))
+                tier = "disk"
+                self._memory.set(key, entry, ttl=max(0.0, row[1] - now))
+        if entry is None:
+            return None, None
+        fresh_until, stale_until, value = entry
+        if now < fresh_until:
+            metrics.incr(f"search.cache.{tier}_hit")
+            return value, "fresh"
+        if now < stale_until:
+            metrics.incr("search.cache.stale")
+            return value, "stale"
+        return None, None
+
+    def store(self, key: str, query: str, value: Any) -> None:
+        """Caches a result with the freshness TTL of its query class."""
+        now = time.time()
+        ttl = freshness_ttl(query)
+        fresh_until = now + ttl
+        stale_until = now + ttl * SEARCH_CACHE_STALE_MULTIPLIER
+        self._memory.set(key, (fresh_until, stale_until, value),
+                         ttl=stale_until - now)
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?)",
+                    (key, fresh_until, stale_until, json.dumps(value)))
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._db.execute(
+                        "DELETE FROM search_cache WHERE stale_until < ?",
+                        (now, ))
+                self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Could not persist search result: {e}")
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _refresh(self, key: str, query: str, fetch: Callable[[], Any]) -> None:
+        try:
+            value = fetch()
+            if value:
+                self.store(key, query, value)
+                metrics.incr("search.cache.refreshed")
+        except Exception as e:
+            logger.warning(f"Background search refresh failed: {e}")
+        finally:
+            self._release_refresh(key)
+
+    def get_or_fetch(self,
+                     provider: str,
+                     query: str,
+                     num_results: int,
+                     fetch: Callable[[], Any],
+                     options: Optional[Dict[str, Any]] = None) -> Any:
+        """Returns cached results for a search, calling fetch on a miss."""
+        key = search_cache_key(provider, query, num_results, options)
+        value, status = self.lookup(key)
+        if status == "stale" and self._claim_refresh(key):
+            self._refresh_executor.submit(self._refresh, key, query, fetch)
+        if status is not None:
+            return value
+        metrics.incr("search.cache.miss")
+        value = fetch()
+        # Empty results are not cached so the next call retries the provider
+        if value:
+            self.store(key, query, value)
+        return value
+
+    async def aget_or_fetch(self,
+                            provider: str,
+                            query: str,
+                            num_results: int,
+                            fetch: Callable[[], Awaitable[Any]],
+                            options: Optional[Dict[str, Any]] = None) -> Any:
+        """Async variant of get_or_fetch for coroutine-based providers."""
+        key = search_cache_key(provider, query, num_results, options)
+        value, status = self.lookup(key)
+        if status == "stale" and self._claim_refresh(key):
+
+            async def refresh():
+                try:
+                    fresh = await fetch()
+                    if fresh:
+                        self.store(key, query, fresh)
+                        metrics.incr("search.cache.refreshed")
+                except Exception as e:
+                    logger.warning(f"Background search refresh failed: {e}")
+                finally:
+                    self._release_refresh(key)
+
+            task = asyncio.create_task(refresh())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        if status is not None:
+            return value
+        metrics.incr("search.cache.miss")
+        value = await fetch()
+        if value:
+            self.store(key, query, value)
+        return value
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Returns the process-wide search cache."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
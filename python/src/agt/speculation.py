@@ -0,0 +1,105 @@
+"""Speculative execution of a streamed answer ahead of a routing decision.
+
+A ``SpeculativeStream`` starts producing answer tokens in the background
+while the caller is still deciding whether that answer is wanted. Tokens are
+buffered until ``commit()``, which flushes them to the client and forwards
+later tokens as they arrive; ``cancel()`` stops the producer and books the
+tokens generated so far as waste.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Callable, Iterable, List, Optional
+
+try:
+    from .metrics import metrics
+    from .tokens import estimate_tokens
+except ImportError:
+    from metrics import metrics
+    from tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+metrics.register_ratio("speculation.commit_rate", "speculation.committed",
+                       "speculation.started")
+metrics.register_ratio("speculation.waste_ratio", "speculation.wasted_tokens",
+                       ["speculation.wasted_tokens", "speculation.used_tokens"])
+
+
+class SpeculativeStream:
+    """Runs a token producer ahead of the decision that needs it."""
+
+    def __init__(self, executor: Executor, produce: Callable[[], Iterable[str]],
+                 emit: Callable[[str], None], key: str = ""):
+        self.key = key
+        self._produce = produce
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._parts: List[str] = []
+        self._committed = False
+        self._cancelled = threading.Event()
+        self._started_at = time.perf_counter()
+        metrics.incr("speculation.started")
+        self._future = executor.submit(self._run)
+
+    def _run(self) -> str:
+        for text in self._produce():
+            if self._cancelled.is_set():
+                break
+            if not text:
+                continue
+            with self._lock:
+                self._parts.append(text)
+                if self._committed:
+                    self._emit(text)
+        return "".join(self._parts)
+
+    def _account(self, future, outcome: str) -> None:
+        """Books the generated tokens once the producer has stopped."""
+        with self._lock:
+            tokens = estimate_tokens("".join(self._parts))
+        metrics.incr(f"speculation.{outcome}_tokens", tokens)
+        if future.exception() is not None:
+            logger.warning(f"Speculative answer failed: {future.exception()}")
+
+    def commit(self) -> None:
+        """Keeps the answer: flushes buffered tokens and streams the rest."""
+        with self._lock:
+            if self._committed or self._cancelled.is_set():
+                return
+            self._committed = True
+            buffered = "".join(self._parts)
+            if buffered:
+                self._emit(buffered)
+        metrics.incr("speculation.committed")
+        self._future.add_done_callback(lambda f: self._account(f, "used"))
+        # How far ahead of a sequential start the answer already was
+        metrics.observe("speculation.head_start",
+                        time.perf_counter() - self._started_at)
+
+    def cancel(self) -> None:
+        """Discards the answer and stops producing tokens."""
+        with self._lock:
+            if self._committed or self._cancelled.is_set():
+                return
+            self._cancelled.set()
+        metrics.incr("speculation.cancelled")
+        self._future.add_done_callback(lambda f: self._account(f, "wasted"))
+
+    @property
+    def streamed(self) -> bool:
+        """Whether any tokens have already been sent to the client."""
+        with self._lock:
+            return self._committed and bool(self._parts)
+
+    def result(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Waits for the committed answer; None if it failed or was cancelled."""
+        if self._cancelled.is_set():
+            return None
+        try:
+            return self._future.result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Speculative answer unavailable: {e}")
+            return None
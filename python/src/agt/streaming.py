@@ -0,0 +1,58 @@
+"""Per-request event channels from graph nodes to the streaming API.
+
+The API opens a channel for a request and passes its id to the graph as
+``configurable.stream_id``. Nodes call ``emit(config, event)`` to push events
+(answer chunks, status updates) that the API forwards to the client while the
+graph is still running. Without an open channel ``emit`` is a no-op, so nodes
+behave the same when invoked outside the streaming endpoint.
+"""
+
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+_channels: Dict[str, "queue.Queue[Dict[str, Any]]"] = {}
+_channels_lock = threading.Lock()
+
+
+def open_stream(stream_id: str) -> "queue.Queue[Dict[str, Any]]":
+    """Creates the event queue for a request."""
+    events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    with _channels_lock:
+        _channels[stream_id] = events
+    return events
+
+
+def close_stream(stream_id: str) -> None:
+    """Drops the event queue for a request."""
+    with _channels_lock:
+        _channels.pop(stream_id, None)
+
+
+def get_stream_id(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Returns the stream id carried by a runnable config, if any."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("stream_id")
+
+
+def emit(config: Optional[Dict[str, Any]], event: Dict[str, Any]) -> bool:
+    """Pushes an event to the request's channel; returns False if none."""
+    stream_id = get_stream_id(config)
+    if not stream_id:
+        return False
+    with _channels_lock:
+        events = _channels.get(stream_id)
+    if events is None:
+        return False
+    events.put(event)
+    return True
+
+
+def drain(events: "queue.Queue[Dict[str, Any]]") -> List[Dict[str, Any]]:
+    """Returns every event currently queued without blocking."""
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except queue.Empty:
+            return drained
@@ -0,0 +1,142 @@
+"""Local repair of malformed structured (tool-call) output.
+
+Models frequently get the shape of a tool call almost right: the arguments
+arrive as a JSON string, are followed by stray text, wrap a nested object in
+a string, or leave out an optional list field. These cases can be fixed
+locally and checked against the Pydantic schema, which is much cheaper than
+another round trip to the model.
+"""
+
+import json
+import logging
+import re
+from typing import (Any, Dict, Iterable, List, Optional, Type, Union,
+                    get_args, get_origin)
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel, ValidationError
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.register_ratio("structured_output.repair_rate",
+                       "structured_output.repaired", [
+                           "structured_output.repaired",
+                           "structured_output.retried",
+                           "structured_output.unrecoverable"
+                       ])
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def parse_json_object(raw: Any) -> Optional[Dict[str, Any]]:
+    """Parses a JSON object out of a string, tolerating fences and trailing text."""
+    if isinstance(raw, dict):
+        return raw
+    if not isinstance(raw, str):
+        return None
+    text = _FENCE_RE.sub("", raw.strip())
+    if text.startswith('"'):
+        # Doubly encoded arguments
+        try:
+            return parse_json_object(json.loads(text))
+        except ValueError:
+            pass
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start:])
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _is_list(annotation: Any) -> bool:
+    if get_origin(annotation) is Union:
+        # Optional[List[...]]
+        return any(_is_list(arg) for arg in get_args(annotation)
+                   if arg is not type(None))
+    return get_origin(annotation) in (list, List) or annotation is list
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def coerce_to_schema(args: Dict[str, Any],
+                     schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Fixes common shape errors in tool-call arguments for a schema.
+
+    Stringified JSON values are decoded, a single string given for a list
+    field becomes a one-item list, missing optional list fields become empty
+    lists, and nested models are coerced recursively. Missing required
+    fields are left out so validation fails and the call is retried.
+    """
+    fixed = dict(args)
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if name not in fixed or fixed[name] is None:
+            if _is_list(annotation) and not field.is_required():
+                fixed[name] = []
+            continue
+        value = fixed[name]
+        if isinstance(value, str) and value.strip()[:1] in ("[", "{"):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if _is_list(annotation) and isinstance(value, str):
+            value = [value] if value.strip() else []
+        if _is_model(annotation) and isinstance(value, dict):
+            value = coerce_to_schema(value, annotation)
+        fixed[name] = value
+    return fixed
+
+
+def _candidate_calls(message: Any) -> Iterable[Dict[str, Any]]:
+    """Yields the valid, invalid and content-embedded tool calls of a message."""
+    for call in getattr(message, "tool_calls", None) or []:
+        yield call
+    for call in getattr(message, "invalid_tool_calls", None) or []:
+        yield call
+    content = getattr(message, "content", None)
+    if isinstance(content, str) and content.strip():
+        yield {"name": None, "args": content, "id": None}
+
+
+def repair_tool_call(message: Any,
+                     schemas: Iterable[Type[BaseModel]]) -> Optional[AIMessage]:
+    """Returns a copy of message with one schema-valid tool call, or None.
+
+    Calls naming an unknown tool are skipped; arguments found in the message
+    content are tried against every schema.
+    """
+    by_name = {schema.__name__: schema for schema in schemas}
+    for call in _candidate_calls(message):
+        args = parse_json_object(call.get("args"))
+        if args is None:
+            continue
+        name = call.get("name")
+        candidates = [by_name[name]] if name in by_name else (
+            [] if name else list(by_name.values()))
+        for schema in candidates:
+            try:
+                validated = schema.model_validate(coerce_to_schema(args, schema))
+            except ValidationError as e:
+                logger.debug(f"Could not repair {schema.__name__} call: {e}")
+                continue
+            return AIMessage(
+                content=message.content if isinstance(message.content, str)
+                else "",
+                tool_calls=[{
+                    "name": schema.__name__,
+                    "args": validated.model_dump(),
+                    "id": call.get("id") or "repaired_call",
+                    "type": "tool_call",
+                }])
+    return None
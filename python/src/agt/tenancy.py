@@ -0,0 +1,86 @@
+"""Qdrant collection layout: one collection per thread, or one shared.
+
+By default every thread gets its own collection. With
+``QDRANT_COLLECTION_MODE=shared`` all documents go into a single collection
+(``QDRANT_SHARED_COLLECTION``) and each point carries ``thread_id`` and
+``doc_id`` metadata fields with keyword payload indexes. A thread's view of
+the collection is a *scope*, a dict of those fields, which becomes a payload
+filter for searches, counts and deletes. Qdrant keeps one HNSW graph and a
+per-value index instead of thousands of tiny collections, and replacing a
+thread's document is a filtered delete instead of a collection drop.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qdrant_models
+
+logger = logging.getLogger(__name__)
+
+# "per_thread" or "shared"
+QDRANT_COLLECTION_MODE = os.getenv("QDRANT_COLLECTION_MODE", "per_thread")
+QDRANT_SHARED_COLLECTION = os.getenv("QDRANT_SHARED_COLLECTION",
+                                     "vaani_documents")
+
+# Metadata fields that scope points in the shared collection
+SCOPE_FIELDS = ("thread_id", "doc_id")
+
+Scope = Dict[str, str]
+
+
+def shared_mode() -> bool:
+    """Whether documents go to the shared collection."""
+    return QDRANT_COLLECTION_MODE == "shared"
+
+
+def thread_collection_name(thread_id: str) -> str:
+    """Per-thread collection used outside shared mode."""
+    return f"vaani_{hashlib.md5(thread_id.encode()).hexdigest()[:16]}"
+
+
+def payload_key(field: str) -> str:
+    """Payload path of a metadata field in the langchain_qdrant layout."""
+    return f"metadata.{field}"
+
+
+# Keyword-indexed in the shared collection
+SCOPE_PAYLOAD_KEYS = tuple(payload_key(field) for field in SCOPE_FIELDS)
+
+
+def scope_filter(scope: Optional[Scope],
+                 **extra: str) -> Optional[qdrant_models.Filter]:
+    """Filter matching every field of the scope plus any extra fields."""
+    fields = dict(scope or {}, **extra)
+    if not fields:
+        return None
+    return qdrant_models.Filter(must=[
+        qdrant_models.FieldCondition(
+            key=payload_key(field),
+            match=qdrant_models.MatchValue(value=value))
+        for field, value in sorted(fields.items())
+    ])
+
+
+def count_points(client: QdrantClient,
+                 collection_name: str,
+                 scope: Optional[Scope] = None,
+                 **extra: str) -> int:
+    """Exact number of points in a scope (all points without one)."""
+    return client.count(collection_name,
+                        count_filter=scope_filter(scope, **extra),
+                        exact=True).count
+
+
+def delete_scope(client: QdrantClient, collection_name: str,
+                 scope: Scope) -> None:
+    """Deletes the points of one scope, leaving the rest of the collection."""
+    if not scope:
+        raise ValueError("Refusing to delete with an empty scope")
+    client.delete(collection_name,
+                  points_selector=qdrant_models.FilterSelector(
+                      filter=scope_filter(scope)),
+                  wait=True)
+    logger.info(f"Deleted points of {scope} from {collection_name}")
@@ -0,0 +1,6 @@
+"""Token counting shared by budgeted prompts and metrics."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates a token count at four characters per token."""
+    return (len(text) + 3) // 4
@@ -15,6 +15,19 @@ from typing_extensions import Annotated
 
 from react_agent.configuration import Configuration
 
+# Resolve agt through the same package as the caller (src.agt under
+# main.py), so the search cache and metrics are shared with the agent.
+try:
+    from ..agt.dedup import dedupe_results
+    from ..agt.search_cache import get_search_cache
+except ImportError:
+    try:
+        from agt.dedup import dedupe_results
+        from agt.search_cache import get_search_cache
+    except ImportError:
+        dedupe_results = None
+        get_search_cache = None
+
 
 async def search(
     query: str, *, config: Annotated[RunnableConfig, InjectedToolArg]
@@ -27,7 +40,28 @@ async def search(
     """
     configuration = Configuration.from_runnable_config(config)
     wrapped = TavilySearchResults(max_results=configuration.max_search_results)
-    result = await wrapped.ainvoke({"query": query})
+
+    if get_search_cache is None:
+        result = await wrapped.ainvoke({"query": query})
+    else:
+        error = None
+
+        async def fetch() -> Any:
+            nonlocal error
+            results = await wrapped.ainvoke({"query": query})
+            # The tool reports failures as a string; never cache those
+            if isinstance(results, list):
+                return results
+            error = results
+            return []
+
+        # Same memory + disk search cache as the Vaani agent nodes
+        result = await get_search_cache().aget_or_fetch(
+            "tavily", query, configuration.max_search_results, fetch)
+        if error is not None and not result:
+            result = error
+    if dedupe_results is not None and isinstance(result, list):
+        result = dedupe_results(result)
     return cast(list[dict[str, Any]], result)
 
 
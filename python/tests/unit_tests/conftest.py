@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The agt package lives under src/ and is importable without installing it
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
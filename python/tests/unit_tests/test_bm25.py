@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agt import hybrid
+from agt.bm25 import BM25, tokenize
+from agt.hybrid import (
+    LexicalIndex,
+    LexicalIndexBuilder,
+    load_lexical_index,
+    reciprocal_rank_fusion,
+)
+
+TEXTS = [
+    "The invoice total is due within thirty days of delivery.",
+    "Late payment of an invoice incurs a penalty fee.",
+    "The warranty covers manufacturing defects for two years.",
+    "Delivery is free for orders above fifty euros.",
+]
+
+
+@pytest.fixture
+def index():
+    return BM25([tokenize(text) for text in TEXTS])
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("What is the Warranty on THIS?") == ["warranty"]
+
+
+def test_ranks_documents_by_query_terms(index):
+    ranked = index.top_k(tokenize("invoice penalty"), k=4)
+    assert [i for i, _ in ranked] == [1, 0]
+    assert all(score > 0 for _, score in ranked)
+
+
+def test_scores_match_per_document_score(index):
+    query = tokenize("delivery of the invoice")
+    scores = index.scores(query)
+    assert scores == pytest.approx([index.score(query, i)
+                                    for i in range(len(TEXTS))])
+    assert scores[2] == 0.0
+
+
+def test_rare_terms_weigh_more():
+    index = BM25([["common", "rare"], ["common"], ["common"]])
+    assert index.idf["rare"] > index.idf["common"]
+
+
+def test_shorter_documents_score_higher_for_same_frequency():
+    index = BM25([["term", "filler"], ["term"] + ["filler"] * 9])
+    assert index.score(["term"], 1) < index.score(["term"], 0)
+
+
+def test_unknown_query_terms_match_nothing(index):
+    assert index.top_k(["nonexistent"], k=3) == []
+    assert index.top_k([], k=3) == []
+
+
+def test_serialisation_round_trip(index):
+    restored = BM25.from_dict(index.to_dict())
+    query = tokenize("free delivery")
+    assert restored.scores(query) == pytest.approx(index.scores(query))
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [text for text, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_builder_matches_in_memory_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(hybrid, "LEXICAL_INDEX_DIR", str(tmp_path))
+    builder = LexicalIndexBuilder()
+    chunks = [SimpleNamespace(page_content=text) for text in TEXTS]
+    assert list(builder.observe(chunks)) == chunks
+    builder.save("doc")
+    loaded = load_lexical_index("doc")
+    expected = LexicalIndex(TEXTS)
+    assert loaded.texts == TEXTS
+    for query in ("invoice penalty", "warranty", "free delivery"):
+        assert loaded.search(query, 2) == expected.search(query, 2)
+    hybrid.delete_lexical_index("doc")
+    assert load_lexical_index("doc") is None
@@ -0,0 +1,71 @@
+import pytest
+
+from agt import cache
+from agt.cache import TTLCache, make_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_default_when_missing():
+    assert TTLCache().get("missing", "default") == "default"
+
+
+def test_entries_expire_after_ttl(clock):
+    store = TTLCache(ttl=10)
+    store.set("key", "value")
+    clock[0] += 9
+    assert store.get("key") == "value"
+    clock[0] += 2
+    assert store.get("key") is None
+    assert len(store) == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    store = TTLCache(ttl=10)
+    store.set("short", 1, ttl=1)
+    store.set("long", 2)
+    clock[0] += 5
+    assert store.get("short") is None
+    assert store.get("long") == 2
+
+
+def test_evicts_least_recently_used():
+    store = TTLCache(maxsize=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    assert store.get("c") == 3
+    assert len(store) == 2
+
+
+def test_setdefault_keeps_existing_value(clock):
+    store = TTLCache(ttl=10)
+    assert store.setdefault("key", "first") == "first"
+    assert store.setdefault("key", "second") == "first"
+    clock[0] += 11
+    assert store.setdefault("key", "third") == "third"
+
+
+def test_delete_and_clear():
+    store = TTLCache()
+    store.set("a", 1)
+    store.set("b", 2)
+    store.delete("a")
+    store.delete("missing")
+    assert store.get("a") is None
+    store.clear()
+    assert len(store) == 0
+
+
+def test_make_cache_without_redis_is_in_process():
+    store = make_cache("test", maxsize=5, ttl=30)
+    assert isinstance(store, TTLCache)
+    assert (store.maxsize, store.ttl) == (5, 30)
@@ -0,0 +1,59 @@
+from agt.dedup import canonicalize_url, dedupe_results
+
+ARTICLE = (
+    "The central bank raised interest rates by a quarter point on Wednesday, "
+    "citing persistent inflation in services and a tight labour market. "
+    "Officials signalled that further increases remain possible if price "
+    "growth does not slow over the coming months, while markets had largely "
+    "expected the move and reacted calmly to the announcement.")
+
+
+def test_canonicalize_url_normalises_trivial_differences():
+    assert canonicalize_url(
+        "http://WWW.Example.com:80/news//story/?utm_source=x&b=2&a=1#top"
+    ) == "https://example.com/news/story?a=1&b=2"
+
+
+def test_canonicalize_url_keeps_meaningful_parts():
+    assert canonicalize_url("https://example.com:8443/a?id=7") == (
+        "https://example.com:8443/a?id=7")
+
+
+def test_drops_url_duplicates_keeping_first():
+    results = [
+        {"url": "https://example.com/a", "content": "first"},
+        {"url": "http://www.example.com/a/?utm_medium=email",
+         "content": "second"},
+        {"url": "https://example.com/b", "content": "third"},
+    ]
+    assert [r["content"] for r in dedupe_results(results)] == [
+        "first", "third"]
+
+
+def test_collapses_near_duplicate_content():
+    syndicated = ARTICLE.upper() + " (Reuters)"
+    results = [
+        {"url": "https://news.example.com/rates", "content": ARTICLE},
+        {"url": "https://mirror.example.org/rates", "content": syndicated},
+    ]
+    kept = dedupe_results(results)
+    assert [r["url"] for r in kept] == ["https://news.example.com/rates"]
+
+
+def test_keeps_distinct_content():
+    other = ("A new species of frog was discovered in the cloud forests of "
+             "Ecuador by a team of biologists who spent three years "
+             "surveying remote streams along the eastern slopes.")
+    results = [
+        {"url": "https://a.example.com", "content": ARTICLE},
+        {"url": "https://b.example.com", "content": other},
+    ]
+    assert len(dedupe_results(results)) == 2
+
+
+def test_short_texts_are_only_matched_by_url():
+    results = [
+        {"url": "https://a.example.com", "content": "Too short"},
+        {"url": "https://b.example.com", "content": "Too short"},
+    ]
+    assert len(dedupe_results(results)) == 2
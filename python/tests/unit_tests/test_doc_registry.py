@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from agt import doc_registry
+from agt.doc_registry import DocumentRegistry
+
+SCOPE = {"doc_id": "abc"}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DocumentRegistry(str(tmp_path / "registry.db"))
+
+
+def test_attach_unknown_document_changes_nothing(registry):
+    assert registry.attach("thread", "missing") == (None, [])
+    assert registry.refcount("missing") == 0
+
+
+def test_attach_counts_references(registry):
+    registry.register("doc", "shared", SCOPE)
+    document, orphaned = registry.attach("t1", "doc")
+    assert (document.collection_name, document.scope) == ("shared", SCOPE)
+    assert orphaned == []
+    registry.attach("t2", "doc")
+    registry.attach("t2", "doc")
+    assert registry.refcount("doc") == 2
+    assert registry.stats() == {"documents": 1, "references": 2}
+
+
+def test_switching_document_orphans_previous(registry):
+    registry.register("old", "vaani_doc_old")
+    registry.register("new", "vaani_doc_new")
+    registry.attach("t1", "old")
+    assert registry.attach("t1", "new")[1] == ["old"]
+    assert registry.refcount("old") == 0
+    assert registry.refcount("new") == 1
+
+
+def test_shared_document_is_not_orphaned(registry):
+    registry.register("doc", "vaani_doc")
+    registry.attach("t1", "doc")
+    registry.attach("t2", "doc")
+    assert registry.detach("t1") == []
+    assert registry.detach("t2") == ["doc"]
+    assert registry.detach("t3") == []
+
+
+def test_forget_refuses_referenced_documents(registry):
+    registry.register("doc", "vaani_doc", SCOPE)
+    registry.attach("t1", "doc")
+    assert registry.forget("doc") is None
+    registry.detach("t1")
+    forgotten = registry.forget("doc")
+    assert (forgotten.collection_name, forgotten.scope) == ("vaani_doc",
+                                                            SCOPE)
+    assert registry.get("doc") is None
+    assert registry.forget("doc") is None
+
+
+def test_unreferenced_respects_age(registry, monkeypatch):
+    registry.register("orphan", "vaani_doc_orphan")
+    registry.register("used", "vaani_doc_used")
+    registry.attach("t1", "used")
+    later = time.time() + 60
+    monkeypatch.setattr(doc_registry.time, "time", lambda: later)
+    assert registry.unreferenced() == ["orphan"]
+    assert registry.unreferenced(older_than=3600) == []
+
+
+def test_registry_persists(tmp_path):
+    path = str(tmp_path / "registry.db")
+    first = DocumentRegistry(path)
+    first.register("doc", "vaani_doc")
+    first.attach("t1", "doc")
+    second = DocumentRegistry(path)
+    assert second.get("doc").collection_name == "vaani_doc"
+    assert second.refcount("doc") == 1
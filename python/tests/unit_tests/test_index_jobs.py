@@ -0,0 +1,107 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from agt import index_jobs
+from agt.index_jobs import IndexJobManager, content_hash
+
+
+class FakeIndexer:
+    """Records indexing calls; fails paths containing "bad"."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, path, collection_name, document_hash, progress, scope):
+        self.calls.append(path)
+        self.release.wait(5)
+        if "bad" in path:
+            raise ValueError("unreadable")
+        progress(SimpleNamespace(chunks=5, chunks_per_second=12.34))
+
+
+@pytest.fixture
+def indexer():
+    return FakeIndexer()
+
+
+@pytest.fixture
+def manager(indexer):
+    return IndexJobManager(indexer, workers=1)
+
+
+def test_job_status_lifecycle(manager, indexer):
+    indexer.release.clear()
+    job = manager.submit("a.pdf", document_hash="a" * 64)
+    assert job.status in ("queued", "running")
+    assert job.collection_name == "vaani_doc_" + "a" * 16
+    indexer.release.set()
+    assert job.wait(5)
+    status = job.to_dict()
+    assert status["status"] == "done"
+    assert (status["chunks"], status["chunks_per_second"]) == (5, 12.3)
+    assert status["finished_at"] is not None
+
+
+def test_failed_job_records_error_and_can_be_resubmitted(manager, indexer):
+    job = manager.submit("bad.pdf", document_hash="b" * 64)
+    assert not job.wait(5)
+    assert (job.status, job.error) == ("failed", "unreadable")
+    retry = manager.submit("bad.pdf", document_hash="b" * 64)
+    assert retry is not job
+    retry.wait(5)
+    assert indexer.calls == ["bad.pdf", "bad.pdf"]
+
+
+def test_same_content_reuses_job(manager, indexer, tmp_path):
+    first, second = tmp_path / "first.pdf", tmp_path / "second.pdf"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    job = manager.submit(str(first))
+    assert job.wait(5)
+    again = manager.submit(str(second), alias="https://files/second.pdf",
+                           cleanup=True)
+    assert again is job
+    assert job.job_id == content_hash(b"same bytes")
+    assert indexer.calls == [str(first)]
+    assert not second.exists()
+    assert manager.find("https://files/second.pdf") is job
+
+
+def test_cleanup_removes_file_after_indexing(manager, tmp_path):
+    upload = tmp_path / "upload.pdf"
+    upload.write_bytes(b"content")
+    assert manager.submit(str(upload), cleanup=True).wait(5)
+    assert not upload.exists()
+
+
+def test_discard_forgets_job_and_aliases(manager):
+    job = manager.submit("a.pdf", document_hash="a" * 64, alias="url")
+    job.wait(5)
+    manager.discard(job.job_id)
+    assert manager.get(job.job_id) is None
+    assert manager.find("url") is None
+    assert manager.find("a.pdf") is None
+
+
+def test_expired_jobs_are_evicted(manager, monkeypatch):
+    old = manager.submit("old.pdf", document_hash="o" * 64, alias="old")
+    old.wait(5)
+    monkeypatch.setattr(index_jobs, "INDEX_JOB_TTL", -1)
+    manager.submit("new.pdf", document_hash="n" * 64).wait(5)
+    assert manager.get(old.job_id) is None
+    assert manager.find("old") is None
+
+
+def test_oldest_finished_jobs_are_evicted_beyond_limit(manager, monkeypatch):
+    monkeypatch.setattr(index_jobs, "INDEX_JOB_MAX_FINISHED", 1)
+    first = manager.submit("1.pdf", document_hash="1" * 64)
+    first.wait(5)
+    second = manager.submit("2.pdf", document_hash="2" * 64)
+    second.wait(5)
+    manager.submit("3.pdf", document_hash="3" * 64).wait(5)
+    assert manager.get(first.job_id) is None
+    assert manager.get(second.job_id) is second
@@ -0,0 +1,89 @@
+import time
+
+from agt.reflexion import ReflexionLoop, reports_gaps
+
+
+def make_args(answer, queries, missing="more detail"):
+    return {
+        "answer": answer,
+        "reflection": {"missing": missing, "superfluous": ""},
+        "search_queries": queries,
+    }
+
+
+class FakeAgent:
+    """Searches return one result per query; revisions follow a script."""
+
+    def __init__(self, revisions):
+        self.revisions = list(revisions)
+        self.searched = []
+
+    def search(self, queries):
+        self.searched.append(list(queries))
+        return [{"url": query, "content": query} for query in queries]
+
+    def revise(self, args, results, round_number):
+        return self.revisions.pop(0) if self.revisions else None
+
+
+def run(agent, initial=None, **kwargs):
+    loop = ReflexionLoop(agent.search, agent.revise, **kwargs)
+    return loop.run(initial or make_args("first draft", ["q1"]))
+
+
+def test_reports_gaps():
+    assert reports_gaps(make_args("", [], missing="recent figures"))
+    assert not reports_gaps(make_args("", [], missing="None."))
+    assert not reports_gaps(make_args("", [], missing=""))
+    assert reports_gaps({"reflection": "no sources cited"})
+
+
+def test_stops_when_no_gaps_remain():
+    agent = FakeAgent([make_args("revised", ["q2"], missing="nothing")])
+    result = run(agent)
+    assert (result.stop_reason, result.rounds) == ("no_gaps", 1)
+    assert result.args["answer"] == "revised"
+
+
+def test_stops_without_new_queries():
+    agent = FakeAgent([make_args("revised", [" Q1 ", "q1"])])
+    result = run(agent)
+    assert (result.stop_reason, result.rounds) == ("no_new_queries", 1)
+    assert agent.searched == [["q1"]]
+
+
+def test_stops_when_answer_is_stable():
+    agent = FakeAgent([
+        make_args("the answer is forty two", ["q2"]),
+        make_args("the answer is forty two", ["q3"]),
+        make_args("something else entirely", ["q4"]),
+    ])
+    result = run(agent, max_rounds=5)
+    assert (result.stop_reason, result.rounds) == ("stable", 2)
+
+
+def test_stops_at_max_rounds():
+    agent = FakeAgent([
+        make_args("alpha beta", ["q2"]),
+        make_args("gamma delta", ["q3"]),
+        make_args("epsilon zeta", ["q4"]),
+    ])
+    result = run(agent, max_rounds=2)
+    assert (result.stop_reason, result.rounds) == ("max_rounds", 2)
+    assert agent.searched == [["q1"], ["q2"]]
+    assert len(result.results) == 2
+
+
+def test_stops_when_deadline_would_be_missed():
+    agent = FakeAgent([make_args("revised", ["q2"])])
+    loop = ReflexionLoop(agent.search, agent.revise, budget=30)
+    result = loop.run(make_args("first draft", ["q1"]),
+                      started_at=time.monotonic() - 60)
+    assert (result.stop_reason, result.rounds) == ("deadline", 1)
+
+
+def test_stops_without_results_or_revision():
+    loop = ReflexionLoop(lambda queries: [], FakeAgent([]).revise)
+    no_results = loop.run(make_args("draft", ["q1"]))
+    assert (no_results.stop_reason, no_results.rounds) == ("no_results", 0)
+    assert run(FakeAgent([])).stop_reason == "revise_failed"
@@ -0,0 +1,77 @@
+import pytest
+
+from agt import retrieval_cache
+from agt.cache import TTLCache
+from agt.retrieval_cache import (
+    cached_retrieval,
+    collection_version,
+    invalidate_collection,
+)
+
+SCOPE = {"doc_id": "abc"}
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    # Fresh in-process tiers, even when a Redis URL is configured
+    monkeypatch.setattr(retrieval_cache, "retrieval_cache", TTLCache())
+    monkeypatch.setattr(retrieval_cache, "collection_versions", TTLCache())
+
+
+class Retriever:
+    """Returns the chunks of the current index content and counts calls."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.chunks)
+
+
+def test_repeated_query_is_served_from_cache():
+    retrieve = Retriever(["chunk"])
+    assert cached_retrieval("docs", None, "what is due", 3, retrieve) == [
+        "chunk"]
+    assert cached_retrieval("docs", None, " what  is due ", 3, retrieve) == [
+        "chunk"]
+    assert retrieve.calls == 1
+
+
+def test_k_and_query_are_part_of_the_key():
+    retrieve = Retriever(["chunk"])
+    cached_retrieval("docs", None, "what is due", 3, retrieve)
+    cached_retrieval("docs", None, "what is due", 5, retrieve)
+    cached_retrieval("docs", None, "who signed", 3, retrieve)
+    assert retrieve.calls == 3
+
+
+def test_reindexing_invalidates_cached_results():
+    retrieve = Retriever(["old chunk"])
+    cached_retrieval("docs", SCOPE, "query", 3, retrieve)
+    retrieve.chunks = ["new chunk"]
+    invalidate_collection("docs", SCOPE)
+    assert cached_retrieval("docs", SCOPE, "query", 3, retrieve) == [
+        "new chunk"]
+    assert retrieve.calls == 2
+
+
+def test_invalidation_is_per_scope():
+    retrieve = Retriever(["chunk"])
+    cached_retrieval("docs", SCOPE, "query", 3, retrieve)
+    cached_retrieval("docs", {"doc_id": "other"}, "query", 3, retrieve)
+    invalidate_collection("docs", {"doc_id": "other"})
+    cached_retrieval("docs", SCOPE, "query", 3, retrieve)
+    assert retrieve.calls == 2
+
+
+def test_lost_version_never_serves_old_results():
+    retrieve = Retriever(["chunk"])
+    version = collection_version("docs")
+    assert collection_version("docs") == version
+    cached_retrieval("docs", None, "query", 3, retrieve)
+    retrieval_cache.collection_versions.clear()
+    assert collection_version("docs") != version
+    cached_retrieval("docs", None, "query", 3, retrieve)
+    assert retrieve.calls == 2
@@ -0,0 +1,63 @@
+from agt.routing import DEFAULT_RULES_PATH, KeywordRouter
+
+RULES = [
+    {"agent": "image_generator", "priority": 30,
+     "keywords": ["image of", "draw a"]},
+    {"agent": "music_generator", "priority": 20,
+     "keywords": ["create music", "create music video"]},
+    {"agent": "web_search_agent", "priority": 10,
+     "keywords": ["latest", "news", "image"]},
+]
+
+
+def test_routes_on_keyword():
+    match = KeywordRouter(RULES).route("What is the latest on the election?")
+    assert match.agent == "web_search_agent"
+    assert match.keyword == "latest"
+    assert match.span == (12, 18)
+
+
+def test_no_match_returns_none():
+    router = KeywordRouter(RULES)
+    assert router.route("Tell me a joke") is None
+    assert router.route("") is None
+    assert KeywordRouter([]).route("latest news") is None
+
+
+def test_matching_is_case_and_whitespace_insensitive():
+    match = KeywordRouter(RULES).route("Please DRAW   A cat")
+    assert match.agent == "image_generator"
+    assert match.keyword == "draw a"
+
+
+def test_keywords_match_whole_words_only():
+    assert KeywordRouter(RULES).route("the newsletter is out") is None
+
+
+def test_highest_priority_wins():
+    match = KeywordRouter(RULES).route("latest news, then an image of a dog")
+    assert match.agent == "image_generator"
+
+
+def test_equal_priority_goes_to_first_match():
+    match = KeywordRouter(RULES).route("news about the latest release")
+    assert match.keyword == "news"
+
+
+def test_longest_keyword_wins_at_a_position():
+    match = KeywordRouter(RULES).route("create music video for my band")
+    assert match.keyword == "create music video"
+
+
+def test_duplicate_keyword_keeps_highest_priority():
+    router = KeywordRouter([
+        {"agent": "low", "priority": 1, "keywords": ["weather"]},
+        {"agent": "high", "priority": 5, "keywords": ["Weather"]},
+    ])
+    assert router.route("weather in Paris").agent == "high"
+
+
+def test_default_rules_load():
+    router = KeywordRouter.from_file(DEFAULT_RULES_PATH)
+    assert router.route("generate an image of a sunset").agent == (
+        "image_generator")
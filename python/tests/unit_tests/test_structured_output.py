@@ -0,0 +1,96 @@
+import json
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+pydantic = pytest.importorskip("pydantic")
+pytest.importorskip("langchain_core")
+
+from agt.structured_output import (  # noqa: E402
+    coerce_to_schema,
+    parse_json_object,
+    repair_tool_call,
+)
+
+
+class Reflection(pydantic.BaseModel):
+    missing: str
+    superfluous: str
+
+
+class AnswerQuestion(pydantic.BaseModel):
+    answer: str
+    reflection: Reflection
+    search_queries: List[str] = pydantic.Field(default_factory=list)
+
+
+ARGS = {
+    "answer": "Paris",
+    "reflection": {"missing": "sources", "superfluous": "none"},
+    "search_queries": ["capital of France"],
+}
+
+
+def message(content="", tool_calls=(), invalid_tool_calls=()):
+    return SimpleNamespace(content=content,
+                           tool_calls=list(tool_calls),
+                           invalid_tool_calls=list(invalid_tool_calls))
+
+
+@pytest.mark.parametrize("raw", [
+    json.dumps(ARGS),
+    "```json\n" + json.dumps(ARGS) + "\n```",
+    "Here you go: " + json.dumps(ARGS) + " Hope that helps!",
+    json.dumps(json.dumps(ARGS)),
+])
+def test_parse_json_object(raw):
+    assert parse_json_object(raw) == ARGS
+
+
+def test_parse_json_object_rejects_non_objects():
+    assert parse_json_object("[1, 2]") is None
+    assert parse_json_object("no json here") is None
+    assert parse_json_object(None) is None
+
+
+def test_coerce_to_schema_fixes_shape_errors():
+    args = {
+        "answer": "Paris",
+        "reflection": json.dumps(ARGS["reflection"]),
+        "search_queries": "capital of France",
+    }
+    assert coerce_to_schema(args, AnswerQuestion) == ARGS
+    assert coerce_to_schema({"answer": "Paris"}, AnswerQuestion) == {
+        "answer": "Paris", "search_queries": []}
+
+
+def test_repairs_invalid_tool_call():
+    broken = message(invalid_tool_calls=[{
+        "name": "AnswerQuestion",
+        "args": json.dumps(ARGS) + " trailing text",
+        "id": "call_1",
+        "error": "Invalid JSON",
+    }])
+    repaired = repair_tool_call(broken, [AnswerQuestion])
+    call = repaired.tool_calls[0]
+    assert call["name"] == "AnswerQuestion"
+    assert call["args"] == ARGS
+    assert call["id"] == "call_1"
+
+
+def test_repairs_arguments_in_content():
+    repaired = repair_tool_call(
+        message(content="```json\n" + json.dumps(ARGS) + "\n```"),
+        [AnswerQuestion])
+    assert repaired.tool_calls[0]["args"] == ARGS
+    assert repaired.tool_calls[0]["id"] == "repaired_call"
+
+
+def test_unrecoverable_calls_return_none():
+    missing_required = message(tool_calls=[{
+        "name": "AnswerQuestion", "args": {"answer": "Paris"}, "id": "1"}])
+    unknown_tool = message(tool_calls=[{
+        "name": "Other", "args": ARGS, "id": "2"}])
+    assert repair_tool_call(missing_required, [AnswerQuestion]) is None
+    assert repair_tool_call(unknown_tool, [AnswerQuestion]) is None